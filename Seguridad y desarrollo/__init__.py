@@ -1 +0,0 @@
-from Seguridad y desarrollo import config  # noqa: F401
@@ -1,28 +1,325 @@
+"""
+Ingesta de datos: descarga, procesamiento y consolidación como biblioteca y CLI
+
+Funciones de la biblioteca (se pueden encadenar en memoria):
+
+- download(): descarga las fuentes a data/raw (ver notebooks/download_data.py)
+- load_raw(): lee los crudos de los datasets estatales
+- process(): crudos -> tablas tidy por estado y periodo, sin escribir nada
+  salvo que se indique un directorio de salida
+- consolidate(): tablas tidy -> dataset consolidado
+
+`run()` encadena las cuatro y pasa las tablas procesadas a la consolidación
+en memoria, sin escribirlas ni volver a leerlas. Los datasets municipales, la
+incidencia del SESNSP y el reporte de calidad siguen en
+notebooks/process_data.py (`make process`).
+
+"Seguridad y desarrollo" no es un paquete (su nombre tiene espacios) sino la
+raíz de importación: los módulos se importan como hermanos (`import config`,
+`from modeling import train`) y config.py agrega notebooks/ a sys.path. Desde
+Python basta con poner el directorio en sys.path:
+
+    sys.path.insert(0, "Seguridad y desarrollo")
+    import dataset
+    consolidado = dataset.run(download_first=False)
+
+Uso:
+    python "Seguridad y desarrollo/dataset.py" download --fuente IED --fuente PEA
+    python "Seguridad y desarrollo/dataset.py" process
+    python "Seguridad y desarrollo/dataset.py" consolidate
+    python "Seguridad y desarrollo/dataset.py" run --no-download
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
 from pathlib import Path
 
 from loguru import logger
-from tqdm import tqdm
 import typer
 
-from Seguridad y desarrollo.config import PROCESSED_DATA_DIR, RAW_DATA_DIR
+from config import INTERIM_DATA_DIR, PROCESSED_DATA_DIR, RAW_DATA_DIR
+import download_data
+import process_data
+import storage
+
+app = typer.Typer(help="Descarga, procesamiento y consolidación de los datos socioeconómicos")
+
+INEGI = "educacion_salud"
+# Nombre corto (el de process_data.PROCESADOS) de cada dataset del registro
+DATASETS = {
+    nombre: spec
+    for spec in process_data.DATASETS
+    for nombre, archivo in process_data.PROCESADOS.items()
+    if archivo == spec.salida
+}
+# Opciones que se listan en la ayuda de los comandos
+FUENTES_AYUDA = ", ".join(download_data.FUENTES)
+DATASETS_AYUDA = ", ".join(process_data.PROCESADOS)
+
+
+def _check_names(nombres):
+    desconocidos = set(nombres) - set(process_data.PROCESADOS)
+    if desconocidos:
+        raise ValueError(
+            f"Datasets desconocidos: {sorted(desconocidos)} (opciones: {DATASETS_AYUDA})"
+        )
+
+
+def download(
+    fuentes=None, workers=None, bulk=None, cache=None, incremental=None, municipal=None, fmt=None
+):
+    """Descarga las fuentes a data/raw; regresa {fuente: éxito}
+
+    `fuentes` son nombres de download_data.FUENTES (default: todas); las
+    demás opciones son las de download_data.py (None = valor por defecto).
+    """
+    if fmt is not None:
+        storage.set_format(fmt)
+    download_data.configure(
+        workers=workers, bulk=bulk, cache=cache, incremental=incremental, municipal=municipal
+    )
+    resultados = download_data.download_sources(fuentes)
+    download_data.generate_metadata()
+    return resultados
+
+
+def load_raw(datasets=None, raw_dir=RAW_DATA_DIR):
+    """Crudos de los datasets indicados (default: todos los que existan)
+
+    Regresa {nombre: DataFrame} con los nombres de process_data.PROCESADOS;
+    sólo se leen las columnas que usa cada dataset.
+    """
+    nombres = list(datasets or process_data.PROCESADOS)
+    _check_names(nombres)
+    crudos = {}
+    for nombre in nombres:
+        fuente = process_data.INEGI_RAW_FILE if nombre == INEGI else DATASETS[nombre].fuente
+        if not storage.table_exists(Path(raw_dir) / fuente):
+            logger.warning(f"Crudo no encontrado: {Path(raw_dir) / fuente}")
+            continue
+        if nombre == INEGI:
+            crudos[nombre] = process_data.read_inegi_raw(raw_dir)
+        else:
+            crudos[nombre] = process_data.read_raw(DATASETS[nombre], raw_dir)
+    return crudos
+
+
+def process(raw=None, raw_dir=RAW_DATA_DIR, output_dir=None, interim_dir=INTERIM_DATA_DIR):
+    """Tablas tidy por estado y periodo a partir de los crudos
 
-app = typer.Typer()
+    `raw` es {nombre: DataFrame} (por ejemplo, de load_raw); sin él se leen
+    los crudos de `raw_dir`. Con `output_dir` cada tabla se guarda además en
+    el formato configurado (y el detalle del gasto en `interim_dir`). Los
+    datasets que fallan se reportan y se omiten; regresa {nombre: DataFrame}.
+    """
+    if raw is None:
+        raw = load_raw(raw_dir=raw_dir)
+    _check_names(raw)
+    if output_dir is not None:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        Path(interim_dir).mkdir(parents=True, exist_ok=True)
+    procesados = {}
+    for nombre, df in raw.items():
+        try:
+            if nombre == INEGI:
+                tabla, _ = process_data.tidy_inegi(df)
+                detalle = None
+            else:
+                tabla, detalle = process_data.tidy_dataset(DATASETS[nombre], df)
+        except (KeyError, ValueError) as e:
+            logger.error(f"No se pudo procesar {nombre}: {e}")
+            continue
+        if tabla.empty:
+            logger.error(f"No se pudo procesar {nombre}: sin registros")
+            continue
+        procesados[nombre] = tabla
+        logger.info(f"{nombre}: {len(tabla)} registros")
+
+        if output_dir is not None:
+            storage.write_table(
+                tabla,
+                Path(output_dir) / process_data.PROCESADOS[nombre],
+                dtypes=process_data.KEY_DTYPES,
+            )
+            if detalle is not None:
+                spec = DATASETS[nombre]
+                storage.write_table(
+                    detalle,
+                    Path(interim_dir) / spec.salida_detalle,
+                    dtypes={
+                        **process_data.KEY_DTYPES,
+                        **dict.fromkeys(spec.detalle.values(), "string"),
+                    },
+                )
+    return procesados
+
+
+def load_processed(datasets=None, processed_dir=PROCESSED_DATA_DIR):
+    """Tablas procesadas guardadas en `processed_dir` (default: todas las que existan)"""
+    nombres = list(datasets or process_data.PROCESADOS)
+    _check_names(nombres)
+    tablas = {}
+    for nombre in nombres:
+        filepath = Path(processed_dir) / process_data.PROCESADOS[nombre]
+        if storage.table_exists(filepath):
+            tablas[nombre] = storage.read_table(filepath)
+        else:
+            logger.warning(f"Tabla procesada no encontrada: {filepath}")
+    return tablas
+
+
+def consolidate(processed=None, processed_dir=PROCESSED_DATA_DIR, output_path=None):
+    """Dataset consolidado a partir de las tablas procesadas
+
+    `processed` es {nombre: DataFrame} (por ejemplo, de process); sin él se
+    leen las tablas de `processed_dir`. Con `output_path` se guarda además
+    en el formato configurado. Regresa None si no hay datos trimestrales.
+    """
+    if processed is None:
+        processed = load_processed(processed_dir=processed_dir)
+    _check_names(processed)
+    df = process_data.consolidate_tables(processed) if processed else None
+    if df is None:
+        logger.error("No hay datasets trimestrales para consolidar")
+        return None
+    if output_path is not None:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        storage.write_table(df, output_path, dtypes=process_data.KEY_DTYPES)
+    return df
+
+
+def run(
+    download_first=True,
+    fuentes=None,
+    raw_dir=RAW_DATA_DIR,
+    output_dir=None,
+    output_path=PROCESSED_DATA_DIR / process_data.CONSOLIDADO_FILE,
+):
+    """Descarga (opcional), procesa y consolida en una sola pasada
+
+    Las tablas procesadas pasan en memoria a la consolidación; sólo se
+    guardan si se da `output_dir`. Regresa el dataset consolidado.
+    """
+    if download_first:
+        download(fuentes)
+    procesados = process(load_raw(raw_dir=raw_dir), output_dir=output_dir)
+    return consolidate(procesados, output_path=output_path)
+
+
+def _set_format(fmt):
+    if fmt is not None:
+        try:
+            storage.set_format(fmt)
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--format")
+
+
+@app.command("download")
+def download_command(
+    fuente: list[str] | None = typer.Option(
+        None, "--fuente", help=f"Fuente a descargar (varias veces); opciones: {FUENTES_AYUDA}"
+    ),
+    workers: int = typer.Option(download_data.MAX_WORKERS, help="Peticiones HTTP simultáneas"),
+    bulk: bool = typer.Option(True, help="Una petición por cubo en lugar de una por estado"),
+    cache: bool = typer.Option(True, help="Usar la caché de respuestas HTTP"),
+    incremental: bool = typer.Option(False, help="Pedir sólo los periodos nuevos"),
+    municipal: bool = typer.Option(False, help="Cubos con corte municipal (remesas)"),
+    fmt: str | None = typer.Option(None, "--format", help="parquet, feather o csv"),
+):
+    """Descarga las fuentes públicas a data/raw"""
+    _set_format(fmt)
+    try:
+        resultados = download(
+            fuente,
+            workers=workers,
+            bulk=bulk,
+            cache=cache,
+            incremental=incremental,
+            municipal=municipal,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--fuente")
+    exitosas = sum(resultados.values())
+    logger.info(f"{exitosas}/{len(resultados)} fuentes descargadas")
+    if not exitosas:
+        raise typer.Exit(code=1)
+    logger.success("Descarga completa.")
+
+
+@app.command("process")
+def process_command(
+    dataset: list[str] | None = typer.Option(
+        None, "--dataset", help=f"Dataset a procesar (varias veces); opciones: {DATASETS_AYUDA}"
+    ),
+    raw_dir: Path = typer.Option(RAW_DATA_DIR, help="Directorio de los crudos"),
+    output_dir: Path = typer.Option(
+        PROCESSED_DATA_DIR, help="Directorio de las tablas procesadas"
+    ),
+    interim_dir: Path = typer.Option(INTERIM_DATA_DIR, help="Directorio de las tablas de detalle"),
+    fmt: str | None = typer.Option(None, "--format", help="parquet, feather o csv"),
+):
+    """Procesa los crudos y guarda las tablas tidy por estado y periodo"""
+    _set_format(fmt)
+    try:
+        crudos = load_raw(dataset, raw_dir=raw_dir)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--dataset")
+    procesados = process(crudos, output_dir=output_dir, interim_dir=interim_dir)
+    logger.info(f"{len(procesados)}/{len(dataset or process_data.PROCESADOS)} datasets procesados")
+    if not procesados:
+        raise typer.Exit(code=1)
+    logger.success(f"Tablas procesadas guardadas en {output_dir}")
+
+
+@app.command("consolidate")
+def consolidate_command(
+    processed_dir: Path = typer.Option(
+        PROCESSED_DATA_DIR, help="Directorio de las tablas procesadas"
+    ),
+    output_path: Path = typer.Option(
+        PROCESSED_DATA_DIR / process_data.CONSOLIDADO_FILE,
+        help="Dataset consolidado (nombre lógico .csv)",
+    ),
+    fmt: str | None = typer.Option(None, "--format", help="parquet, feather o csv"),
+):
+    """Consolida las tablas procesadas en un solo dataset"""
+    _set_format(fmt)
+    df = consolidate(processed_dir=processed_dir, output_path=output_path)
+    if df is None:
+        raise typer.Exit(code=1)
+    logger.success(f"Dataset consolidado: {len(df)} registros, {len(df.columns)} variables")
 
 
-@app.command()
-def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    input_path: Path = RAW_DATA_DIR / "dataset.csv",
-    output_path: Path = PROCESSED_DATA_DIR / "dataset.csv",
-    # ----------------------------------------------
+@app.command("run")
+def run_command(
+    download_first: bool = typer.Option(
+        True, "--download/--no-download", help="Descargar antes de procesar"
+    ),
+    fuente: list[str] | None = typer.Option(None, "--fuente", help="Fuente a descargar"),
+    raw_dir: Path = typer.Option(RAW_DATA_DIR, help="Directorio de los crudos"),
+    save_processed: bool = typer.Option(False, help="Guardar también las tablas procesadas"),
+    output_path: Path = typer.Option(
+        PROCESSED_DATA_DIR / process_data.CONSOLIDADO_FILE,
+        help="Dataset consolidado (nombre lógico .csv)",
+    ),
+    fmt: str | None = typer.Option(None, "--format", help="parquet, feather o csv"),
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Processing dataset...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Processing dataset complete.")
-    # -----------------------------------------
+    """Descarga, procesa y consolida pasando las tablas en memoria"""
+    _set_format(fmt)
+    try:
+        df = run(
+            download_first,
+            fuente,
+            raw_dir=raw_dir,
+            output_dir=PROCESSED_DATA_DIR if save_processed else None,
+            output_path=output_path,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--fuente")
+    if df is None:
+        raise typer.Exit(code=1)
+    logger.success(f"Dataset consolidado: {len(df)} registros, {len(df.columns)} variables")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,383 @@
+"""
+Almacén local de variables: una partición por trimestre bajo data/processed/features/
+
+Cada trimestre se guarda en su propia tabla (periodo=AAAAT/features, en el
+formato configurado de storage.py) con las llaves (Estado_id o Municipio_id,
+Periodo) y una columna por variable. El manifiesto (manifest.json) registra,
+por partición, el hash de definición con que se calculó cada columna (ver
+features.definition_hashes) y el hash de sus datos de origen (el trimestre y
+los anteriores que usan los rezagos).
+
+`update` mantiene el almacén al día:
+
+- trimestres nuevos: se calculan y escriben sólo sus particiones (y las
+  posteriores, si llega un trimestre intermedio, porque sus rezagos cambian)
+- definiciones cambiadas: se recalculan sólo esas columnas (y las que parten
+  de ellas) y se reescriben las particiones afectadas conservando las demás
+  columnas tal cual
+- datos de origen que llegan tarde o se corrigen: se recalculan las columnas
+  que dependen de ellos en las particiones cuya ventana los incluye
+- variables eliminadas: se quitan sus columnas
+
+Lectura con consulta a un momento dado (sin ver datos futuros): `read` y
+`lookup` sólo abren las particiones del rango pedido y sólo leen las
+columnas indicadas.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+from datetime import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import features
+import storage
+
+STORE_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+PARTITION_TABLE = "features.csv"
+# Trimestres hacia atrás que `lookup` busca el último valor de una entidad
+LOOKUP_TOLERANCE = 4
+
+
+def _from_ordinal(ordinal):
+    """Inverso de features._ordinals: trimestre consecutivo -> AAAAT"""
+    return ordinal // 4 * 10 + ordinal % 4 + 1
+
+
+def _partition_name(periodo):
+    return f"periodo={int(periodo)}"
+
+
+class FeatureStore:
+    """Almacén de variables particionado por trimestre en `directorio`"""
+
+    def __init__(self, directorio=features.FEATURE_STORE_DIR, llave="Estado_id"):
+        if llave not in features.ENTIDADES:
+            raise ValueError(
+                f"Llave no soportada: {llave} (opciones: {', '.join(features.ENTIDADES)})"
+            )
+        self.directorio = Path(directorio)
+        self.llave = llave
+        self.definiciones = {}
+        self.ventana = None
+        self.particiones = {}
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Manifiesto
+    # ------------------------------------------------------------------
+
+    @property
+    def manifest_path(self):
+        return self.directorio / MANIFEST_FILE
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                datos = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if datos.get("version") != STORE_VERSION:
+            return
+        if datos.get("llave") != self.llave:
+            raise ValueError(
+                f"El almacén {self.directorio} usa la llave {datos.get('llave')}, no {self.llave}"
+            )
+        self.definiciones = datos.get("definiciones", {})
+        self.ventana = datos.get("ventana")
+        # Las llaves JSON son texto; los periodos se manejan como enteros
+        self.particiones = {int(p): info for p, info in datos.get("particiones", {}).items()}
+
+    def _save(self):
+        """Escribe el manifiesto de forma atómica"""
+        datos = {
+            "version": STORE_VERSION,
+            "llave": self.llave,
+            "definiciones": self.definiciones,
+            "ventana": self.ventana,
+            "particiones": {str(p): self.particiones[p] for p in sorted(self.particiones)},
+        }
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_name(f"{self.manifest_path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.manifest_path)
+
+    def partition_path(self, periodo):
+        """Ruta lógica (.csv) de la tabla de un trimestre"""
+        return self.directorio / _partition_name(periodo) / PARTITION_TABLE
+
+    def periods(self):
+        """Trimestres (AAAAT) guardados, en orden"""
+        return sorted(self.particiones)
+
+    def columns(self):
+        """Variables vigentes del almacén, en el orden de sus definiciones"""
+        return list(self.definiciones)
+
+    def clear(self):
+        """Borra todas las particiones y el manifiesto"""
+        for periodo in self.particiones:
+            shutil.rmtree(self.partition_path(periodo).parent, ignore_errors=True)
+        self.manifest_path.unlink(missing_ok=True)
+        self.definiciones = {}
+        self.ventana = None
+        self.particiones = {}
+
+    # ------------------------------------------------------------------
+    # Escritura incremental
+    # ------------------------------------------------------------------
+
+    def _write_partition(self, periodo, tabla, hashes, entradas):
+        tabla = tabla.sort_values(self.llave).reset_index(drop=True)
+        path = self.partition_path(periodo)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        storage.write_table(tabla, path, dtypes={self.llave: "int32", "Periodo": "int32"})
+        self.particiones[int(periodo)] = {
+            "filas": len(tabla),
+            "columnas": {col: hashes[col] for col in tabla.columns if col in hashes},
+            "entradas": entradas,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    @staticmethod
+    def input_hashes(datos, columnas, ventana):
+        """{periodo: {columna de origen: hash}} de los datos que usa cada partición
+
+        El hash de (periodo, columna) cubre los valores de esa columna de todas
+        las entidades en el trimestre y en los `ventana` trimestres anteriores,
+        así un dato que llega tarde o se corrige invalida también las
+        particiones cuyos rezagos lo usan.
+        """
+        _, entidades, periodos = features.panel_keys(datos)
+        ordinales = features._ordinals(periodos)
+        orden = np.lexsort((entidades, ordinales))
+        ordinales, entidades = ordinales[orden], entidades[orden]
+        unicos, inicios = np.unique(ordinales, return_index=True)
+        limites = np.append(inicios, len(ordinales))
+
+        resultado = {int(_from_ordinal(o)): {} for o in unicos}
+        for col in columnas:
+            filas = pd.util.hash_pandas_object(
+                pd.DataFrame(
+                    {
+                        "entidad": entidades,
+                        "valor": pd.to_numeric(datos[col].to_numpy()[orden], errors="coerce"),
+                    }
+                ),
+                index=False,
+            ).to_numpy()
+            por_trimestre = {
+                int(o): hashlib.sha256(filas[a:b].tobytes()).digest()
+                for o, a, b in zip(unicos, limites[:-1], limites[1:])
+            }
+            for o in por_trimestre:
+                digest = hashlib.sha256()
+                for k in range(o - ventana, o + 1):
+                    digest.update(por_trimestre.get(k, b"-"))
+                resultado[int(_from_ordinal(o))][col] = digest.hexdigest()[:16]
+        return resultado
+
+    def update(self, datos, definiciones=features.FEATURES):
+        """Pone el almacén al día con `datos` (llave, Periodo y columnas de origen)
+
+        Se calculan las particiones nuevas y, en las existentes, las columnas
+        cuya definición cambió o cuyos datos de origen (en el trimestre o en su
+        ventana de rezagos) cambiaron. Regresa {'nuevas': particiones escritas
+        por primera vez, 'actualizadas': particiones reescritas, 'columnas':
+        variables recalculadas en particiones existentes}.
+        """
+        columnas_llave, _, periodos = features.panel_keys(datos)
+        if columnas_llave != [self.llave, "Periodo"]:
+            raise ValueError(f"Los datos deben traer las llaves {self.llave} y Periodo")
+        hashes = features.definition_hashes(definiciones)
+        ventana = max(features.lookbacks(definiciones).values(), default=0)
+        origen = features.source_columns(definiciones)
+        origenes = {
+            f.nombre: features.source_columns(features.required(definiciones, [f.nombre]))
+            for f in definiciones
+        }
+        presentes = set(np.unique(periodos).tolist())
+        resumen = {"nuevas": 0, "actualizadas": 0, "columnas": []}
+
+        # Los datos se comparan con la ventana con que se registraron; las
+        # columnas cuya ventana creció cambian de definición y se recalculan
+        entradas = self.input_hashes(datos, origen, ventana)
+        comparar = entradas
+        if self.ventana is not None and self.ventana != ventana:
+            comparar = self.input_hashes(datos, origen, self.ventana)
+
+        # Columnas por calcular y columnas sobrantes de cada partición
+        pendientes = {}
+        for periodo in presentes:
+            info = self.particiones.get(periodo)
+            if info is None:
+                pendientes[periodo] = (list(hashes), [])
+                continue
+            vigentes, previas = info["columnas"], info.get("entradas", {})
+            cambiadas = [
+                c
+                for c, h in hashes.items()
+                if vigentes.get(c) != h
+                or any(previas.get(o) != comparar[periodo].get(o) for o in origenes[c])
+            ]
+            sobrantes = [c for c in vigentes if c not in hashes]
+            if cambiadas or sobrantes:
+                pendientes[periodo] = (cambiadas, sobrantes)
+        for periodo, info in self.particiones.items():
+            # Sin datos de origen para ese trimestre sólo se quitan las sobrantes
+            sobrantes = [c for c in info["columnas"] if c not in hashes]
+            if periodo not in presentes and sobrantes:
+                pendientes[periodo] = ([], sobrantes)
+
+        calcular = [c for c in hashes if any(c in cols for cols, _ in pendientes.values())]
+        recalculadas = {}
+        if calcular:
+            desde = min(p for p, (cols, _) in pendientes.items() if cols)
+            tabla = features.compute_features(
+                datos, features.required(definiciones, calcular), desde=desde
+            )
+            recalculadas = {int(p): parte for p, parte in tabla.groupby("Periodo")}
+
+        cambiadas = set()
+        for periodo, (columnas, sobrantes) in sorted(pendientes.items()):
+            if len(columnas) == len(hashes):
+                # Partición completa (nueva o con todas sus entradas cambiadas)
+                tabla = recalculadas[periodo][[self.llave, "Periodo"] + list(hashes)]
+            else:
+                tabla = storage.read_table(self.partition_path(periodo))
+                tabla = tabla.drop(columns=sobrantes + [c for c in columnas if c in tabla.columns])
+                if columnas:
+                    parte = recalculadas[periodo].set_index(self.llave)
+                    for col in columnas:
+                        tabla[col] = tabla[self.llave].map(parte[col]).to_numpy(dtype=float)
+                tabla = tabla[[self.llave, "Periodo"] + [c for c in hashes if c in tabla.columns]]
+            if periodo in self.particiones:
+                resumen["actualizadas"] += 1
+                cambiadas.update(columnas)
+            else:
+                resumen["nuevas"] += 1
+            previas = self.particiones.get(periodo, {}).get("entradas", {})
+            self._write_partition(periodo, tabla, hashes, entradas.get(periodo, previas))
+
+        for periodo in presentes:
+            self.particiones[periodo]["entradas"] = entradas[periodo]
+        resumen["columnas"] = [c for c in hashes if c in cambiadas]
+        self.definiciones = hashes
+        self.ventana = ventana
+        self._save()
+        return resumen
+
+    # ------------------------------------------------------------------
+    # Lectura a un momento dado
+    # ------------------------------------------------------------------
+
+    def _check_columns(self, columnas):
+        if columnas is None:
+            return self.columns()
+        desconocidas = set(columnas) - set(self.definiciones)
+        if desconocidas:
+            raise KeyError(f"Variables no encontradas en el almacén: {sorted(desconocidas)}")
+        return list(columnas)
+
+    def read(self, columnas=None, desde=None, hasta=None, entidades=None):
+        """Variables de los trimestres `desde`..`hasta` (AAAAT, inclusive)
+
+        Sólo se abren las particiones del rango y sólo se leen las llaves y
+        las `columnas` pedidas (default: todas); `entidades` filtra por la
+        llave de entidad.
+        """
+        columnas = self._check_columns(columnas)
+        periodos = [
+            p
+            for p in self.periods()
+            if (desde is None or p >= desde) and (hasta is None or p <= hasta)
+        ]
+        partes = []
+        for periodo in periodos:
+            parte = storage.read_table(
+                self.partition_path(periodo), columns=[self.llave, "Periodo"] + columnas
+            )
+            if entidades is not None:
+                parte = parte[parte[self.llave].isin(entidades)]
+            partes.append(parte)
+        if not partes:
+            return pd.DataFrame(columns=[self.llave, "Periodo"] + columnas)
+        return pd.concat(partes, ignore_index=True)
+
+    def as_of(self, periodo, columnas=None, entidades=None, tolerancia=LOOKUP_TOLERANCE):
+        """Último valor de cada entidad con Periodo <= `periodo` (una fila por entidad)
+
+        Sólo se abren las particiones de los `tolerancia` trimestres previos.
+        """
+        columnas = self._check_columns(columnas)
+        inicio = int(features._ordinals([periodo])[0]) - tolerancia
+        tabla = self.read(
+            columnas, desde=_from_ordinal(inicio), hasta=periodo, entidades=entidades
+        )
+        tabla = tabla.sort_values("Periodo").groupby(self.llave).tail(1)
+        return (
+            tabla.rename(columns={"Periodo": "Periodo_variables"})
+            .sort_values(self.llave)
+            .reset_index(drop=True)
+        )
+
+    def lookup(self, eventos, columnas=None, tolerancia=LOOKUP_TOLERANCE):
+        """Une a cada evento (llave, Periodo) las variables vigentes en ese trimestre
+
+        Para cada fila de `eventos` se toma la partición más reciente con
+        Periodo <= el del evento y a lo más `tolerancia` trimestres antes, así
+        nunca se usan datos posteriores al evento. Se leen sólo las
+        particiones de ese rango y las `columnas` pedidas. Regresa `eventos`
+        (mismo orden) con las variables y `Periodo_variables`, el trimestre
+        del que vienen (NaN si no hay).
+        """
+        columnas = self._check_columns(columnas)
+        faltantes = {self.llave, "Periodo"} - set(eventos.columns)
+        if faltantes:
+            raise ValueError(f"Los eventos deben traer las columnas {sorted(faltantes)}")
+        ordinales = features._ordinals(eventos["Periodo"])
+        resultado = eventos.reset_index(drop=True).copy()
+        if resultado.empty:
+            for col in ["Periodo_variables"] + columnas:
+                resultado[col] = pd.Series(dtype=float)
+            return resultado
+
+        # Rango de trimestres a abrir: desde el más antiguo que puede servir
+        desde = _from_ordinal(int(ordinales.min()) - tolerancia)
+        tabla = self.read(
+            columnas,
+            desde=desde,
+            hasta=int(eventos["Periodo"].max()),
+            entidades=eventos[self.llave].unique(),
+        )
+        tabla = tabla.rename(columns={"Periodo": "Periodo_variables"})
+        tabla["_ord"] = features._ordinals(tabla["Periodo_variables"])
+        tabla[self.llave] = tabla[self.llave].astype(np.int64)
+
+        izquierda = pd.DataFrame(
+            {
+                self.llave: resultado[self.llave].to_numpy().astype(np.int64),
+                "_ord": ordinales,
+                "_fila": np.arange(len(resultado)),
+            }
+        )
+        unidos = pd.merge_asof(
+            izquierda.sort_values("_ord"),
+            tabla.sort_values("_ord"),
+            on="_ord",
+            by=self.llave,
+            direction="backward",
+            tolerance=tolerancia,
+        ).sort_values("_fila")
+        for col in ["Periodo_variables"] + columnas:
+            resultado[col] = unidos[col].to_numpy()
+        return resultado
@@ -1,28 +1,333 @@
+"""
+Variables del panel estado × trimestre a partir de datos_consolidados
+
+Las variables se declaran en FEATURES (ver `lag`, `growth`, `rolling_mean`,
+`volatility` y `ratio`) y se calculan todas juntas sobre una matriz densa
+trimestre × estado: cada columna de origen se coloca en su celda (los
+trimestres faltantes quedan como NaN, así un rezago de 4 es siempre el mismo
+trimestre del año anterior) y cada operación es un `shift` / `rolling` de
+pandas sobre la matriz completa, sin ciclos por estado.
+
+Una variable puede partir de otra declarada antes (por ejemplo, la
+volatilidad del crecimiento trimestral); el rezago máximo de la cadena
+determina cuántos trimestres anteriores se necesitan.
+
+Las variables se guardan en el almacén de feature_store.py: una partición
+por trimestre y un hash de definición por columna, así cada corrida sólo
+calcula los trimestres nuevos y las columnas cuya definición cambió.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+from dataclasses import asdict, dataclass
+import hashlib
+import json
 from pathlib import Path
 
 from loguru import logger
-from tqdm import tqdm
+import numpy as np
+import pandas as pd
 import typer
 
-from Seguridad y desarrollo.config import PROCESSED_DATA_DIR
+from config import PROCESSED_DATA_DIR
+import keys
+import storage
 
 app = typer.Typer()
 
+KEY_COLUMNS = ["Estado", "Año", "Trimestre"]
+# Llaves enteras de panel: entidad (clave INEGI) y periodo AAAAT
+ENTIDADES = ("Estado_id", "Municipio_id")
+FEATURE_STORE_DIR = PROCESSED_DATA_DIR / "features"
+OPERACIONES = ("lag", "crecimiento", "media_movil", "volatilidad", "razon")
+
+
+@dataclass(frozen=True)
+class Feature:
+    """Variable declarativa: `operacion` sobre `columna`
+
+    - lag: valor de `periodos` trimestres antes
+    - crecimiento: x / x(t - periodos) - 1 (NaN si la base es 0)
+    - media_movil / volatilidad: media / desviación estándar de los últimos
+      `periodos` trimestres (NaN si falta alguno)
+    - razon: columna / denominador × escala (NaN si el denominador es 0)
+    """
+
+    nombre: str
+    operacion: str
+    columna: str
+    periodos: int = 1
+    denominador: str | None = None
+    escala: float = 1.0
+
+    def __post_init__(self):
+        if self.operacion not in OPERACIONES:
+            raise ValueError(
+                f"Operación no soportada: {self.operacion} (opciones: {', '.join(OPERACIONES)})"
+            )
+        if self.operacion == "razon" and self.denominador is None:
+            raise ValueError(f"La razón {self.nombre} necesita denominador")
+        if self.periodos < 1:
+            raise ValueError(f"{self.nombre}: periodos debe ser al menos 1")
+
+    @property
+    def rezago(self):
+        """Trimestres anteriores que usa la operación (sin contar su origen)"""
+        if self.operacion in ("lag", "crecimiento"):
+            return self.periodos
+        if self.operacion in ("media_movil", "volatilidad"):
+            return self.periodos - 1
+        return 0
+
+
+def _corto(columna):
+    return columna.split("_")[0]
+
+
+def lag(columna, periodos=1, nombre=None):
+    return Feature(nombre or f"{_corto(columna)}_lag{periodos}", "lag", columna, periodos)
+
+
+def growth(columna, periodos=1, nombre=None):
+    """Crecimiento trimestral (periodos=1) o anual (periodos=4)"""
+    sufijo = {1: "trimestral", 4: "anual"}.get(periodos, f"{periodos}t")
+    return Feature(nombre or f"{_corto(columna)}_crec_{sufijo}", "crecimiento", columna, periodos)
+
+
+def rolling_mean(columna, ventana=4, nombre=None):
+    return Feature(
+        nombre or f"{_corto(columna)}_media_{ventana}t", "media_movil", columna, ventana
+    )
+
+
+def volatility(columna, ventana=4, nombre=None):
+    return Feature(
+        nombre or f"{_corto(columna)}_volatilidad_{ventana}t", "volatilidad", columna, ventana
+    )
+
+
+def ratio(numerador, denominador, escala=1.0, nombre=None):
+    return Feature(
+        nombre or f"{_corto(numerador)}_por_{_corto(denominador)}",
+        "razon",
+        numerador,
+        denominador=denominador,
+        escala=escala,
+    )
+
+
+FEATURES = [
+    # Crecimiento trimestral y anual (el gasto es anual: sólo crecimiento anual)
+    growth("IED_millones_usd", 1),
+    growth("IED_millones_usd", 4),
+    growth("Salario_mensual_pesos", 1),
+    growth("Salario_mensual_pesos", 4),
+    growth("PEA_personas", 4),
+    growth("Remesas_millones_usd", 1),
+    growth("Remesas_millones_usd", 4),
+    growth("Gasto_ejecutado_pesos", 4),
+    # Rezagos
+    lag("IED_millones_usd", 1),
+    lag("IED_millones_usd", 4),
+    lag("Remesas_millones_usd", 1),
+    lag("Remesas_millones_usd", 4),
+    # Medias móviles y volatilidad (del nivel y del crecimiento trimestral)
+    rolling_mean("IED_millones_usd", 4),
+    rolling_mean("Remesas_millones_usd", 4),
+    rolling_mean("Salario_mensual_pesos", 4),
+    volatility("IED_crec_trimestral", 4),
+    volatility("Remesas_crec_trimestral", 4),
+    volatility("Salario_mensual_pesos", 4),
+    # Razones por persona de la PEA
+    ratio("Remesas_millones_usd", "PEA_personas", 1e6, nombre="Remesas_usd_por_PEA"),
+    ratio("IED_millones_usd", "PEA_personas", 1e6, nombre="IED_usd_por_PEA"),
+    ratio("Gasto_ejecutado_pesos", "PEA_personas", nombre="Gasto_pesos_por_trabajador"),
+]
+
+
+def lookbacks(definiciones=FEATURES):
+    """{variable: trimestres anteriores que necesita}, incluyendo su cadena de origen"""
+    rezagos = {}
+    for f in definiciones:
+        if f.nombre in rezagos:
+            raise ValueError(f"Variable repetida: {f.nombre}")
+        origen = max(rezagos.get(f.columna, 0), rezagos.get(f.denominador, 0))
+        rezagos[f.nombre] = origen + f.rezago
+    return rezagos
+
+
+def source_columns(definiciones=FEATURES):
+    """Columnas de datos_consolidados que usan las variables"""
+    nombres = {f.nombre for f in definiciones}
+    columnas = []
+    for f in definiciones:
+        for col in (f.columna, f.denominador):
+            if col is not None and col not in nombres and col not in columnas:
+                columnas.append(col)
+    return columnas
+
+
+def definition_hashes(definiciones=FEATURES):
+    """{variable: hash} de cada definición, incluyendo las de su cadena de origen"""
+    hashes = {}
+    for f in definiciones:
+        origen = {col: hashes[col] for col in (f.columna, f.denominador) if col in hashes}
+        texto = json.dumps({"definicion": asdict(f), "origen": origen}, sort_keys=True)
+        hashes[f.nombre] = hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+    return hashes
+
+
+def required(definiciones, nombres):
+    """Definiciones necesarias para calcular `nombres` (con sus orígenes), en orden"""
+    por_nombre = {f.nombre: f for f in definiciones}
+    necesarias = set()
+    pendientes = list(nombres)
+    while pendientes:
+        nombre = pendientes.pop()
+        if nombre in necesarias or nombre not in por_nombre:
+            continue
+        necesarias.add(nombre)
+        pendientes += [por_nombre[nombre].columna, por_nombre[nombre].denominador]
+    return [f for f in definiciones if f.nombre in necesarias]
+
+
+def panel_keys(df):
+    """(columnas llave, entidades, periodos AAAAT) de una tabla
+
+    Acepta llaves enteras (Estado_id o Municipio_id + Periodo) o las de
+    datos_consolidados (Estado / Año / Trimestre).
+    """
+    for llave in ENTIDADES:
+        if llave in df.columns and "Periodo" in df.columns:
+            return (
+                [llave, "Periodo"],
+                df[llave].to_numpy().astype(np.int64),
+                df["Periodo"].to_numpy().astype(np.int64),
+            )
+    llaves = keys.encode_keys(df[KEY_COLUMNS])
+    return (
+        KEY_COLUMNS,
+        llaves["Estado"].to_numpy().astype(np.int64),
+        llaves["Periodo"].to_numpy().astype(np.int64),
+    )
+
+
+def to_panel(consolidado, definiciones=FEATURES):
+    """datos_consolidados con llaves enteras (Estado_id, Periodo) y sólo las columnas de origen"""
+    llaves = keys.encode_keys(consolidado[KEY_COLUMNS])
+    panel = pd.DataFrame(
+        {
+            "Estado_id": keys.estado_ids(llaves["Estado"].to_numpy()).astype(np.int16),
+            "Periodo": llaves["Periodo"].to_numpy().astype(np.int32),
+        }
+    )
+    for col in source_columns(definiciones):
+        panel[col] = consolidado[col].to_numpy()
+    return panel
+
+
+def _ordinals(periodos):
+    """Trimestres consecutivos como enteros (AAAAT -> AAAA × 4 + T - 1)"""
+    periodos = np.asarray(periodos, dtype=np.int64)
+    return periodos // 10 * 4 + periodos % 10 - 1
+
+
+def _apply(f, valores):
+    x = valores[f.columna]
+    if f.operacion == "lag":
+        return x.shift(f.periodos)
+    if f.operacion == "crecimiento":
+        base = x.shift(f.periodos)
+        return (x / base.where(base != 0) - 1).replace([np.inf, -np.inf], np.nan)
+    if f.operacion == "media_movil":
+        return x.rolling(f.periodos, min_periods=f.periodos).mean()
+    if f.operacion == "volatilidad":
+        return x.rolling(f.periodos, min_periods=f.periodos).std()
+    denominador = valores[f.denominador]
+    return x / denominador.where(denominador != 0) * f.escala
+
+
+def compute_features(df, definiciones=FEATURES, desde=None):
+    """Variables de las filas de `df` (llaves de panel_keys + columnas de origen)
+
+    Con `desde` (periodo AAAAT) sólo se regresan las filas de ese trimestre
+    en adelante y sólo se leen los trimestres anteriores que hacen falta.
+    Las filas salen en el orden de `df`, con sus mismas columnas llave.
+    """
+    faltantes = set(source_columns(definiciones)) - set(df.columns)
+    if faltantes:
+        raise ValueError(f"Faltan columnas de origen: {sorted(faltantes)}")
+    columnas_llave, entidades, periodos = panel_keys(df)
+    ordinales = _ordinals(periodos)
+
+    filas = np.arange(len(df))
+    if desde is not None:
+        inicio = int(_ordinals([desde])[0])
+        necesarias = ordinales >= inicio - max(lookbacks(definiciones).values(), default=0)
+        filas, entidades, ordinales = (
+            filas[necesarias],
+            entidades[necesarias],
+            ordinales[necesarias],
+        )
+    if not len(filas):
+        return pd.DataFrame(columns=columnas_llave + [f.nombre for f in definiciones])
+
+    # Matriz densa trimestre × entidad; cada fila de df es una celda
+    indices, unicas = pd.factorize(entidades)
+    primero = int(ordinales.min())
+    n_entidades = len(unicas)
+    n_trimestres = int(ordinales.max()) - primero + 1
+    celdas = (ordinales - primero) * n_entidades + indices
+    if len(np.unique(celdas)) != len(celdas):
+        raise ValueError("Hay llaves (entidad, periodo) repetidas")
+
+    valores = {}
+    for col in source_columns(definiciones):
+        matriz = np.full(n_trimestres * n_entidades, np.nan)
+        matriz[celdas] = pd.to_numeric(df[col].iloc[filas], errors="coerce").to_numpy(
+            dtype=float, na_value=np.nan
+        )
+        valores[col] = pd.DataFrame(matriz.reshape(n_trimestres, n_entidades))
+    for f in definiciones:
+        valores[f.nombre] = _apply(f, valores)
+
+    salida = filas if desde is None else filas[ordinales >= inicio]
+    celdas_salida = celdas if desde is None else celdas[ordinales >= inicio]
+    resultado = df[columnas_llave].iloc[salida].reset_index(drop=True)
+    for f in definiciones:
+        resultado[f.nombre] = valores[f.nombre].to_numpy().ravel()[celdas_salida]
+    return resultado
+
 
 @app.command()
 def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    input_path: Path = PROCESSED_DATA_DIR / "dataset.csv",
-    output_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    # -----------------------------------------
+    input_path: Path = PROCESSED_DATA_DIR / "datos_consolidados.csv",
+    store_dir: Path = FEATURE_STORE_DIR,
+    full: bool = typer.Option(False, help="Recalcular todas las particiones"),
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Generating features from dataset...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Features generation complete.")
-    # -----------------------------------------
+    """Actualiza el almacén de variables del panel estado × trimestre"""
+    # feature_store importa este módulo (motor de cálculo)
+    from feature_store import FeatureStore
+
+    if not storage.table_exists(input_path):
+        logger.error(f"No existe {input_path}; ejecutar primero el procesamiento")
+        raise typer.Exit(code=1)
+    panel = to_panel(storage.read_table(input_path))
+    store = FeatureStore(store_dir, llave="Estado_id")
+    if full:
+        store.clear()
+
+    logger.info(f"Calculando {len(FEATURES)} variables sobre {len(panel)} filas...")
+    resumen = store.update(panel, FEATURES)
+    if not (resumen["nuevas"] or resumen["actualizadas"]):
+        logger.success("Variables al día: no hay trimestres nuevos ni definiciones cambiadas.")
+        return
+    logger.success(
+        f"Almacén actualizado en {store_dir}: {resumen['nuevas']} particiones nuevas, "
+        f"{resumen['actualizadas']} actualizadas"
+        + (f" (columnas: {', '.join(resumen['columnas'])})" if resumen["columnas"] else "")
+    )
 
 
 if __name__ == "__main__":
@@ -1,29 +1,198 @@
+"""
+Predicción del índice por lotes y en streaming con el modelo de train.py
+
+El modelo (models/model.pkl) es un pickle pequeño: los parámetros de la
+regresión son cuatro vectores del tamaño del número de variables. `load_model`
+lo lee una sola vez por proceso y lo guarda en una caché que se invalida si el
+archivo cambia (tamaño o fecha de modificación).
+
+- `score_file`: califica test_features (CSV, Parquet o Feather) por bloques de
+  tamaño fijo y escribe cada bloque a un archivo parcial que al final se
+  publica en el formato configurado; en memoria sólo hay un bloque a la vez,
+  sin importar cuántos municipios o periodos se califiquen.
+- `predict_batches`: un arreglo de predicciones por cada DataFrame de un flujo.
+- `predict_stream`: una predicción por cada registro (dict o Series) de un
+  flujo; los registros se agrupan en bloques de `tamano` para calificarlos
+  juntos (tamano=1 califica cada registro en cuanto llega).
+
+Uso (desde "Seguridad y desarrollo", donde están config.py y features.py):
+    python -m modeling.predict
+    python -m modeling.predict --features-path ../data/processed/test_features.parquet
+
+    from modeling.predict import predict_stream
+    for prediccion in predict_stream(registros):
+        ...
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+from collections.abc import Mapping
 from pathlib import Path
+import pickle
+import threading
 
 from loguru import logger
-from tqdm import tqdm
+import numpy as np
+import pandas as pd
 import typer
 
-from Seguridad y desarrollo.config import MODELS_DIR, PROCESSED_DATA_DIR
+from config import MODELS_DIR, PROCESSED_DATA_DIR
+import features
+from modeling import train
+import storage
+from streaming import ColumnarBatchWriter
 
 app = typer.Typer()
 
+MODEL_PATH = MODELS_DIR / "model.pkl"
+DEFAULT_CHUNK_SIZE = 50_000
+PREDICTION_COLUMN = "Prediccion"
+# Columnas llave que se copian de las variables a las predicciones
+KEY_COLUMNS = list(features.ENTIDADES) + ["Periodo"] + features.KEY_COLUMNS
+
+_MODELOS = {}
+_lock = threading.Lock()
+
+
+def load_model(path=MODEL_PATH):
+    """Modelo de train.py, cacheado en el proceso mientras el archivo no cambie"""
+    path = Path(path).resolve()
+    info = path.stat()
+    firma = (info.st_size, info.st_mtime_ns)
+    with _lock:
+        cacheado = _MODELOS.get(path)
+        if cacheado is not None and cacheado[0] == firma:
+            return cacheado[1]
+        with open(path, "rb") as f:
+            modelo = pickle.load(f)
+        if modelo.get("tipo") != "ridge" or modelo.get("version") != train.MODEL_VERSION:
+            raise ValueError(
+                f"{path} no es un modelo de train.py "
+                f"(tipo {modelo.get('tipo')}, versión {modelo.get('version')})"
+            )
+        _MODELOS[path] = (firma, modelo)
+    return modelo
+
+
+def clear_cache():
+    """Olvida los modelos cargados"""
+    with _lock:
+        _MODELOS.clear()
+
+
+def _resolve(modelo, model_path):
+    return load_model(model_path) if modelo is None else modelo
+
+
+def predict_frame(df, modelo=None, model_path=MODEL_PATH):
+    """Predicciones para las filas de un DataFrame con las variables del modelo"""
+    modelo = _resolve(modelo, model_path)
+    faltantes = [col for col in modelo["columnas"] if col not in df.columns]
+    if faltantes:
+        raise KeyError(f"Faltan variables del modelo: {faltantes}")
+    X = (
+        df[modelo["columnas"]]
+        .apply(pd.to_numeric, errors="coerce")
+        .to_numpy(dtype=np.float64, na_value=np.nan)
+    )
+    return train.predict_ridge(modelo["parametros"], X)
+
+
+def predict_batches(lotes, modelo=None, model_path=MODEL_PATH):
+    """Generador: un arreglo de predicciones por cada DataFrame de `lotes`"""
+    modelo = _resolve(modelo, model_path)
+    for lote in lotes:
+        yield predict_frame(lote, modelo)
+
+
+def predict_stream(filas, modelo=None, model_path=MODEL_PATH, tamano=DEFAULT_CHUNK_SIZE):
+    """Generador: una predicción por cada registro de `filas`, en orden
+
+    Los registros son diccionarios o Series con las variables del modelo;
+    las variables ausentes cuentan como faltantes (se imputan como en el
+    entrenamiento).
+    """
+    modelo = _resolve(modelo, model_path)
+    columnas = modelo["columnas"]
+    bloque = []
+    for fila in filas:
+        bloque.append(fila if isinstance(fila, Mapping) else dict(fila))
+        if len(bloque) >= tamano:
+            yield from predict_frame(pd.DataFrame(bloque, columns=columnas), modelo)
+            bloque = []
+    if bloque:
+        yield from predict_frame(pd.DataFrame(bloque, columns=columnas), modelo)
+
+
+def score_file(
+    features_path, predictions_path, modelo=None, model_path=MODEL_PATH, tamano=DEFAULT_CHUNK_SIZE
+):
+    """Califica una tabla de variables por bloques; regresa las filas escritas
+
+    Las predicciones se guardan con las columnas llave de la tabla (si las
+    tiene) y PREDICTION_COLUMN, en el formato configurado.
+    """
+    modelo = _resolve(modelo, model_path)
+    disponibles = storage.table_columns(features_path)
+    faltantes = [col for col in modelo["columnas"] if col not in disponibles]
+    if faltantes:
+        raise KeyError(f"{features_path} no tiene las variables del modelo: {faltantes}")
+    llaves = [col for col in KEY_COLUMNS if col in disponibles]
+
+    predictions_path = Path(predictions_path)
+    predictions_path.parent.mkdir(parents=True, exist_ok=True)
+    writer = ColumnarBatchWriter(
+        predictions_path.with_name(f"{predictions_path.name}.parcial"),
+        columns=llaves + [PREDICTION_COLUMN],
+    )
+    try:
+        with writer:
+            for bloque in storage.iter_table(
+                features_path, columns=llaves + modelo["columnas"], chunksize=tamano
+            ):
+                salida = {col: bloque[col].to_numpy() for col in llaves}
+                salida[PREDICTION_COLUMN] = predict_frame(bloque, modelo)
+                writer.append_columns(salida)
+    except BaseException:
+        Path(writer.path).unlink(missing_ok=True)
+        raise
+    if writer.columns is None:
+        # Tabla vacía: sólo el encabezado
+        pd.DataFrame(columns=llaves + [PREDICTION_COLUMN]).to_csv(writer.path, index=False)
+    storage.convert_csv(
+        writer.path,
+        predictions_path,
+        dtypes={col: "int32" for col in llaves if col in features.ENTIDADES or col == "Periodo"},
+    )
+    return writer.rows
+
 
 @app.command()
 def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
     features_path: Path = PROCESSED_DATA_DIR / "test_features.csv",
-    model_path: Path = MODELS_DIR / "model.pkl",
+    model_path: Path = MODEL_PATH,
     predictions_path: Path = PROCESSED_DATA_DIR / "test_predictions.csv",
-    # -----------------------------------------
+    tamano: int = typer.Option(DEFAULT_CHUNK_SIZE, "--chunk-size", help="Filas por bloque"),
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Performing inference for model...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Inference complete.")
-    # -----------------------------------------
+    """Califica test_features por bloques con el modelo entrenado"""
+    if not model_path.exists():
+        logger.error(f"No existe {model_path}; ejecutar primero modeling.train")
+        raise typer.Exit(code=1)
+    if not storage.table_exists(features_path):
+        logger.error(f"No existe {features_path}")
+        raise typer.Exit(code=1)
+    try:
+        modelo = load_model(model_path)
+        logger.info(
+            f"Calificando {storage.find_table(features_path)} en bloques de {tamano} "
+            f"filas ({len(modelo['columnas'])} variables)..."
+        )
+        filas = score_file(features_path, predictions_path, modelo, tamano=tamano)
+    except (KeyError, ValueError) as e:
+        logger.error(str(e))
+        raise typer.Exit(code=1)
+    logger.success(f"{filas} predicciones guardadas en {storage.find_table(predictions_path)}")
 
 
 if __name__ == "__main__":
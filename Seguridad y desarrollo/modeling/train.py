@@ -1,29 +1,471 @@
+"""
+Entrenamiento del modelo del índice de desarrollo y seguridad
+
+Las etiquetas (labels.csv: Estado_id o Municipio_id, Periodo y la columna
+objetivo) se unen con las variables del almacén (feature_store.py) con una
+consulta a un momento dado: la etiqueta del trimestre t usa las variables
+vigentes en t - horizonte, así el modelo nunca ve datos posteriores.
+
+Validación cruzada de ventana creciente por trimestre: cada pliegue entrena
+con todos los trimestres anteriores a su bloque de prueba (`bloque`
+trimestres consecutivos) y los pliegues avanzan hasta el último trimestre.
+
+Modelo: regresión ridge en NumPy (variables estandarizadas e imputadas con
+la media o con cero según el candidato); la búsqueda recorre la malla de
+`alpha` × imputación. Cada par (candidato, pliegue) es una tarea del pool de
+procesos (uno por núcleo disponible); los datos se pasan una sola vez a cada
+proceso en su inicializador. Antes se mide un ajuste en el proceso principal:
+si con ese costo la búsqueda tardaría menos de PARALLEL_MIN_SECONDS, todo
+corre ahí sin levantar procesos. Los resultados se guardan en una caché JSON
+indexada por el hash de los datos, el pliegue y el candidato, así un
+candidato ya evaluado no se vuelve a ajustar. El mejor candidato (menor RMSE promedio) se reentrena
+con todos los datos y se guarda en models/model.pkl.
+
+Uso (desde "Seguridad y desarrollo", donde están config.py y features.py):
+    python -m modeling.train --target Indice_desarrollo_seguridad
+    python -m modeling.train --alpha 0.1 --alpha 1 --workers 4
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import itertools
+import json
+import os
 from pathlib import Path
+import pickle
+import time
 
 from loguru import logger
-from tqdm import tqdm
+import numpy as np
+import pandas as pd
 import typer
 
-from Seguridad y desarrollo.config import MODELS_DIR, PROCESSED_DATA_DIR
+from config import MODELS_DIR, PROCESSED_DATA_DIR
+import feature_store
+import features
+import keys
+import storage
 
 app = typer.Typer()
 
+TARGET = "Indice_desarrollo_seguridad"
+MODEL_VERSION = 1
+ALPHAS = (0.01, 0.1, 1.0, 10.0, 100.0)
+IMPUTACIONES = ("media", "cero")
+DEFAULT_FOLDS = 5
+DEFAULT_BLOCK = 4
+DEFAULT_HORIZON = 1
+# Núcleos disponibles para este proceso (--workers los limita)
+DEFAULT_WORKERS = (
+    len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+)
+# Tiempo estimado de validación por debajo del cual no conviene levantar
+# procesos (cada uno recibe su copia de los datos)
+PARALLEL_MIN_SECONDS = 2.0
+CV_CACHE_FILE = MODELS_DIR / "cv_cache.json"
+
+
+# ----------------------------------------------------------------------
+# Modelo
+# ----------------------------------------------------------------------
+
+
+def fit_ridge(X, y, alpha=1.0, imputacion="media"):
+    """Ajusta una regresión ridge; regresa el modelo como diccionario de arreglos
+
+    Los NaN de X se imputan con la media de entrenamiento (o con cero) y las
+    columnas se estandarizan; las columnas sin variación quedan con
+    coeficiente cero.
+    """
+    if imputacion not in IMPUTACIONES:
+        raise ValueError(
+            f"Imputación no soportada: {imputacion} (opciones: {', '.join(IMPUTACIONES)})"
+        )
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    with np.errstate(all="ignore"):
+        medias = np.nanmean(X, axis=0)
+    relleno = np.nan_to_num(medias) if imputacion == "media" else np.zeros(X.shape[1])
+    X = np.where(np.isnan(X), relleno, X)
+    centro = X.mean(axis=0)
+    escala = X.std(axis=0)
+    escala[escala == 0] = 1.0
+    Z = (X - centro) / escala
+    intercepto = y.mean()
+    coef = np.linalg.solve(Z.T @ Z + alpha * np.eye(Z.shape[1]), Z.T @ (y - intercepto))
+    return {
+        "relleno": relleno,
+        "centro": centro,
+        "escala": escala,
+        "coef": coef,
+        "intercepto": float(intercepto),
+    }
+
+
+def predict_ridge(parametros, X):
+    """Predicciones de un modelo de fit_ridge para las filas de X"""
+    X = np.asarray(X, dtype=np.float64)
+    X = np.where(np.isnan(X), parametros["relleno"], X)
+    return ((X - parametros["centro"]) / parametros["escala"]) @ parametros["coef"] + parametros[
+        "intercepto"
+    ]
+
+
+def metrics(y, prediccion):
+    """RMSE, MAE y R² de una predicción"""
+    error = prediccion - y
+    variacion = ((y - y.mean()) ** 2).sum()
+    return {
+        "rmse": float(np.sqrt(np.mean(error**2))),
+        "mae": float(np.mean(np.abs(error))),
+        "r2": float(1 - (error**2).sum() / variacion) if variacion > 0 else None,
+        "n": len(y),
+    }
+
+
+def candidates(alphas=ALPHAS, imputaciones=IMPUTACIONES):
+    """Malla de hiperparámetros (sin repetidos, en orden)"""
+    malla = []
+    for alpha, imputacion in itertools.product(alphas, imputaciones):
+        candidato = {"alpha": float(alpha), "imputacion": imputacion}
+        if candidato not in malla:
+            malla.append(candidato)
+    return malla
+
+
+# ----------------------------------------------------------------------
+# Datos de entrenamiento
+# ----------------------------------------------------------------------
+
+
+def read_labels(path, objetivo=TARGET):
+    """Etiquetas con llaves enteras (Estado_id o Municipio_id, Periodo) y `objetivo`
+
+    También acepta las llaves de datos_consolidados (Estado / Año / Trimestre).
+    """
+    etiquetas = storage.read_table(path)
+    if objetivo not in etiquetas.columns:
+        raise ValueError(f"{path} no tiene la columna objetivo {objetivo}")
+    for llave in features.ENTIDADES:
+        if llave in etiquetas.columns and "Periodo" in etiquetas.columns:
+            return etiquetas[[llave, "Periodo", objetivo]]
+    llaves = keys.encode_keys(etiquetas[features.KEY_COLUMNS])
+    return pd.DataFrame(
+        {
+            "Estado_id": keys.estado_ids(llaves["Estado"].to_numpy()),
+            "Periodo": llaves["Periodo"].to_numpy(),
+            objetivo: etiquetas[objetivo].to_numpy(),
+        }
+    )
+
+
+def training_frame(store, etiquetas, objetivo=TARGET, columnas=None, horizonte=DEFAULT_HORIZON):
+    """Etiquetas unidas con las variables vigentes `horizonte` trimestres antes
+
+    Se descartan las filas sin objetivo o sin ninguna variable disponible.
+    """
+    llave = etiquetas.columns[0]
+    ordinales = features._ordinals(etiquetas["Periodo"])
+    eventos = pd.DataFrame(
+        {
+            llave: etiquetas[llave].to_numpy(),
+            "Periodo": feature_store._from_ordinal(ordinales - horizonte),
+        }
+    )
+    tabla = store.lookup(eventos, columnas)
+    columnas = [c for c in tabla.columns if c not in (llave, "Periodo", "Periodo_variables")]
+    tabla[llave] = etiquetas[llave].to_numpy()
+    tabla["Periodo"] = etiquetas["Periodo"].to_numpy()
+    tabla[objetivo] = pd.to_numeric(etiquetas[objetivo], errors="coerce").to_numpy()
+    validas = tabla[objetivo].notna() & tabla["Periodo_variables"].notna()
+    return tabla[validas].reset_index(drop=True), columnas
+
+
+def time_series_folds(periodos, n_folds=DEFAULT_FOLDS, bloque=DEFAULT_BLOCK):
+    """Pliegues de ventana creciente: [(trimestres de entrenamiento, de prueba)]
+
+    Los bloques de prueba son los últimos `n_folds` × `bloque` trimestres;
+    cada pliegue entrena con todos los trimestres anteriores a su bloque.
+    """
+    trimestres = np.unique(features._ordinals(periodos))
+    n_folds = min(n_folds, (len(trimestres) - 1) // bloque)
+    if n_folds < 1:
+        raise ValueError(
+            f"Se necesitan al menos {bloque + 1} trimestres para validar (hay {len(trimestres)})"
+        )
+    pliegues = []
+    for i in range(n_folds, 0, -1):
+        inicio = len(trimestres) - i * bloque
+        pliegues.append(
+            (
+                int(trimestres[0]),
+                int(trimestres[inicio - 1]),
+                int(trimestres[inicio]),
+                int(trimestres[inicio + bloque - 1]),
+            )
+        )
+    return pliegues
+
+
+def data_hash(X, y, ordinales):
+    digest = hashlib.sha256()
+    for arreglo in (X, y, ordinales):
+        digest.update(np.ascontiguousarray(arreglo).tobytes())
+    return digest.hexdigest()[:16]
+
+
+# ----------------------------------------------------------------------
+# Validación cruzada en paralelo
+# ----------------------------------------------------------------------
+
+_DATOS = {}
+
+
+def _init_worker(X, y, ordinales):
+    """Recibe los datos una sola vez por proceso"""
+    _DATOS.update(X=X, y=y, ordinales=ordinales)
+
+
+def _evaluate(candidato, pliegue):
+    """Ajusta el candidato en el pliegue y lo evalúa (corre en el proceso hijo)"""
+    X, y, ordinales = _DATOS["X"], _DATOS["y"], _DATOS["ordinales"]
+    _, fin_train, inicio_test, fin_test = pliegue
+    entrenamiento = ordinales <= fin_train
+    prueba = (ordinales >= inicio_test) & (ordinales <= fin_test)
+    inicio = time.perf_counter()
+    modelo = fit_ridge(X[entrenamiento], y[entrenamiento], **candidato)
+    resultado = metrics(y[prueba], predict_ridge(modelo, X[prueba]))
+    resultado["segundos"] = round(time.perf_counter() - inicio, 4)
+    return resultado
+
+
+class CVCache:
+    """Resultados de (datos, pliegue, candidato) guardados en JSON"""
+
+    def __init__(self, path=CV_CACHE_FILE):
+        self.path = Path(path) if path is not None else None
+        self.resultados = {}
+        if self.path is not None and self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.resultados = json.load(f)
+            except json.JSONDecodeError:
+                self.resultados = {}
+
+    @staticmethod
+    def key(datos, pliegue, candidato):
+        texto = json.dumps(
+            {"datos": datos, "pliegue": pliegue, "candidato": candidato, "version": MODEL_VERSION},
+            sort_keys=True,
+        )
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:24]
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.resultados, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+def cross_validate(X, y, ordinales, malla, pliegues, workers=DEFAULT_WORKERS, cache=None):
+    """Evalúa cada candidato en cada pliegue; regresa ([resumen por candidato], ajustes)
+
+    Los pares ya presentes en `cache` no se vuelven a ajustar. El resumen
+    trae el candidato, el RMSE / MAE / R² promedio y las métricas por pliegue.
+    """
+    cache = cache or CVCache(None)
+    datos = data_hash(X, y, ordinales)
+    # Una tarea por par (candidato, pliegue) pendiente
+    tareas = [
+        (candidato, pliegue)
+        for candidato in malla
+        for pliegue in pliegues
+        if CVCache.key(datos, pliegue, candidato) not in cache.resultados
+    ]
+
+    if tareas:
+        # Un solo ajuste en este proceso mide el costo por tarea: si el resto
+        # tarda menos que levantar el pool, tampoco se paraleliza
+        _init_worker(X, y, ordinales)
+        try:
+            inicio = time.perf_counter()
+            resultados = [_evaluate(*tareas[0])]
+            por_tarea = time.perf_counter() - inicio
+            restantes = tareas[1:]
+            workers = max(1, min(workers, len(restantes)))
+            if workers == 1 or por_tarea * len(restantes) < PARALLEL_MIN_SECONDS:
+                resultados += [_evaluate(*tarea) for tarea in restantes]
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_worker, initargs=(X, y, ordinales)
+                ) as pool:
+                    # Bloques chicos: los pliegues tardíos entrenan con más filas y
+                    # así ningún proceso se queda con todos ellos
+                    resultados += pool.map(
+                        _evaluate,
+                        *zip(*restantes, strict=True),
+                        chunksize=max(1, len(restantes) // (workers * 4)),
+                    )
+        finally:
+            _DATOS.clear()
+        for (candidato, pliegue), resultado in zip(tareas, resultados, strict=True):
+            cache.resultados[CVCache.key(datos, pliegue, candidato)] = resultado
+        cache.save()
+
+    resumen = []
+    for candidato in malla:
+        por_pliegue = [
+            cache.resultados[CVCache.key(datos, pliegue, candidato)] for pliegue in pliegues
+        ]
+        r2 = [r["r2"] for r in por_pliegue if r["r2"] is not None]
+        resumen.append(
+            {
+                "candidato": candidato,
+                "rmse": float(np.mean([r["rmse"] for r in por_pliegue])),
+                "mae": float(np.mean([r["mae"] for r in por_pliegue])),
+                "r2": float(np.mean(r2)) if r2 else None,
+                "pliegues": por_pliegue,
+            }
+        )
+    return sorted(resumen, key=lambda r: r["rmse"]), len(tareas)
+
+
+def train(
+    store,
+    etiquetas,
+    objetivo=TARGET,
+    columnas=None,
+    horizonte=DEFAULT_HORIZON,
+    malla=None,
+    n_folds=DEFAULT_FOLDS,
+    bloque=DEFAULT_BLOCK,
+    workers=DEFAULT_WORKERS,
+    cache=None,
+):
+    """Búsqueda con validación cruzada y ajuste final; regresa el modelo (diccionario)"""
+    tabla, columnas = training_frame(store, etiquetas, objetivo, columnas, horizonte)
+    if tabla.empty:
+        raise ValueError("No hay etiquetas con variables disponibles para entrenar")
+    llave = etiquetas.columns[0]
+    X = tabla[columnas].to_numpy(dtype=np.float64, na_value=np.nan)
+    y = tabla[objetivo].to_numpy(dtype=np.float64)
+    ordinales = features._ordinals(tabla["Periodo"])
+    pliegues = time_series_folds(tabla["Periodo"], n_folds, bloque)
+    malla = malla or candidates()
+
+    resumen, ajustados = cross_validate(X, y, ordinales, malla, pliegues, workers, cache)
+    mejor = resumen[0]
+    return {
+        "version": MODEL_VERSION,
+        "tipo": "ridge",
+        "objetivo": objetivo,
+        "llave": llave,
+        "columnas": columnas,
+        "horizonte": horizonte,
+        "hiperparametros": mejor["candidato"],
+        "parametros": fit_ridge(X, y, **mejor["candidato"]),
+        "cv": {
+            "pliegues": [
+                {
+                    "entrenamiento": [
+                        feature_store._from_ordinal(p[0]),
+                        feature_store._from_ordinal(p[1]),
+                    ],
+                    "prueba": [
+                        feature_store._from_ordinal(p[2]),
+                        feature_store._from_ordinal(p[3]),
+                    ],
+                }
+                for p in pliegues
+            ],
+            "resultados": [{k: v for k, v in r.items() if k != "pliegues"} for r in resumen],
+            "ajustes": ajustados,
+        },
+        "filas": len(tabla),
+        "periodos": [int(tabla["Periodo"].min()), int(tabla["Periodo"].max())],
+    }
+
+
+def save_model(modelo, path):
+    """Guarda el modelo con pickle de forma atómica"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(modelo, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
 
 @app.command()
 def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
+    store_dir: Path = features.FEATURE_STORE_DIR,
     labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
     model_path: Path = MODELS_DIR / "model.pkl",
-    # -----------------------------------------
+    objetivo: str = typer.Option(TARGET, "--target", help="Columna objetivo de labels"),
+    columna: list[str] | None = typer.Option(
+        None, "--columna", help="Variable del almacén a usar (varias veces; default: todas)"
+    ),
+    horizonte: int = typer.Option(DEFAULT_HORIZON, help="Trimestres entre variables y etiqueta"),
+    folds: int = typer.Option(DEFAULT_FOLDS, help="Pliegues de validación"),
+    bloque: int = typer.Option(DEFAULT_BLOCK, help="Trimestres de prueba por pliegue"),
+    alpha: list[float] | None = typer.Option(None, "--alpha", help="Valores de alpha a probar"),
+    workers: int = typer.Option(DEFAULT_WORKERS, help="Procesos para la validación cruzada"),
+    cache_path: Path = typer.Option(CV_CACHE_FILE, help="Caché de resultados de validación"),
+    cache: bool = typer.Option(True, help="Reutilizar resultados de validación previos"),
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Training some model...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Modeling training complete.")
-    # -----------------------------------------
+    """Entrena el modelo del índice con validación cruzada por trimestre"""
+    if not storage.table_exists(labels_path):
+        logger.error(f"No existe {labels_path} (Estado_id o Municipio_id, Periodo, {objetivo})")
+        raise typer.Exit(code=1)
+    try:
+        etiquetas = read_labels(labels_path, objetivo)
+        store = feature_store.FeatureStore(store_dir, llave=etiquetas.columns[0])
+    except ValueError as e:
+        logger.error(str(e))
+        raise typer.Exit(code=1)
+    if not store.periods():
+        logger.error(f"El almacén {store_dir} está vacío; ejecutar primero features.py")
+        raise typer.Exit(code=1)
+
+    malla = candidates(alpha or ALPHAS)
+    logger.info(
+        f"Entrenando con {len(etiquetas)} etiquetas, {len(malla)} candidatos y "
+        f"{folds} pliegues en {workers} procesos..."
+    )
+    inicio = time.perf_counter()
+    try:
+        modelo = train(
+            store,
+            etiquetas,
+            objetivo,
+            columna,
+            horizonte,
+            malla,
+            folds,
+            bloque,
+            workers,
+            CVCache(cache_path if cache else None),
+        )
+    except (KeyError, ValueError) as e:
+        logger.error(str(e))
+        raise typer.Exit(code=1)
+
+    for resultado in modelo["cv"]["resultados"][:5]:
+        logger.info(
+            f"  {resultado['candidato']}: RMSE {resultado['rmse']:.4f}, MAE {resultado['mae']:.4f}"
+        )
+    logger.info(f"Ajustes nuevos: {modelo['cv']['ajustes']} ({time.perf_counter() - inicio:.2f}s)")
+    save_model(modelo, model_path)
+    logger.success(
+        f"Modelo guardado en {model_path} ({modelo['hiperparametros']}, "
+        f"{modelo['filas']} filas, {len(modelo['columnas'])} variables)"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,568 @@
+"""
+Benchmark del procesamiento con datos sintéticos a varias escalas
+
+Genera archivos crudos con la forma de los de data/raw (ied_raw.csv,
+salario_raw.csv, gasto_raw.csv, ...) a 1×, 10×, 100× y 1000× y mide cada
+etapa del procesamiento:
+
+- read: lectura de cada archivo crudo
+- clean: limpieza y transformación de cada dataset (process_data.py)
+- consolidate: dataset consolidado
+- report: reporte de calidad
+
+Cada medición corre en un proceso nuevo, así el pico de memoria (RSS) es el
+de esa tarea y no el de las anteriores; se registran el tiempo de reloj, el
+tiempo de CPU y el pico de RSS por encima del proceso recién iniciado. Los
+resultados se guardan en JSON y se comparan contra una línea base guardada.
+Los tiempos dependen de la máquina, así que la línea base no se versiona:
+cada máquina genera la suya con --guardar-baseline (con --estricto y sin
+línea base el comando termina con error en lugar de no comparar nada).
+
+Escalas: las tablas estatales crecen en periodos (hasta MAX_FACTOR_PERIODOS
+veces, porque los años deben tener 4 dígitos); el resto del factor se aplica a
+los municipios de las remesas municipales, a los indicadores INEGI y a los
+grupos funcionales del gasto, así las tablas que pueden crecer lo hacen en el
+factor completo.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+import periods
+import process_data
+import storage
+from download_data import RAW_DTYPES, RAW_FILES
+from keys import ETIQUETAS_IDS, ESTADOS_IDS
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+BENCHMARK_DIR = BASE_DIR / "reports" / "benchmarks"
+BASELINE_FILE = BENCHMARK_DIR / "baseline.json"
+
+ESCALAS = (1, 10, 100, 1000)
+ETAPAS = ('read', 'clean', 'consolidate', 'report')
+MAX_FACTOR_PERIODOS = 100
+
+# Tamaño 1× (el de los archivos actuales de data/raw): primer año y número
+# de trimestres / años de cada tabla
+BASE_TRIMESTRES = {'ied': (1999, 104), 'salario': (2010, 60), 'pea': (2010, 60),
+                   'remesas': (2013, 50), 'remesas_mun': (2013, 50)}
+BASE_GASTO = (2013, 11)
+GRUPOS_FUNCIONALES = ['Gobierno', 'Desarrollo Social', 'Desarrollo Económico',
+                      'Otras no Clasificadas en Funciones Anteriores']
+GASTO_ESTADOS = list(ESTADOS_IDS) + [34, 35]
+MUNICIPIOS_POR_ESTADO = 4
+BASE_INEGI = (2010, 11)
+INEGI_INDICADORES = 7
+INEGI_AREAS = ["0700"] + [f"070000{id_estado:02d}" for id_estado in ESTADOS_IDS]
+
+# Filas por bloque al escribir los archivos generados
+BLOQUE_GENERACION = 500_000
+
+# Tareas de la etapa clean: datasets del registro, remesas municipales e INEGI
+MUNICIPAL = 'Remesas municipal'
+INEGI = 'INEGI'
+
+# Una medición cuenta como regresión si empeora más que la tolerancia y,
+# además, más que estos mínimos absolutos (para ignorar ruido en tareas cortas)
+TOLERANCIA = 0.20
+MINIMO_SEGUNDOS = 0.05
+MINIMO_MB = 5.0
+METRICAS = {'segundos': MINIMO_SEGUNDOS, 'rss_etapa_mb': MINIMO_MB}
+
+
+def scale_factors(escala):
+    """(factor de periodos, factor de municipios / indicadores / grupos)"""
+    periodos = min(escala, MAX_FACTOR_PERIODOS)
+    return periodos, max(1, escala // periodos)
+
+
+def _quarters(ano_inicio, n):
+    """`n` códigos trimestrales consecutivos desde el primer trimestre de `ano_inicio`"""
+    secuencia = np.arange(n)
+    return periods.compose(ano_inicio + secuencia // 4, secuencia % 4 + 1, periods.TRIMESTRAL)
+
+
+def _state_panel(ids, codigos):
+    """Filas estado × periodo ordenadas por estado, como las publica DataMexico"""
+    ids = np.asarray(ids)
+    return np.repeat(ids, len(codigos)), np.tile(codigos, len(ids))
+
+
+def _state_labels(ids):
+    etiquetas = np.array([ETIQUETAS_IDS.get(i, '') for i in range(max(ETIQUETAS_IDS) + 1)],
+                         dtype=object)
+    return etiquetas[ids]
+
+
+def _write_blocks(bloques, directorio, nombre):
+    """Escribe los bloques en un CSV y lo publica en el formato configurado; regresa filas"""
+    csv_file = directorio / f"{nombre}.generado"
+    filas = 0
+    with open(csv_file, 'w', encoding='utf-8', newline='') as f:
+        for i, bloque in enumerate(bloques):
+            bloque.to_csv(f, index=False, header=i == 0)
+            filas += len(bloque)
+    storage.convert_csv(csv_file, directorio / nombre, dtypes=RAW_DTYPES[nombre])
+    return filas
+
+
+def _quarterly_cube(cubo, rng, factor_periodos):
+    ano, n = BASE_TRIMESTRES[cubo]
+    codigos = _quarters(ano, n * factor_periodos)
+    ids, trimestres = _state_panel(list(ESTADOS_IDS), codigos)
+    n_filas = len(ids)
+    columnas = {
+        'Quarter ID': trimestres,
+        'Quarter': periods.labels(trimestres, periods.TRIMESTRAL),
+        'State ID': ids,
+        'State': _state_labels(ids),
+    }
+    if cubo == 'ied':
+        columnas['Investment'] = rng.lognormal(4, 1.5, n_filas)
+    elif cubo == 'salario':
+        columnas['Monthly Wage'] = rng.normal(5000, 1200, n_filas)
+        columnas['Workforce'] = rng.integers(200_000, 4_000_000, n_filas)
+    elif cubo == 'pea':
+        columnas['Workforce'] = rng.integers(200_000, 4_000_000, n_filas)
+    else:
+        # Remesas se publica sin claves numéricas
+        columnas = {'State': columnas['State'], 'Quarter': columnas['Quarter'],
+                    'Remittance Amount': rng.integers(1_000_000, 900_000_000, n_filas)}
+    df = pd.DataFrame(columnas)
+    if cubo in ('salario', 'pea'):
+        df = df[['State ID', 'State', 'Quarter ID', 'Quarter'] + list(df.columns[4:])]
+    return [df]
+
+
+def _gasto_blocks(rng, factor_periodos, factor_ancho):
+    ano, n = BASE_GASTO
+    anos = np.arange(ano, ano + n * factor_periodos)
+    grupos = GRUPOS_FUNCIONALES + [
+        f"Grupo funcional {i}" for i in range(len(GRUPOS_FUNCIONALES) + 1,
+                                              len(GRUPOS_FUNCIONALES) * factor_ancho + 1)
+    ]
+    for id_estado in GASTO_ESTADOS:
+        n_filas = len(anos) * len(grupos)
+        yield pd.DataFrame({
+            'State ID': id_estado,
+            'State': ETIQUETAS_IDS[id_estado],
+            'Functional Group ID': np.tile(np.arange(1, len(grupos) + 1), len(anos)),
+            'Functional Group': np.tile(np.array(grupos, dtype=object), len(anos)),
+            'Amount Executed': rng.lognormal(20, 1.2, n_filas),
+            'Year': np.repeat(anos, len(grupos)),
+        })
+
+
+def _municipal_blocks(rng, factor_periodos, factor_ancho):
+    ano, n = BASE_TRIMESTRES['remesas_mun']
+    codigos = _quarters(ano, n * factor_periodos)
+    etiquetas = periods.labels(codigos, periods.TRIMESTRAL)
+    por_estado = MUNICIPIOS_POR_ESTADO * factor_ancho
+    for id_estado in ESTADOS_IDS:
+        municipios = id_estado * 1000 + np.arange(1, por_estado + 1)
+        ids, _ = _state_panel(municipios, codigos)
+        nombres = np.array([f"Municipio {clave:05d}" for clave in municipios], dtype=object)
+        yield pd.DataFrame({
+            'Municipality ID': ids,
+            'Municipality': np.repeat(nombres, len(codigos)),
+            'State ID': id_estado,
+            'State': ETIQUETAS_IDS[id_estado],
+            'Quarter': np.tile(etiquetas, len(municipios)),
+            'Remittance Amount': rng.integers(10_000, 90_000_000, len(ids)),
+        })
+
+
+def _inegi_blocks(rng, factor_periodos, factor_ancho):
+    ano, n = BASE_INEGI
+    anos = np.arange(ano, ano + n * factor_periodos).astype(str)
+    for i in range(INEGI_INDICADORES * factor_ancho):
+        codigo = f"62070{i:05d}"
+        n_filas = len(anos) * len(INEGI_AREAS)
+        yield pd.DataFrame({
+            'indicador_codigo': codigo,
+            'indicador_nombre': f"Indicador sintético {i + 1}",
+            'periodo': np.tile(anos, len(INEGI_AREAS)),
+            'valor': rng.normal(50, 10, n_filas),
+            'estado': np.repeat(np.array(INEGI_AREAS, dtype=object), len(anos)),
+        })
+
+
+def generate_raw(directorio, escala, semilla=0):
+    """Escribe los archivos crudos sintéticos de una escala; regresa {archivo: filas}"""
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    factor_periodos, factor_ancho = scale_factors(escala)
+
+    filas = {}
+    for cubo in ('ied', 'salario', 'pea', 'remesas'):
+        filas[RAW_FILES[cubo]] = _write_blocks(
+            _quarterly_cube(cubo, rng, factor_periodos), directorio, RAW_FILES[cubo]
+        )
+    generadores = {
+        'gasto': _gasto_blocks, 'remesas_mun': _municipal_blocks, 'inegi': _inegi_blocks,
+    }
+    for fuente, generador in generadores.items():
+        filas[RAW_FILES[fuente]] = _write_blocks(
+            _rebatch(generador(rng, factor_periodos, factor_ancho)), directorio, RAW_FILES[fuente]
+        )
+    return filas
+
+
+def _rebatch(bloques):
+    """Junta bloques pequeños hasta BLOQUE_GENERACION filas"""
+    pendientes, filas = [], 0
+    for bloque in bloques:
+        pendientes.append(bloque)
+        filas += len(bloque)
+        if filas >= BLOQUE_GENERACION:
+            yield pd.concat(pendientes, ignore_index=True)
+            pendientes, filas = [], 0
+    if pendientes:
+        yield pd.concat(pendientes, ignore_index=True)
+
+
+def _run_task(etapa, tarea):
+    if etapa == 'read':
+        storage.read_table(process_data.RAW_DATA_DIR / tarea)
+        return True
+    if etapa == 'clean':
+        if tarea == INEGI:
+            return process_data.process_inegi_data()
+        if tarea == MUNICIPAL:
+            return process_data.process_municipal_dataset(process_data.MUNICIPAL_DATASETS['Remesas'])
+        spec = next(spec for spec in process_data.DATASETS if spec.nombre == tarea)
+        return process_data.process_dataset(spec)
+    if etapa == 'consolidate':
+        return process_data.create_consolidated_dataset()
+    return process_data.generate_quality_report()
+
+
+def measure_task(etapa, tarea, directorio, formato):
+    """Ejecuta una tarea y mide tiempo, CPU y pico de RSS (corre en un proceso nuevo)"""
+    directorio = Path(directorio)
+    storage.set_format(formato, export_csv=False)
+    process_data.RAW_DATA_DIR = directorio / "raw"
+    process_data.INTERIM_DATA_DIR = directorio / "interim"
+    process_data.PROCESSED_DATA_DIR = directorio / "processed"
+    # Sin reiniciar el pico la base es el de las importaciones (la medición
+    # sólo ve lo que la tarea use por encima)
+    pico_previo = instrumentation.peak_rss_mb()
+
+    salida = io.StringIO()
+    error = None
+    with redirect_stdout(salida), instrumentation.measure() as medicion:
+        try:
+            ok = _run_task(etapa, tarea) is not False
+        except Exception:
+            ok = False
+            error = traceback.format_exc(limit=3)
+    rss_pico = medicion['rss_pico_mb']
+    rss_base = medicion['rss_inicio_mb']
+    if rss_base is None:
+        rss_base = pico_previo
+
+    if not ok and error is None:
+        # Las funciones de process_data reportan sus errores con ✗ en la salida
+        error = "\n".join(linea for linea in salida.getvalue().splitlines() if '✗' in linea)
+    return {
+        'ok': ok,
+        'segundos': medicion['segundos'],
+        'cpu_segundos': medicion['cpu_segundos'],
+        'rss_pico_mb': rss_pico,
+        'rss_etapa_mb': None if rss_pico is None else round(rss_pico - rss_base, 1),
+        'error': error,
+    }
+
+
+def stage_tasks(etapa):
+    """Tareas de una etapa, en el orden en que se ejecutan"""
+    if etapa == 'read':
+        return [RAW_FILES[fuente] for fuente in
+                ('ied', 'salario', 'pea', 'gasto', 'remesas', 'remesas_mun', 'inegi')]
+    if etapa == 'clean':
+        return [spec.nombre for spec in process_data.DATASETS] + [MUNICIPAL, INEGI]
+    return [etapa]
+
+
+def _best(mediciones):
+    """La mejor de varias repeticiones (menor tiempo; menor memoria)"""
+    mejor = dict(min(mediciones, key=lambda m: m['segundos']))
+    for metrica in ('rss_pico_mb', 'rss_etapa_mb'):
+        valores = [m[metrica] for m in mediciones if m[metrica] is not None]
+        mejor[metrica] = min(valores) if valores else None
+    mejor['repeticiones'] = len(mediciones)
+    return mejor
+
+
+def run_scale(escala, directorio, formato, repeticiones=1, semilla=0):
+    """Genera los datos de una escala y mide todas sus etapas"""
+    directorio = Path(directorio)
+    for sub in ("interim", "processed"):
+        shutil.rmtree(directorio / sub, ignore_errors=True)
+        (directorio / sub).mkdir(parents=True)
+
+    storage.set_format(formato, export_csv=False)
+    inicio = time.perf_counter()
+    filas = generate_raw(directorio / "raw", escala, semilla)
+    generacion = time.perf_counter() - inicio
+
+    # Un proceso nuevo (spawn) por medición: el pico de RSS es sólo de esa tarea
+    contexto = multiprocessing.get_context('spawn')
+    etapas = {}
+    for etapa in ETAPAS:
+        tareas = {}
+        for tarea in stage_tasks(etapa):
+            mediciones = []
+            for _ in range(repeticiones):
+                with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+                    mediciones.append(
+                        pool.submit(measure_task, etapa, tarea, str(directorio), formato).result()
+                    )
+            tareas[tarea] = _best(mediciones)
+        rss = [t['rss_etapa_mb'] for t in tareas.values() if t['rss_etapa_mb'] is not None]
+        picos = [t['rss_pico_mb'] for t in tareas.values() if t['rss_pico_mb'] is not None]
+        etapas[etapa] = {
+            'ok': all(t['ok'] for t in tareas.values()),
+            'segundos': round(sum(t['segundos'] for t in tareas.values()), 4),
+            'cpu_segundos': round(sum(t['cpu_segundos'] for t in tareas.values()), 4),
+            'rss_pico_mb': max(picos) if picos else None,
+            'rss_etapa_mb': max(rss) if rss else None,
+            'tareas': tareas,
+        }
+    return {
+        'filas_crudas': filas,
+        'generacion_segundos': round(generacion, 2),
+        'etapas': etapas,
+    }
+
+
+def _environment(formato):
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'formato': formato,
+    }
+
+
+def _compare_metrics(escala, etapa, tarea, actual, previa, tolerancia):
+    filas = []
+    for metrica, minimo in METRICAS.items():
+        valor, base = actual.get(metrica), previa.get(metrica)
+        if valor is None or base is None:
+            continue
+        regresion = valor > base * (1 + tolerancia) and valor - base > minimo
+        filas.append({
+            'escala': escala, 'etapa': etapa, 'tarea': tarea, 'metrica': metrica,
+            'actual': valor, 'baseline': base,
+            'cambio_pct': round(100 * (valor - base) / base, 1) if base else None,
+            'regresion': regresion,
+        })
+    return filas
+
+
+def compare(resultados, baseline, tolerancia=TOLERANCIA):
+    """Compara etapas y tareas contra la línea base; regresa una lista de filas"""
+    filas = []
+    for escala, datos in resultados['escalas'].items():
+        base = baseline.get('escalas', {}).get(escala)
+        if base is None:
+            continue
+        for etapa, medida in datos['etapas'].items():
+            previa = base['etapas'].get(etapa)
+            if previa is None:
+                continue
+            filas += _compare_metrics(escala, etapa, None, medida, previa, tolerancia)
+            for tarea, actual in medida['tareas'].items():
+                if tarea in previa.get('tareas', {}):
+                    filas += _compare_metrics(escala, etapa, tarea, actual,
+                                              previa['tareas'][tarea], tolerancia)
+    return filas
+
+
+def format_results(resultados):
+    """Tabla de resultados por escala y etapa"""
+    lineas = []
+    for escala, datos in resultados['escalas'].items():
+        total = sum(datos['filas_crudas'].values())
+        lineas.append(f"\nEscala {escala}× ({total:,} filas crudas, "
+                      f"generadas en {datos['generacion_segundos']:.1f}s)")
+        lineas.append(f"  {'Etapa':<32} {'Tiempo':>9} {'CPU':>9} {'RSS etapa':>11}  Estado")
+        for etapa, medida in datos['etapas'].items():
+            filas = [(etapa, medida)]
+            if len(medida['tareas']) > 1:
+                filas += [(f"  {tarea}", m) for tarea, m in medida['tareas'].items()]
+            for nombre, m in filas:
+                rss = "—" if m['rss_etapa_mb'] is None else f"{m['rss_etapa_mb']:.1f} MB"
+                estado = "✓" if m['ok'] else "✗"
+                lineas.append(f"  {nombre:<32} {m['segundos']:>8.2f}s {m['cpu_segundos']:>8.2f}s "
+                              f"{rss:>11}  {estado}")
+    return "\n".join(lineas)
+
+
+def format_comparison(filas):
+    """Resumen de la comparación contra la línea base"""
+    regresiones = [f for f in filas if f['regresion']]
+    lineas = [f"Mediciones comparadas: {len(filas)}, regresiones: {len(regresiones)}"]
+    for f in regresiones:
+        nombre = f['etapa'] if f['tarea'] is None else f"{f['etapa']}/{f['tarea']}"
+        cambio = "" if f['cambio_pct'] is None else f" (+{f['cambio_pct']}%)"
+        lineas.append(f"  ✗ {f['escala']}× {nombre} {f['metrica']}: "
+                      f"{f['baseline']} → {f['actual']}{cambio}")
+    return "\n".join(lineas)
+
+
+def write_json(datos, path):
+    """Escribe resultados en JSON de forma atómica"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def parse_args(argv=None):
+    """Argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark del procesamiento con datos sintéticos a varias escalas"
+    )
+    parser.add_argument(
+        "--escalas", type=int, nargs="+", default=list(ESCALAS),
+        help=f"Factores de escala (default: {' '.join(map(str, ESCALAS))})"
+    )
+    parser.add_argument(
+        "--repeticiones", type=int, default=1,
+        help="Repeticiones de cada medición; se guarda la mejor (default: 1)"
+    )
+    parser.add_argument(
+        "--format", choices=storage.FORMATS, default=storage.DATA_FORMAT,
+        help=f"Formato de los archivos (default: {storage.DATA_FORMAT})"
+    )
+    parser.add_argument(
+        "--datos", type=Path, default=None,
+        help="Directorio para los datos generados (default: temporal, se borra al terminar)"
+    )
+    parser.add_argument(
+        "--salida", type=Path, default=None,
+        help=f"JSON de resultados (default: {BENCHMARK_DIR}/benchmark_<fecha>.json)"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=BASELINE_FILE,
+        help=f"Línea base para comparar (default: {BASELINE_FILE})"
+    )
+    parser.add_argument(
+        "--guardar-baseline", action="store_true",
+        help="Guardar estos resultados como la nueva línea base"
+    )
+    parser.add_argument(
+        "--tolerancia", type=float, default=TOLERANCIA,
+        help=f"Aumento relativo permitido antes de marcar una regresión (default: {TOLERANCIA})"
+    )
+    parser.add_argument(
+        "--estricto", action="store_true",
+        help="Terminar con código 1 si hay regresiones, etapas con error o no hay línea base"
+    )
+    parser.add_argument("--semilla", type=int, default=0,
+                        help="Semilla de los datos generados (default: 0)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Función principal: genera, mide, guarda y compara"""
+    args = parse_args(argv)
+    fecha = datetime.now()
+
+    print("\n" + "="*80)
+    print("BENCHMARK DEL PROCESAMIENTO")
+    print("="*80)
+    print(f"Fecha: {fecha.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Escalas: {', '.join(f'{e}×' for e in args.escalas)}")
+    print(f"Formato de archivos: {args.format}")
+    if instrumentation.peak_rss_mb() is None:
+        print("  ⚠ En este sistema no se mide la memoria")
+
+    resultados = {
+        'fecha': fecha.isoformat(timespec='seconds'),
+        'entorno': _environment(args.format),
+        'semilla': args.semilla,
+        'escalas': {},
+    }
+    temporal = None
+    if args.datos is None:
+        temporal = tempfile.TemporaryDirectory(prefix="benchmark_")
+    base = Path(temporal.name) if temporal is not None else args.datos
+    try:
+        for escala in args.escalas:
+            print(f"\n  ... escala {escala}×")
+            resultados['escalas'][str(escala)] = run_scale(
+                escala, base / f"x{escala}", args.format, args.repeticiones, args.semilla
+            )
+    finally:
+        if temporal is not None:
+            temporal.cleanup()
+
+    print("\n" + "="*80)
+    print("RESULTADOS")
+    print("="*80)
+    print(format_results(resultados))
+
+    regresiones = []
+    if args.baseline.exists():
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparacion = compare(resultados, baseline, args.tolerancia)
+        resultados['comparacion'] = {
+            'baseline': str(args.baseline),
+            'baseline_fecha': baseline.get('fecha'),
+            'tolerancia': args.tolerancia,
+            'mediciones': comparacion,
+        }
+        regresiones = [f for f in comparacion if f['regresion']]
+        print("\n" + "="*80)
+        print(f"COMPARACIÓN CONTRA LÍNEA BASE ({baseline.get('fecha')})")
+        print("="*80)
+        print(format_comparison(comparacion))
+    else:
+        print(f"\n⚠ Sin línea base en {args.baseline} (guardar con --guardar-baseline)")
+
+    salida = args.salida or BENCHMARK_DIR / f"benchmark_{fecha.strftime('%Y%m%d_%H%M%S')}.json"
+    write_json(resultados, salida)
+    print(f"\n✓ Resultados guardados: {salida}")
+    if args.guardar_baseline:
+        write_json({k: v for k, v in resultados.items() if k != 'comparacion'}, args.baseline)
+        print(f"✓ Línea base guardada: {args.baseline}")
+
+    fallidas = [f"{escala}×/{etapa}" for escala, datos in resultados['escalas'].items()
+                for etapa, medida in datos['etapas'].items() if not medida['ok']]
+    if fallidas:
+        print(f"\n✗ Etapas con error: {', '.join(fallidas)}")
+    sin_baseline = 'comparacion' not in resultados and not args.guardar_baseline
+    if args.estricto and (regresiones or fallidas or sin_baseline):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,21 +8,39 @@ Fuentes de datos:
 1. Economía - DataMexico API (IED, Salario, PEA, Gasto Público, Remesas)
 2. INEGI - API de indicadores (Educación y Salud)
 3. CONEVAL - Rezago educativo
-4. Seguridad - Datos de seguridad de México
+4. Seguridad - Incidencia delictiva municipal del SESNSP
 
 Autor: Equipo Seguridad y Desarrollo
 Fecha: 2025
 """
 
+import argparse
+import json
 import os
+import shutil
 import sys
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlsplit
 
+import numpy as np
 import pandas as pd
 import requests
 from dotenv import load_dotenv
 
+from http_client import (
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_MAX_WORKERS,
+    FetchEngine,
+    ResponseCache,
+)
+import instrumentation
+import storage
+from keys import ESTADOS_IDS, ESTADOS_NOMBRES_IDS
+import periods
+import sesnsp
+from streaming import ColumnarBatchWriter
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -30,59 +48,482 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parents[1]
 RAW_DATA_DIR = BASE_DIR / "data" / "raw"
 RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
+EXTERNAL_DATA_DIR = BASE_DIR / "data" / "external"
+HTTP_CACHE_DIR = EXTERNAL_DATA_DIR / "http_cache"
 
 # API Key de INEGI desde variable de entorno
 INEGI_API_KEY = os.getenv("INEGI_API_KEY", "32805429-135c-9311-70c1-0b963c6f8317")
 
-# Diccionario de estados
-ESTADOS_IDS = {
-    1: 'Aguascalientes', 2: 'Baja California', 3: 'Baja California Sur',
-    4: 'Campeche', 5: 'Coahuila de Zaragoza', 6: 'Colima',
-    7: 'Chiapas', 8: 'Chihuahua', 9: 'Ciudad de México',
-    10: 'Durango', 11: 'Guanajuato', 12: 'Guerrero',
-    13: 'Hidalgo', 14: 'Jalisco', 15: 'México',
-    16: 'Michoacán de Ocampo', 17: 'Morelos', 18: 'Nayarit',
-    19: 'Nuevo León', 20: 'Oaxaca', 21: 'Puebla',
-    22: 'Querétaro', 23: 'Quintana Roo', 24: 'San Luis Potosí',
-    25: 'Sinaloa', 26: 'Sonora', 27: 'Tabasco',
-    28: 'Tamaulipas', 29: 'Tlaxcala', 30: 'Veracruz de Ignacio de la Llave',
-    31: 'Yucatán', 32: 'Zacatecas'
+# Indicadores de educación y salud del INEGI: {código: nombre}. La lista se
+# puede sustituir con un JSON ({código: nombre} o {código: {"nombre": ...,
+# "fuente": "BIE" | "BISE"}}) en INEGI_INDICADORES_FILE o --inegi-indicadores
+INEGI_INDICADORES = {
+    '6207019048': 'Tasa de analfabetismo',
+    '6207020032': 'Grado promedio de escolaridad',
+    '6207020033': 'Porcentaje de población con educación básica',
+    '6207020034': 'Porcentaje de población con educación media superior',
+    '6207020035': 'Porcentaje de población con educación superior',
+    '6207003986': 'Esperanza de vida al nacimiento',
+    '6207004772': 'Tasa de mortalidad infantil',
+}
+
+# Las URLs base se pueden sustituir con variables de entorno, por ejemplo para
+# descargar contra el servidor local de fixture_server.py
+DATAMEXICO_URL = os.getenv("DATAMEXICO_URL", "http://www.economia.gob.mx/datamexico/api")
+# Cubos de DataMexico con drilldown por estado: (endpoint, parámetros)
+DATAMEXICO_CUBES = {
+    'ied': ("data", "cube=fdi_2_state_investment&drilldowns=Quarter,State&locale=es"
+                    "&measures=Investment&parents=false"),
+    'salario': ("data", "Population+Classification=1&cube=inegi_enoe&drilldowns=State,Quarter"
+                        "&measures=Monthly+Wage,Workforce&locale=es&parents=false"),
+    'pea': ("data", "Economically+Active+Population=1&cube=inegi_enoe&drilldowns=State,Quarter"
+                    "&measures=Workforce&locale=es&parents=false"),
+    'remesas': ("data.jsonrecords", "cube=banxico_mun_income_remittances&drilldowns=State,Quarter"
+                                    "&measures=Remittance+Amount&locale=es"),
+}
+
+# Cubos con corte municipal (modo --municipal); se piden por lotes de estados
+# con drilldown por municipio, y el nivel estatal se agrega al procesar
+DATAMEXICO_MUN_CUBES = {
+    'remesas_mun': ("data.jsonrecords", "cube=banxico_mun_income_remittances"
+                                        "&drilldowns=Municipality,Quarter"
+                                        "&measures=Remittance+Amount&parents=true&locale=es"),
+}
+MUN_STATE_BATCH = 4
+MUN_COLUMNS = ['Municipality ID', 'Municipality', 'State ID', 'State', 'Quarter', 'Remittance Amount']
+
+# Archivo crudo de cada fuente
+RAW_FILES = {
+    'ied': "ied_raw.csv",
+    'salario': "salario_raw.csv",
+    'pea': "pea_raw.csv",
+    'gasto': "gasto_raw.csv",
+    'remesas': "remesas_raw.csv",
+    'remesas_mun': "remesas_municipal_raw.csv",
+    'inegi': "inegi_educacion_salud_raw.csv",
 }
 
+# Llave única de cada archivo crudo (para no duplicar registros en modo incremental)
+RAW_KEYS = {
+    "ied_raw.csv": ['State ID', 'Quarter ID'],
+    "salario_raw.csv": ['State ID', 'Quarter ID'],
+    "pea_raw.csv": ['State ID', 'Quarter ID'],
+    "gasto_raw.csv": ['State ID', 'Functional Group ID', 'Year'],
+    "remesas_raw.csv": ['State', 'Quarter'],
+    "remesas_municipal_raw.csv": ['Municipality ID', 'Quarter'],
+    "inegi_educacion_salud_raw.csv": ['indicador_codigo', 'estado', 'periodo'],
+}
+
+# Tipos de cada archivo crudo al guardarlo en formato columnar
+RAW_DTYPES = {
+    "ied_raw.csv": {
+        'Quarter ID': 'Int32', 'Quarter': 'string', 'State ID': 'Int16', 'State': 'string',
+        'Investment': 'float64',
+    },
+    "salario_raw.csv": {
+        'State ID': 'Int16', 'State': 'string', 'Quarter ID': 'Int32', 'Quarter': 'string',
+        'Monthly Wage': 'float64', 'Workforce': 'float64',
+    },
+    "pea_raw.csv": {
+        'State ID': 'Int16', 'State': 'string', 'Quarter ID': 'Int32', 'Quarter': 'string',
+        'Workforce': 'float64',
+    },
+    "gasto_raw.csv": {
+        'State ID': 'Int16', 'State': 'string', 'Functional Group ID': 'Int16',
+        'Functional Group': 'string', 'Amount Executed': 'float64', 'Year': 'Int16',
+    },
+    "remesas_raw.csv": {
+        'State': 'string', 'Quarter': 'string', 'Remittance Amount': 'float64',
+    },
+    "remesas_municipal_raw.csv": {
+        'Municipality ID': 'Int32', 'Municipality': 'string', 'State ID': 'Int16',
+        'State': 'string', 'Quarter': 'string', 'Remittance Amount': 'float64',
+    },
+    "inegi_educacion_salud_raw.csv": {
+        'indicador_codigo': 'string', 'indicador_nombre': 'string', 'periodo': 'string',
+        'valor': 'float64', 'estado': 'string',
+    },
+}
+
+GASTO_ANOS = range(2013, 2024)
+
+INEGI_URL = os.getenv(
+    "INEGI_URL", "https://www.inegi.org.mx/app/api/indicadores/desarrolladores/jsonxml/INDICATOR"
+)
+INEGI_INDICADORES_FILE = os.getenv("INEGI_INDICADORES_FILE", "")
+# Fuente de cada indicador (BIE por defecto; ver INEGI_INDICADORES)
+INEGI_FUENTE = "BIE"
+INEGI_FUENTES = {}
+# Indicadores por petición: el API acepta varios códigos separados por coma
+INEGI_LOTE = 10
+# Áreas geográficas: nacional y una por estado ('0700' + '00EE')
+INEGI_AREA_NACIONAL = "0700"
+INEGI_AREAS = [INEGI_AREA_NACIONAL] + [f"070000{id_estado:02d}" for id_estado in ESTADOS_IDS]
+INEGI_COLUMNS = ['indicador_codigo', 'indicador_nombre', 'periodo', 'valor', 'estado']
+
+# Archivo de incidencia delictiva municipal del SESNSP (CSV, ZIP con un CSV o
+# XLSX). El SESNSP cambia el enlace con cada publicación mensual, así que se
+# configura con la variable de entorno; sin ella la fuente se omite.
+SESNSP_URL = os.getenv("SESNSP_URL", "")
+SESNSP_RAW_NAME = "sesnsp_idm_raw"
+
+# Número máximo de peticiones simultáneas (configurable con --workers)
+MAX_WORKERS = int(os.getenv("DOWNLOAD_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+
+# Caché de respuestas en disco (desactivable con --no-cache)
+USE_CACHE = True
+CACHE_MAX_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES))
+
+# Pedir sólo los periodos posteriores a los que ya hay en data/raw (--incremental)
+INCREMENTAL = False
+
+# Pedir cada cubo en una sola petición y separar por estado localmente
+# (desactivable con --no-bulk)
+BULK = True
+
+# Modo municipal: cubos con corte municipal en lugar de los estatales equivalentes
+MUNICIPAL = False
+
+# Fuentes en el orden en que se descargan
+FUENTES = ('IED', 'Salario', 'PEA', 'Gasto Público', 'Remesas', 'INEGI Educación/Salud',
+           'Seguridad (SESNSP)')
+
+# Claves que no se pudieron descargar en esta corrida: {fuente: [fallos]}
+FALLIDOS = {}
+
+_engine = None
+
+
+def get_engine():
+    """Regresa el motor de descarga compartido por todos los descargadores"""
+    global _engine
+    if _engine is None:
+        cache = ResponseCache(HTTP_CACHE_DIR, max_bytes=CACHE_MAX_BYTES) if USE_CACHE else None
+        _engine = FetchEngine(max_workers=MAX_WORKERS, cache=cache, on_result=_log_request)
+    return _engine
+
+
+def _log_request(resultado):
+    """Registra una petición en la bitácora de la corrida y suma sus totales por host"""
+    log = instrumentation.get_log()
+    host = urlsplit(resultado.url).hostname
+    reintentos = max(resultado.attempts - 1, 0)
+    log.event(
+        'peticion', url=resultado.url, host=host, status=resultado.status_code,
+        bytes=resultado.size, intentos=resultado.attempts, reintentos=reintentos,
+        cache=resultado.from_cache, segundos=round(resultado.elapsed, 4), error=resultado.error,
+    )
+    log.accumulate(
+        'host', host, peticiones=1, bytes=resultado.size, reintentos=reintentos,
+        cache=int(resultado.from_cache), errores=int(not resultado.ok),
+        segundos=round(resultado.elapsed, 4),
+    )
+
+
+def build_state_urls(cubo, cortes=""):
+    """URLs de un cubo DataMexico con un filtro `State` por estado"""
+    endpoint, query = DATAMEXICO_CUBES[cubo]
+    return {
+        nombre_estado: f"{DATAMEXICO_URL}/{endpoint}?State={id_estado}&{query}{cortes}"
+        for id_estado, nombre_estado in ESTADOS_IDS.items()
+    }
+
+
+def build_bulk_url(cubo, cortes=""):
+    """URL de un cubo DataMexico sin filtro de estado (drilldown por estado)"""
+    endpoint, query = DATAMEXICO_CUBES[cubo]
+    return f"{DATAMEXICO_URL}/{endpoint}?{query}{cortes}"
+
+
+def build_municipal_urls(cubo, cortes="", lote=MUN_STATE_BATCH):
+    """URLs de un cubo municipal, una por lote de `lote` estados"""
+    endpoint, query = DATAMEXICO_MUN_CUBES[cubo]
+    ids = list(ESTADOS_IDS)
+    return {
+        tuple(ids[i:i + lote]): (f"{DATAMEXICO_URL}/{endpoint}"
+                                 f"?State={','.join(str(id_estado) for id_estado in ids[i:i + lote])}"
+                                 f"&{query}{cortes}")
+        for i in range(0, len(ids), lote)
+    }
+
+
+def build_gasto_urls(anos=GASTO_ANOS):
+    """URLs de Gasto Público por año"""
+    return {
+        ano: (f"{DATAMEXICO_URL}/data?cube=budget_transparency"
+              f"&drilldowns=State,Functional+Group&measures=Amount+Executed&locale=es&Year={ano}")
+        for ano in anos
+    }
+
+
+def load_inegi_indicadores(path):
+    """Sustituye la lista de indicadores INEGI por la de un archivo JSON"""
+    global INEGI_INDICADORES, INEGI_FUENTES
+    with open(path, encoding='utf-8') as f:
+        datos = json.load(f)
+    indicadores, fuentes = {}, {}
+    for codigo, valor in datos.items():
+        if isinstance(valor, dict):
+            indicadores[str(codigo)] = valor.get('nombre', str(codigo))
+            if valor.get('fuente'):
+                fuentes[str(codigo)] = valor['fuente']
+        else:
+            indicadores[str(codigo)] = str(valor)
+    if not indicadores:
+        raise ValueError(f"No hay indicadores en {path}")
+    INEGI_INDICADORES, INEGI_FUENTES = indicadores, fuentes
+
+
+def _inegi_url(codigos, area, fuente):
+    return (f"{INEGI_URL}/{','.join(codigos)}/es/{area}/false/{fuente}/2.0/"
+            f"{INEGI_API_KEY}?type=json")
+
+
+def build_inegi_urls(areas=None, lote=None):
+    """URLs de los indicadores INEGI: una por lote de indicadores y área
+
+    Los indicadores de la misma fuente se piden juntos (hasta `lote` por
+    petición); las claves son (códigos, área).
+    """
+    areas = INEGI_AREAS if areas is None else areas
+    lote = lote or INEGI_LOTE
+    por_fuente = {}
+    for codigo in INEGI_INDICADORES:
+        por_fuente.setdefault(INEGI_FUENTES.get(codigo, INEGI_FUENTE), []).append(codigo)
+    urls = {}
+    for fuente, codigos in por_fuente.items():
+        for i in range(0, len(codigos), lote):
+            for area in areas:
+                urls[(tuple(codigos[i:i + lote]), area)] = _inegi_url(codigos[i:i + lote], area, fuente)
+    return urls
+
+
+def record_failure(fuente, clave, resultado):
+    """Registra una clave fallida para reintentarla después"""
+    FALLIDOS.setdefault(fuente, []).append({
+        'clave': clave,
+        'error': resultado.describe_error(),
+        'intentos': resultado.attempts,
+    })
+
+
+def save_failures():
+    """Escribe las claves fallidas en data/raw/descargas_fallidas.json"""
+    filepath = RAW_DATA_DIR / "descargas_fallidas.json"
+    if not FALLIDOS:
+        filepath.unlink(missing_ok=True)
+        return
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(FALLIDOS, f, ensure_ascii=False, indent=2, default=str)
+    total = sum(len(fallos) for fallos in FALLIDOS.values())
+    print(f"\n⚠ {total} claves fallidas guardadas en: {filepath}")
+
+
+def _current_quarter_id():
+    hoy = datetime.now()
+    return hoy.year * 10 + (hoy.month - 1) // 3 + 1
+
+
+def _latest_quarter_id(filename):
+    """Último `Quarter ID` presente en un archivo crudo (None si no existe)"""
+    filepath = RAW_DATA_DIR / filename
+    if not storage.table_exists(filepath):
+        return None
+
+    columnas = storage.table_columns(filepath)
+    if 'Quarter ID' in columnas:
+        ids = periods.from_quarter_ids(
+            storage.read_table(filepath, columns=['Quarter ID'])['Quarter ID'].dropna()
+        )
+    elif 'Quarter' in columnas:
+        # Archivos sin 'Quarter ID' (remesas): '2013-Q1' -> 20131
+        ids = periods.parse_quarters(
+            storage.read_table(filepath, columns=['Quarter'])['Quarter'].dropna()
+        )
+    else:
+        return None
+    return None if not len(ids) else int(ids.max())
+
+
+def _quarter_ids_after(ultimo):
+    """IDs de trimestre posteriores a `ultimo` hasta el trimestre actual"""
+    return [int(qid) for qid in periods.period_range(ultimo, _current_quarter_id(), periods.TRIMESTRAL)[1:]]
+
+
+def cube_cuts(cubo):
+    """Cortes de tiempo para un cubo
+
+    Regresa "" para pedir toda la historia, un corte `&Quarter=...` en modo
+    incremental, o None si el archivo crudo ya está al día.
+    """
+    if not INCREMENTAL:
+        return ""
+    ultimo = _latest_quarter_id(RAW_FILES[cubo])
+    if ultimo is None:
+        return ""
+    pendientes = _quarter_ids_after(ultimo)
+    if not pendientes:
+        return None
+    return "&Quarter=" + ",".join(str(qid) for qid in pendientes)
+
+
+def gasto_years():
+    """Años de gasto a pedir: todos, o sólo los posteriores al último en modo incremental"""
+    filepath = RAW_DATA_DIR / RAW_FILES['gasto']
+    if not INCREMENTAL or not storage.table_exists(filepath):
+        return GASTO_ANOS
+    ultimo = storage.read_table(filepath, columns=['Year'])['Year'].max()
+    if pd.isna(ultimo):
+        return GASTO_ANOS
+    return range(int(ultimo) + 1, datetime.now().year + 1)
+
+
+def _row_keys(df, llaves):
+    """Llaves de fila comparables entre el CSV existente y datos nuevos"""
+    return pd.MultiIndex.from_frame(df[llaves].astype(str))
+
+
+def raw_writer(filename, columnas=None):
+    """Escritor por lotes hacia un archivo parcial junto al archivo crudo"""
+    return ColumnarBatchWriter(RAW_DATA_DIR / f"{filename}.parcial", columns=columnas)
+
+
+def save_raw(writer, filename):
+    """Publica el archivo parcial de `writer` como archivo crudo (escritura atómica)
+
+    El archivo se guarda en el formato configurado (ver storage.py) con los
+    tipos de RAW_DTYPES. En modo incremental los registros se agregan al
+    archivo existente, omitiendo los que ya tienen la misma llave (ver
+    RAW_KEYS); para comparar sólo se leen las columnas llave existentes.
+    """
+    filepath = RAW_DATA_DIR / filename
+    parcial = writer.path
+    nuevos = total = writer.rows
+
+    if INCREMENTAL and storage.table_exists(filepath):
+        columnas = storage.table_columns(filepath)
+        # Las llaves se leen como texto para compararlas tal como están escritas
+        df = pd.read_csv(parcial, dtype={col: str for col in RAW_KEYS[filename]})
+        llaves = [col for col in RAW_KEYS[filename] if col in df.columns and col in columnas]
+        if llaves:
+            existente = storage.read_table(
+                filepath, columns=llaves, dtypes={col: str for col in llaves}
+            ).astype(str)
+            df = df[~_row_keys(df, llaves).isin(_row_keys(existente, llaves))]
+            total = len(existente) + len(df)
+        nuevos = len(df)
+
+        destino = storage.append_table(df, filepath, dtypes=RAW_DTYPES[filename])
+        Path(parcial).unlink()
+    else:
+        destino = storage.convert_csv(parcial, filepath, dtypes=RAW_DTYPES[filename])
+
+    print(f"\n✓ Datos guardados: {destino}")
+    if INCREMENTAL:
+        print(f"  Registros nuevos: {nuevos}")
+    print(f"  Total de registros: {total}")
+
+
+def discard_raw(writer):
+    """Descarta el archivo parcial de `writer`"""
+    writer.close()
+    Path(writer.path).unlink(missing_ok=True)
+
+
+def _state_id(record):
+    """ID de estado de un registro DataMexico (None si no se reconoce)"""
+    if record.get('State ID') is not None:
+        try:
+            return int(record['State ID'])
+        except (TypeError, ValueError):
+            return None
+    return ESTADOS_NOMBRES_IDS.get(record.get('State'))
+
+
+def _stream_states(resultado, writer, conteo, estados):
+    """Escribe los registros de los `estados` indicados y los cuenta por estado"""
+    for record in resultado.iter_records():
+        id_estado = _state_id(record)
+        if id_estado in estados:
+            writer.append(record)
+            conteo[id_estado] = conteo.get(id_estado, 0) + 1
+
+
+def _fetch_cube_per_state(cubo, ids_estados, cortes, writer, conteo):
+    """Pide el cubo con un filtro por estado para los estados indicados"""
+    urls = build_state_urls(cubo, cortes)
+    urls = {ESTADOS_IDS[id_estado]: urls[ESTADOS_IDS[id_estado]] for id_estado in ids_estados}
+
+    for nombre_estado, resultado in get_engine().fetch_many(urls).items():
+        if resultado.ok:
+            _stream_states(resultado, writer, conteo, {ESTADOS_NOMBRES_IDS[nombre_estado]})
+        else:
+            print(f"  ✗ Error en {nombre_estado}: {resultado.describe_error()}")
+            record_failure(cubo, nombre_estado, resultado)
+
+
+def _download_cube(cubo, columnas=None):
+    """Descarga un cubo DataMexico por estado y guarda el CSV crudo
+
+    En modo bulk se hace una sola petición por cubo; los estados que falten en
+    la respuesta (o todos, si el servidor la rechaza) se piden por separado.
+    En modo incremental sólo se piden los trimestres posteriores al último del
+    archivo crudo, y que un estado no traiga datos nuevos no es un error.
+    Los registros se escriben por lotes conforme se leen las respuestas.
+    """
+    cortes = cube_cuts(cubo)
+    if cortes is None:
+        print(f"  ✓ {RAW_FILES[cubo]} ya está al día")
+        return True
+
+    writer = raw_writer(RAW_FILES[cubo], columnas)
+    conteo = {}
+
+    rechazada = True
+    if BULK:
+        resultado = get_engine().fetch(build_bulk_url(cubo, cortes))
+        if resultado.ok:
+            rechazada = False
+            _stream_states(resultado, writer, conteo, ESTADOS_IDS)
+        else:
+            print(f"  ⚠ Petición única rechazada ({resultado.describe_error()}), "
+                  "se descargará estado por estado")
+
+    if rechazada or not INCREMENTAL:
+        faltantes = [id_estado for id_estado in ESTADOS_IDS if id_estado not in conteo]
+        if faltantes and not rechazada:
+            print(f"  ⚠ Faltan {len(faltantes)} estados en la petición única, "
+                  "se piden por separado")
+        if faltantes:
+            _fetch_cube_per_state(cubo, faltantes, cortes, writer, conteo)
+    writer.close()
+
+    for id_estado, nombre_estado in ESTADOS_IDS.items():
+        if id_estado in conteo:
+            print(f"  ✓ {nombre_estado}: {conteo[id_estado]} registros")
+
+    if INCREMENTAL and not writer.rows:
+        discard_raw(writer)
+        print("  ✓ Sin periodos nuevos")
+        return True
+    if len(conteo) < len(ESTADOS_IDS):
+        print(f"  ⚠ Estados descargados: {len(conteo)}/{len(ESTADOS_IDS)}")
+
+    if writer.rows:
+        save_raw(writer, RAW_FILES[cubo])
+        return True
+    discard_raw(writer)
+    return False
+
 
 def download_ied_data():
     """Descarga datos de Inversión Extranjera Directa (IED) por estado"""
     print("\n" + "="*80)
     print("DESCARGANDO: Inversión Extranjera Directa (IED)")
     print("="*80)
-    
-    lista_df = []
-    
-    for id_estado, nombre_estado in ESTADOS_IDS.items():
-        url = (f"http://www.economia.gob.mx/datamexico/api/data?State={id_estado}"
-               "&cube=fdi_2_state_investment&drilldowns=Quarter,State&locale=es"
-               "&measures=Investment&parents=false")
-        
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json().get("data", [])
-                if data:
-                    lista_df.append(pd.DataFrame(data))
-                    print(f"  ✓ {nombre_estado}: {len(data)} registros")
-            else:
-                print(f"  ✗ Error en {nombre_estado}: código {response.status_code}")
-        except Exception as e:
-            print(f"  ✗ Error en {nombre_estado}: {str(e)}")
-    
-    if lista_df:
-        df_ied = pd.concat(lista_df, ignore_index=True)
-        filepath = RAW_DATA_DIR / "ied_raw.csv"
-        df_ied.to_csv(filepath, index=False)
-        print(f"\n✓ Datos guardados: {filepath}")
-        print(f"  Total de registros: {len(df_ied)}")
-        return True
-    return False
+
+    return _download_cube('ied')
 
 
 def download_salario_data():
@@ -90,34 +531,8 @@ def download_salario_data():
     print("\n" + "="*80)
     print("DESCARGANDO: Salario Mensual")
     print("="*80)
-    
-    lista_df = []
-    
-    for id_estado, nombre_estado in ESTADOS_IDS.items():
-        url = (f"http://www.economia.gob.mx/datamexico/api/data?State={id_estado}"
-               "&Population+Classification=1&cube=inegi_enoe&drilldowns=State,Quarter"
-               "&measures=Monthly+Wage,Workforce&locale=es&parents=false")
-        
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json().get("data", [])
-                if data:
-                    lista_df.append(pd.DataFrame(data))
-                    print(f"  ✓ {nombre_estado}: {len(data)} registros")
-            else:
-                print(f"  ✗ Error en {nombre_estado}: código {response.status_code}")
-        except Exception as e:
-            print(f"  ✗ Error en {nombre_estado}: {str(e)}")
-    
-    if lista_df:
-        df_salario = pd.concat(lista_df, ignore_index=True)
-        filepath = RAW_DATA_DIR / "salario_raw.csv"
-        df_salario.to_csv(filepath, index=False)
-        print(f"\n✓ Datos guardados: {filepath}")
-        print(f"  Total de registros: {len(df_salario)}")
-        return True
-    return False
+
+    return _download_cube('salario')
 
 
 def download_pea_data():
@@ -125,34 +540,8 @@ def download_pea_data():
     print("\n" + "="*80)
     print("DESCARGANDO: Población Económicamente Activa (PEA)")
     print("="*80)
-    
-    lista_df = []
-    
-    for id_estado, nombre_estado in ESTADOS_IDS.items():
-        url = (f"http://www.economia.gob.mx/datamexico/api/data?State={id_estado}"
-               "&Economically+Active+Population=1&cube=inegi_enoe&drilldowns=State,Quarter"
-               "&measures=Workforce&locale=es&parents=false")
-        
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json().get("data", [])
-                if data:
-                    lista_df.append(pd.DataFrame(data))
-                    print(f"  ✓ {nombre_estado}: {len(data)} registros")
-            else:
-                print(f"  ✗ Error en {nombre_estado}: código {response.status_code}")
-        except Exception as e:
-            print(f"  ✗ Error en {nombre_estado}: {str(e)}")
-    
-    if lista_df:
-        df_pea = pd.concat(lista_df, ignore_index=True)
-        filepath = RAW_DATA_DIR / "pea_raw.csv"
-        df_pea.to_csv(filepath, index=False)
-        print(f"\n✓ Datos guardados: {filepath}")
-        print(f"  Total de registros: {len(df_pea)}")
-        return True
-    return False
+
+    return _download_cube('pea')
 
 
 def download_gasto_data():
@@ -161,33 +550,33 @@ def download_gasto_data():
     print("DESCARGANDO: Gasto Público Ejecutado")
     print("="*80)
     
-    lista_df = []
-    anos = range(2013, 2024)
+    anos = gasto_years()
+    if not anos:
+        print(f"  ✓ {RAW_FILES['gasto']} ya está al día")
+        return True
     
-    for ano in anos:
-        url = (f"http://www.economia.gob.mx/datamexico/api/data?cube=budget_transparency"
-               f"&drilldowns=State,Functional+Group&measures=Amount+Executed&locale=es&Year={ano}")
-        
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json().get("data", [])
-                if data:
-                    df_temp = pd.DataFrame(data)
-                    df_temp['Year'] = ano
-                    lista_df.append(df_temp)
-                    print(f"  ✓ Año {ano}: {len(data)} registros")
-            else:
-                print(f"  ✗ Error en año {ano}: código {response.status_code}")
-        except Exception as e:
-            print(f"  ✗ Error en año {ano}: {str(e)}")
+    writer = raw_writer(RAW_FILES['gasto'])
+    
+    for ano, resultado in get_engine().fetch_many(build_gasto_urls(anos)).items():
+        if resultado.ok:
+            registros = 0
+            for record in resultado.iter_records():
+                record['Year'] = ano
+                writer.append(record)
+                registros += 1
+            if registros:
+                print(f"  ✓ Año {ano}: {registros} registros")
+        else:
+            print(f"  ✗ Error en año {ano}: {resultado.describe_error()}")
+            record_failure('gasto', ano, resultado)
+    writer.close()
     
-    if lista_df:
-        df_gasto = pd.concat(lista_df, ignore_index=True)
-        filepath = RAW_DATA_DIR / "gasto_raw.csv"
-        df_gasto.to_csv(filepath, index=False)
-        print(f"\n✓ Datos guardados: {filepath}")
-        print(f"  Total de registros: {len(df_gasto)}")
+    if writer.rows:
+        save_raw(writer, RAW_FILES['gasto'])
+        return True
+    discard_raw(writer)
+    if INCREMENTAL:
+        print("  ✓ Sin periodos nuevos")
         return True
     return False
 
@@ -197,91 +586,195 @@ def download_remesas_data():
     print("\n" + "="*80)
     print("DESCARGANDO: Remesas")
     print("="*80)
-    
-    lista_df = []
-    
-    for id_estado, nombre_estado in ESTADOS_IDS.items():
-        url = (f"http://www.economia.gob.mx/datamexico/api/data.jsonrecords?State={id_estado}"
-               "&cube=banxico_mun_income_remittances&drilldowns=State,Quarter"
-               "&measures=Remittance+Amount&locale=es")
-        
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json().get("data", [])
-                if data:
-                    lista_df.append(pd.DataFrame(data))
-                    print(f"  ✓ {nombre_estado}: {len(data)} registros")
-            else:
-                print(f"  ✗ Error en {nombre_estado}: código {response.status_code}")
-        except Exception as e:
-            print(f"  ✗ Error en {nombre_estado}: {str(e)}")
-    
-    if lista_df:
-        df_remesas = pd.concat(lista_df, ignore_index=True)
-        # Seleccionar columnas relevantes si existen
-        if 'State' in df_remesas.columns and 'Quarter' in df_remesas.columns:
-            cols = ['State', 'Quarter', 'Remittance Amount']
-            df_remesas = df_remesas[[col for col in cols if col in df_remesas.columns]]
-        
-        filepath = RAW_DATA_DIR / "remesas_raw.csv"
-        df_remesas.to_csv(filepath, index=False)
-        print(f"\n✓ Datos guardados: {filepath}")
-        print(f"  Total de registros: {len(df_remesas)}")
+
+    return _download_cube('remesas', columnas=['State', 'Quarter', 'Remittance Amount'])
+
+
+def _download_municipal(cubo, columnas=MUN_COLUMNS):
+    """Descarga un cubo con corte municipal por lotes de estados
+
+    Cada lote es una petición con drilldown por municipio; los registros se
+    escriben por lotes conforme se leen las respuestas, así la memoria no
+    crece con el número de municipios.
+    """
+    cortes = cube_cuts(cubo)
+    if cortes is None:
+        print(f"  ✓ {RAW_FILES[cubo]} ya está al día")
+        return True
+
+    writer = raw_writer(RAW_FILES[cubo], columnas)
+    conteo = {}
+    municipios = set()
+
+    for lote, resultado in get_engine().fetch_many(build_municipal_urls(cubo, cortes)).items():
+        if not resultado.ok:
+            print(f"  ✗ Error en estados {', '.join(map(str, lote))}: {resultado.describe_error()}")
+            record_failure(cubo, list(lote), resultado)
+            continue
+        for record in resultado.iter_records():
+            id_municipio = record.get('Municipality ID')
+            id_estado = _state_id(record)
+            if id_estado is None and id_municipio is not None:
+                id_estado = int(id_municipio) // 1000
+            writer.append(record)
+            municipios.add(id_municipio)
+            conteo[id_estado] = conteo.get(id_estado, 0) + 1
+    writer.close()
+
+    print(f"  ✓ Municipios: {len(municipios)} en {len(conteo)} estados "
+          f"({writer.rows} registros)")
+
+    if INCREMENTAL and not writer.rows:
+        discard_raw(writer)
+        print("  ✓ Sin periodos nuevos")
+        return True
+    if writer.rows:
+        save_raw(writer, RAW_FILES[cubo])
         return True
+    discard_raw(writer)
     return False
 
 
+def download_remesas_municipal_data():
+    """Descarga datos de Remesas por municipio"""
+    print("\n" + "="*80)
+    print("DESCARGANDO: Remesas por municipio")
+    print("="*80)
+
+    return _download_municipal('remesas_mun')
+
+
+def download_sesnsp_data():
+    """Descarga el archivo de incidencia delictiva municipal del SESNSP
+
+    El archivo (cientos de MB) se guarda tal como se publica, con una columna
+    por mes; la conversión a filas y la agregación se hacen al procesar, por
+    bloques (ver sesnsp.py). La respuesta se escribe a disco en streaming.
+    """
+    print("\n" + "="*80)
+    print("DESCARGANDO: Incidencia delictiva municipal (SESNSP)")
+    print("="*80)
+
+    if not SESNSP_URL:
+        print("  ⚠ Sin URL: definir SESNSP_URL con el enlace del archivo publicado")
+        return False
+
+    resultado = get_engine().fetch(SESNSP_URL)
+    if not resultado.ok:
+        print(f"  ✗ Error: {resultado.describe_error()}")
+        record_failure('sesnsp', SESNSP_URL, resultado)
+        return False
+
+    sufijo = Path(SESNSP_URL.split("?", 1)[0]).suffix.lower()
+    sufijo = sufijo if sufijo in sesnsp.SOURCE_SUFFIXES else ".csv"
+    filepath = RAW_DATA_DIR / f"{SESNSP_RAW_NAME}{sufijo}"
+    # El parcial conserva la extensión, que indica cómo leerlo
+    tmp = filepath.with_name(f"{SESNSP_RAW_NAME}.parcial{sufijo}")
+    shutil.copyfile(resultado.body_path, tmp)
+
+    # Validar el encabezado antes de publicar (un enlace vencido regresa HTML)
+    try:
+        next(sesnsp.iter_source(tmp, chunksize=10))
+    except Exception as e:
+        tmp.unlink()
+        print(f"  ✗ El archivo no tiene el formato esperado: {e}")
+        return False
+
+    os.replace(tmp, filepath)
+    # Quitar copias anteriores en otro formato para que el procesamiento lea ésta
+    for otro in sesnsp.SOURCE_SUFFIXES:
+        if otro != sufijo:
+            (RAW_DATA_DIR / f"{SESNSP_RAW_NAME}{otro}").unlink(missing_ok=True)
+
+    tamano = filepath.stat().st_size / 1024 / 1024
+    print(f"\n✓ Datos guardados: {filepath}")
+    print(f"  Tamaño: {tamano:.1f} MB")
+    return True
+
+
+def _obs_value(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _write_inegi_series(writer, resultado, codigos, area):
+    """Escribe las series de una respuesta INEGI; regresa {código: registros}
+
+    Las observaciones de cada serie se leen directamente a arreglos (periodo
+    y valor) y se escriben como un bloque, sin armar un registro por dato.
+    """
+    registros = {}
+    for serie in resultado.iter_records("Series"):
+        observaciones = serie.get('OBSERVATIONS') or []
+        codigo = str(serie.get('INDICADOR') or codigos[0])
+        if codigo not in INEGI_INDICADORES:
+            continue
+        n = len(observaciones)
+        writer.append_columns({
+            'indicador_codigo': np.full(n, codigo, dtype=object),
+            'indicador_nombre': np.full(n, INEGI_INDICADORES[codigo], dtype=object),
+            'periodo': np.array([obs.get('TIME_PERIOD', '') for obs in observaciones], dtype=object),
+            'valor': np.fromiter((_obs_value(obs.get('OBS_VALUE')) for obs in observaciones),
+                                 dtype=np.float64, count=n),
+            'estado': np.full(n, area, dtype=object),
+        })
+        registros[codigo] = registros.get(codigo, 0) + n
+    return registros
+
+
 def download_inegi_educacion_salud():
-    """Descarga indicadores de educación y salud del INEGI"""
+    """Descarga indicadores de educación y salud del INEGI
+
+    Se hace una petición por lote de indicadores y área geográfica (nacional y
+    32 estados), todas en paralelo. Si el API rechaza un lote (por ejemplo,
+    porque un indicador no existe en un área) sus indicadores se piden uno
+    por uno.
+    """
     print("\n" + "="*80)
     print("DESCARGANDO: Indicadores INEGI - Educación y Salud")
     print("="*80)
     
-    # Indicadores de educación y salud
-    indicadores = {
-        '6207019048': 'Tasa de analfabetismo',
-        '6207020032': 'Grado promedio de escolaridad',
-        '6207020033': 'Porcentaje de población con educación básica',
-        '6207020034': 'Porcentaje de población con educación media superior',
-        '6207020035': 'Porcentaje de población con educación superior',
-        '6207003986': 'Esperanza de vida al nacimiento',
-        '6207004772': 'Tasa de mortalidad infantil',
-    }
+    writer = raw_writer(RAW_FILES['inegi'], INEGI_COLUMNS)
+    registros = dict.fromkeys(INEGI_INDICADORES, 0)
+    areas = {codigo: set() for codigo in INEGI_INDICADORES}
+    individuales = {}
     
-    resultados = []
+    def guardar(codigos, area, resultado):
+        for codigo, n in _write_inegi_series(writer, resultado, codigos, area).items():
+            registros[codigo] += n
+            if n:
+                areas[codigo].add(area)
     
-    for codigo, nombre in indicadores.items():
-        url = f"https://www.inegi.org.mx/app/api/indicadores/desarrolladores/jsonxml/INDICATOR/{codigo}/es/0700/false/BIE/2.0/{INEGI_API_KEY}?type=json"
-        
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                if 'Series' in data:
-                    for serie in data['Series']:
-                        if 'OBSERVATIONS' in serie:
-                            for obs in serie['OBSERVATIONS']:
-                                resultados.append({
-                                    'indicador_codigo': codigo,
-                                    'indicador_nombre': nombre,
-                                    'periodo': obs.get('TIME_PERIOD', ''),
-                                    'valor': obs.get('OBS_VALUE', ''),
-                                    'estado': serie.get('REGION', '')
-                                })
-                    print(f"  ✓ {nombre}: {len(serie.get('OBSERVATIONS', []))} registros")
-            else:
-                print(f"  ✗ Error en {nombre}: código {response.status_code}")
-        except Exception as e:
-            print(f"  ✗ Error en {nombre}: {str(e)}")
+    for (codigos, area), resultado in get_engine().fetch_many(build_inegi_urls()).items():
+        if resultado.ok:
+            guardar(codigos, area, resultado)
+        elif len(codigos) > 1 and resultado.status_code is not None:
+            for codigo in codigos:
+                fuente = INEGI_FUENTES.get(codigo, INEGI_FUENTE)
+                individuales[((codigo,), area)] = _inegi_url((codigo,), area, fuente)
+        else:
+            print(f"  ✗ Error en área {area}: {resultado.describe_error()}")
+            record_failure('inegi', [list(codigos), area], resultado)
+    
+    for (codigos, area), resultado in get_engine().fetch_many(individuales).items():
+        if resultado.ok:
+            guardar(codigos, area, resultado)
+        else:
+            record_failure('inegi', [list(codigos), area], resultado)
+    writer.close()
     
-    if resultados:
-        df_inegi = pd.DataFrame(resultados)
-        filepath = RAW_DATA_DIR / "inegi_educacion_salud_raw.csv"
-        df_inegi.to_csv(filepath, index=False)
-        print(f"\n✓ Datos guardados: {filepath}")
-        print(f"  Total de registros: {len(df_inegi)}")
+    for codigo, nombre in INEGI_INDICADORES.items():
+        if registros[codigo]:
+            print(f"  ✓ {nombre}: {registros[codigo]} registros en {len(areas[codigo])} áreas")
+        else:
+            print(f"  ✗ Sin datos: {nombre}")
+    
+    if writer.rows:
+        save_raw(writer, RAW_FILES['inegi'])
         return True
+    discard_raw(writer)
     return False
 
 
@@ -291,6 +784,9 @@ def generate_metadata():
     print("GENERANDO METADATOS")
     print("="*80)
     
+    indicadores = "\n".join(
+        f"       - {nombre} ({codigo})" for codigo, nombre in INEGI_INDICADORES.items()
+    )
     metadata = f"""METADATOS DE DESCARGA DE DATOS
 {"="*80}
 
@@ -336,6 +832,8 @@ FUENTES DE DATOS
      * Descripción: Monto de remesas recibidas por estado y trimestre
      * Fuente original: Banco de México (BANXICO)
      * Unidad: Millones de dólares USD
+     * Modo municipal (--municipal): remesas_municipal_raw.csv, por municipio
+       y trimestre; el total estatal se calcula al procesar
 
 2. INDICADORES INEGI - Educación y Salud
    URL: https://www.inegi.org.mx/app/api/
@@ -346,22 +844,30 @@ FUENTES DE DATOS
    Datasets descargados:
    - Indicadores de Educación y Salud
      * Archivo: inegi_educacion_salud_raw.csv
+     * Cobertura: nacional (área 0700) y 32 estados (áreas 070000EE)
      * Indicadores incluidos:
-       - Tasa de analfabetismo
-       - Grado promedio de escolaridad
-       - Porcentaje de población con educación básica
-       - Porcentaje de población con educación media superior
-       - Porcentaje de población con educación superior
-       - Esperanza de vida al nacimiento
-       - Tasa de mortalidad infantil
+{indicadores}
+
+3. SEGURIDAD - Incidencia delictiva municipal (SESNSP)
+   URL: {SESNSP_URL or "(definir SESNSP_URL)"}
+   Descripción: Secretariado Ejecutivo del Sistema Nacional de Seguridad
+                Pública - Incidencia delictiva del fuero común por municipio
+   
+   Datasets descargados:
+   - Incidencia delictiva municipal
+     * Archivo: {SESNSP_RAW_NAME}.csv (o .zip / .xlsx, tal como se publica)
+     * Descripción: Delitos por municipio, año y tipo de delito, una columna por mes
+     * Unidad: Número de delitos
 
 {"="*80}
 INFORMACIÓN ADICIONAL
 {"="*80}
 
-Todos los datos están organizados por entidad federativa (estado) de México.
+Los datos están organizados por entidad federativa (estado) de México, salvo la
+incidencia delictiva y el modo municipal, organizados por municipio.
 Los datos temporales están organizados por trimestre o año según corresponda.
-Los archivos están en formato CSV con codificación UTF-8.
+Los archivos se guardan en formato {storage.DATA_FORMAT} (el nombre de cada archivo
+en esta lista usa la extensión .csv como nombre lógico). Los CSV usan codificación UTF-8.
 
 Para procesar estos datos, ejecutar:
     python notebooks/process_data.py
@@ -379,53 +885,185 @@ Para más información, consultar los diccionarios de datos en:
     print(f"✓ Metadatos guardados: {metadata_path}")
 
 
-def main():
+def _run_source(nombre, descargar, archivos):
+    """Ejecuta un descargador midiendo tiempo, memoria y filas escritas
+
+    Un error no detiene las demás fuentes: se reporta y la fuente cuenta como
+    no descargada.
+    """
+    log = instrumentation.get_log()
+    destino = None
+    if log.perfil == 'cprofile':
+        destino = instrumentation.profile_path(log.perfil_dir, nombre)
+    error = None
+    exito = False
+    fallidos_previos = sum(len(fallos) for fallos in FALLIDOS.values())
+    with instrumentation.measure(log.perfil, destino) as medicion:
+        try:
+            exito = bool(descargar())
+        except Exception as e:
+            error = str(e)
+            print(f"\n✗ Error en {nombre}: {error}")
+    filas = instrumentation.count_rows(RAW_DATA_DIR / archivo for archivo in archivos)
+    log.event('fuente', fuente=nombre, exito=exito, error=error, filas_salida=filas,
+              fallidos=sum(len(fallos) for fallos in FALLIDOS.values()) - fallidos_previos,
+              **medicion)
+    return exito
+
+
+def configure(workers=None, bulk=None, cache=None, incremental=None, municipal=None):
+    """Opciones de la corrida (None deja el valor actual)"""
+    global MAX_WORKERS, BULK, USE_CACHE, INCREMENTAL, MUNICIPAL
+    if _engine is not None:
+        raise RuntimeError("El motor de descarga ya está en uso; configurar antes de descargar")
+    if workers is not None:
+        MAX_WORKERS = workers
+    if bulk is not None:
+        BULK = bulk
+    if cache is not None:
+        USE_CACHE = cache
+    if incremental is not None:
+        INCREMENTAL = incremental
+    if municipal is not None:
+        MUNICIPAL = municipal
+
+
+def _cube_urls(cubo):
+    """URLs de un cubo DataMexico según el modo de la corrida"""
+    cortes = cube_cuts(cubo)
+    if cortes is None:
+        return []
+    if cubo in DATAMEXICO_MUN_CUBES:
+        return list(build_municipal_urls(cubo, cortes).values())
+    if BULK:
+        return [build_bulk_url(cubo, cortes)]
+    return list(build_state_urls(cubo, cortes).values())
+
+
+def _source_plan(nombre):
+    """(descargador, clave de RAW_FILES o None, URLs a poner en vuelo) de una fuente"""
+    remesas = 'remesas_mun' if MUNICIPAL else 'remesas'
+    planes = {
+        'IED': (download_ied_data, 'ied', lambda: _cube_urls('ied')),
+        'Salario': (download_salario_data, 'salario', lambda: _cube_urls('salario')),
+        'PEA': (download_pea_data, 'pea', lambda: _cube_urls('pea')),
+        'Gasto Público': (download_gasto_data, 'gasto',
+                          lambda: build_gasto_urls(gasto_years()).values()),
+        'Remesas': (download_remesas_municipal_data if MUNICIPAL else download_remesas_data,
+                    remesas, lambda: _cube_urls(remesas)),
+        'INEGI Educación/Salud': (download_inegi_educacion_salud, 'inegi',
+                                  lambda: build_inegi_urls().values()),
+        'Seguridad (SESNSP)': (download_sesnsp_data, None,
+                               lambda: [SESNSP_URL] if SESNSP_URL else []),
+    }
+    return planes[nombre]
+
+
+def download_sources(fuentes=None):
+    """Descarga las fuentes indicadas (default: FUENTES); regresa {fuente: éxito}
+
+    Primero se ponen en vuelo todas las peticiones de todas las fuentes y
+    luego cada descargador sólo espera las respuestas que le corresponden. Al
+    terminar se cierra el motor de descarga y se guardan las claves fallidas.
+    """
+    global _engine
+    if fuentes is not None:
+        desconocidas = set(fuentes) - set(FUENTES)
+        if desconocidas:
+            raise ValueError(f"Fuentes desconocidas: {sorted(desconocidas)} "
+                             f"(opciones: {', '.join(FUENTES)})")
+    planes = {nombre: _source_plan(nombre) for nombre in FUENTES
+              if fuentes is None or nombre in fuentes}
+    FALLIDOS.clear()
+
+    engine = get_engine()
+    for _, _, urls in planes.values():
+        engine.prefetch(urls())
+
+    resultados = {}
+    try:
+        for nombre, (descargar, clave, _) in planes.items():
+            archivos = [RAW_FILES[clave]] if clave else []
+            resultados[nombre] = _run_source(nombre, descargar, archivos)
+    finally:
+        engine.close()
+        _engine = None
+    save_failures()
+    return resultados
+
+
+def parse_args(argv=None):
+    """Argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Descarga de datos de fuentes públicas")
+    parser.add_argument(
+        "--workers", type=int, default=MAX_WORKERS,
+        help=f"Peticiones HTTP simultáneas (default: {MAX_WORKERS})"
+    )
+    parser.add_argument(
+        "--no-bulk", action="store_true",
+        help="Pedir los cubos estado por estado en lugar de una petición por cubo"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="No usar la caché de respuestas en data/external/http_cache"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Pedir sólo los periodos posteriores a los que ya hay en data/raw y agregarlos"
+    )
+    parser.add_argument(
+        "--municipal", action="store_true",
+        help="Descargar los cubos con corte municipal (remesas) en lugar de los estatales"
+    )
+    parser.add_argument(
+        "--inegi-indicadores", default=INEGI_INDICADORES_FILE or None,
+        help="JSON con los indicadores INEGI a descargar ({código: nombre})"
+    )
+    parser.add_argument(
+        "--format", choices=storage.FORMATS, default=storage.DATA_FORMAT,
+        help=f"Formato de los archivos crudos (default: {storage.DATA_FORMAT})"
+    )
+    parser.add_argument(
+        "--export-csv", action="store_true",
+        help="Guardar también una copia CSV de cada archivo crudo"
+    )
+    parser.add_argument(
+        "--profile", choices=instrumentation.PERFILES, default=instrumentation.RUN_PROFILE,
+        help="Perfilar cada fuente con cProfile (.prof) o tracemalloc (asignaciones en la bitácora)"
+    )
+    parser.add_argument(
+        "--run-log-dir", type=Path, default=instrumentation.RUN_LOG_DIR,
+        help=f"Directorio de las bitácoras de corrida (default: {instrumentation.RUN_LOG_DIR})"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Función principal que ejecuta todas las descargas"""
+    args = parse_args(argv)
+    configure(workers=args.workers, bulk=not args.no_bulk, cache=not args.no_cache,
+              incremental=args.incremental, municipal=args.municipal)
+    if args.inegi_indicadores:
+        load_inegi_indicadores(args.inegi_indicadores)
+    storage.set_format(args.format, export_csv=args.export_csv or storage.EXPORT_CSV)
+    log = instrumentation.start_run(
+        "download_data", args.run_log_dir, args.profile, argumentos=vars(args),
+        workers=MAX_WORKERS, bulk=BULK, cache=USE_CACHE, incremental=INCREMENTAL,
+        municipal=MUNICIPAL, formato=storage.DATA_FORMAT,
+    )
+
     print("\n" + "="*80)
     print("INICIANDO DESCARGA DE DATOS")
     print("="*80)
     print(f"Directorio de datos: {RAW_DATA_DIR}")
     print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Peticiones simultáneas: {MAX_WORKERS}")
+    print(f"Formato de archivos: {storage.DATA_FORMAT}")
+    if MUNICIPAL:
+        print("Geografía: municipal")
+    print(f"Bitácora de la corrida: {log.path}")
     
-    resultados = {
-        'IED': False,
-        'Salario': False,
-        'PEA': False,
-        'Gasto Público': False,
-        'Remesas': False,
-        'INEGI Educación/Salud': False
-    }
-    
-    # Ejecutar descargas
-    try:
-        resultados['IED'] = download_ied_data()
-    except Exception as e:
-        print(f"\n✗ Error en IED: {str(e)}")
-    
-    try:
-        resultados['Salario'] = download_salario_data()
-    except Exception as e:
-        print(f"\n✗ Error en Salario: {str(e)}")
-    
-    try:
-        resultados['PEA'] = download_pea_data()
-    except Exception as e:
-        print(f"\n✗ Error en PEA: {str(e)}")
-    
-    try:
-        resultados['Gasto Público'] = download_gasto_data()
-    except Exception as e:
-        print(f"\n✗ Error en Gasto Público: {str(e)}")
-    
-    try:
-        resultados['Remesas'] = download_remesas_data()
-    except Exception as e:
-        print(f"\n✗ Error en Remesas: {str(e)}")
-    
-    try:
-        resultados['INEGI Educación/Salud'] = download_inegi_educacion_salud()
-    except Exception as e:
-        print(f"\n✗ Error en INEGI: {str(e)}")
+    resultados = download_sources()
     
     # Generar metadatos
     try:
@@ -443,6 +1081,15 @@ def main():
     
     exitosos = sum(1 for v in resultados.values() if v)
     print(f"\nTotal: {exitosos}/{len(resultados)} fuentes descargadas exitosamente")
+
+    hosts = log.totals('host')
+    if hosts:
+        print("\nPeticiones por host:")
+        for host, total in sorted(hosts.items(), key=lambda x: str(x[0])):
+            print(f"  {host}: {total['peticiones']} peticiones, "
+                  f"{total['bytes'] / 1024 / 1024:.1f} MB, {total['reintentos']} reintentos, "
+                  f"{total['cache']} desde caché, {total['errores']} errores")
+    instrumentation.end_run(exitosas=exitosos, fuentes=len(resultados), fallidos=FALLIDOS)
     
     if exitosos == 0:
         print("\n⚠ ADVERTENCIA: No se pudo descargar ninguna fuente de datos")
@@ -0,0 +1,568 @@
+"""
+Servidor local que sustituye a DataMexico e INEGI para correr las descargas sin red
+
+Atiende los mismos endpoints que usa download_data.py:
+
+- DataMexico: `/datamexico/api/data` y `/datamexico/api/data.jsonrecords`, con
+  los cortes State, Quarter y Year y drilldown por municipio.
+- INEGI: `/app/api/indicadores/desarrolladores/jsonxml/INDICATOR/...`, con
+  varios indicadores por petición y las áreas nacional / estatales.
+- SESNSP: `/sesnsp/<archivo>.csv` regresa el archivo de muestra de fixtures/.
+
+Las respuestas salen de una de tres fuentes (`modo`):
+
+- raw: se arman al vuelo desde los archivos crudos de data/raw, como los
+  regresaría el API. Sin archivo crudo de INEGI las series se generan con
+  valores deterministas por indicador y área.
+- grabar: se arman desde data/raw (o se piden al API real con `upstream`) y
+  además se guardan en un directorio de grabaciones (`FixtureStore`).
+- replay: sólo se sirven respuestas grabadas; lo demás es 404.
+
+Para medir el descargador de forma repetible se puede agregar latencia (con
+jitter), una tasa de errores 503 / 429 con semilla fija y un factor de escala
+que multiplica los periodos de cada respuesta. El servidor cuenta peticiones,
+errores inyectados, bytes y peticiones simultáneas (ver `/_stats`).
+
+Uso:
+    python notebooks/fixture_server.py --port 8765 --latencia 0.05 --tasa-error 0.02
+    DATAMEXICO_URL=http://127.0.0.1:8765/datamexico/api \\
+    INEGI_URL=http://127.0.0.1:8765/app/api/indicadores/desarrolladores/jsonxml/INDICATOR \\
+        python notebooks/download_data.py
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+import requests
+
+import periods
+import sesnsp
+import storage
+from keys import estado_ids_from_names, inegi_estado_ids
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+RAW_DATA_DIR = BASE_DIR / "data" / "raw"
+FIXTURES_DIR = BASE_DIR / "data" / "external" / "fixtures_http"
+
+DATAMEXICO_PATH = "/datamexico/api"
+INEGI_PATH = "/app/api/indicadores/desarrolladores/jsonxml/INDICATOR"
+SESNSP_PATH = "/sesnsp/"
+STATS_PATH = "/_stats"
+
+MODOS = ("raw", "grabar", "replay")
+
+# Origen real de cada API, para grabar respuestas con `upstream`
+UPSTREAMS = {
+    DATAMEXICO_PATH: "http://www.economia.gob.mx",
+    INEGI_PATH: "https://www.inegi.org.mx",
+}
+UPSTREAM_TIMEOUT = 60
+
+# Archivo crudo que responde a cada cubo: (cubo, parámetro que lo distingue)
+CUBE_FILES = {
+    ("fdi_2_state_investment", None): "ied_raw.csv",
+    ("inegi_enoe", "Population Classification"): "salario_raw.csv",
+    ("inegi_enoe", "Economically Active Population"): "pea_raw.csv",
+    ("budget_transparency", None): "gasto_raw.csv",
+    ("banxico_mun_income_remittances", None): "remesas_raw.csv",
+}
+MUNICIPAL_FILES = {
+    "banxico_mun_income_remittances": "remesas_municipal_raw.csv",
+}
+INEGI_FILE = "inegi_educacion_salud_raw.csv"
+INEGI_DTYPES = {'indicador_codigo': str, 'periodo': str, 'estado': str}
+
+# Series generadas cuando no hay archivo crudo de INEGI
+INEGI_ANOS_GENERADOS = range(2010, 2021)
+
+
+def fixture_key(path):
+    """Llave de una petición grabada: ruta y parámetros ordenados, sin host
+
+    En INEGI se omite el token del API (último segmento de la ruta), así una
+    grabación sirve con cualquier INEGI_API_KEY.
+    """
+    partes = urlsplit(path)
+    ruta = partes.path
+    if INEGI_PATH in ruta:
+        segmentos = ruta.split('/')
+        i = segmentos.index('INDICATOR')
+        ruta = '/'.join(segmentos[:i + 7])
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    return f"{ruta}?{query}" if query else ruta
+
+
+class FixtureStore:
+    """Respuestas grabadas en disco: `<hash>.body` y `<hash>.json` (ruta, código, tipo)"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, path):
+        clave = hashlib.sha256(fixture_key(path).encode("utf-8")).hexdigest()
+        return self.directory / f"{clave}.json", self.directory / f"{clave}.body"
+
+    def lookup(self, path):
+        """Regresa (código, tipo, cuerpo) o None si no hay grabación"""
+        meta_path, body_path = self._paths(path)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            return meta['status'], meta['content_type'], body_path.read_bytes()
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, path, status, content_type, body):
+        meta_path, body_path = self._paths(path)
+        tmp = body_path.with_name(f"{body_path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, body_path)
+        meta = {
+            'path': fixture_key(path),
+            'status': status,
+            'content_type': content_type,
+            'bytes': len(body),
+            'grabado': datetime.now().isoformat(timespec='seconds'),
+        }
+        tmp = meta_path.with_name(f"{meta_path.name}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, meta_path)
+
+    def __len__(self):
+        return sum(1 for _ in self.directory.glob("*.json"))
+
+
+def _shift_years(df, desplazamiento):
+    """Copia de `df` con todos sus periodos `desplazamiento` años antes"""
+    copia = df.copy()
+    if 'Quarter ID' in copia.columns:
+        copia['Quarter ID'] = copia['Quarter ID'] - 10 * desplazamiento
+    if 'Quarter' in copia.columns:
+        codigos = periods.parse_quarters(copia['Quarter']) - 10 * desplazamiento
+        copia['Quarter'] = periods.labels(codigos, periods.TRIMESTRAL)
+    if 'Year' in copia.columns:
+        copia['Year'] = copia['Year'] - desplazamiento
+    if 'periodo' in copia.columns:
+        texto = copia['periodo'].astype(str)
+        anos = texto.str[:4].astype(int) - desplazamiento
+        copia['periodo'] = anos.astype(str) + texto.str[4:]
+    return copia
+
+
+def _year_span(df):
+    """(primer año, años que cubre la tabla)"""
+    if 'Quarter ID' in df.columns:
+        anos = periods.split(df['Quarter ID'].to_numpy(dtype=np.int64), periods.TRIMESTRAL)[0]
+    elif 'Quarter' in df.columns:
+        anos = periods.split(periods.parse_quarters(df['Quarter']), periods.TRIMESTRAL)[0]
+    elif 'Year' in df.columns:
+        anos = df['Year'].to_numpy(dtype=np.int64)
+    else:
+        anos = df['periodo'].astype(str).str[:4].astype(int).to_numpy()
+    return int(anos.min()), int(anos.max() - anos.min() + 1)
+
+
+def scale_table(df, escala):
+    """Multiplica las filas de una tabla cruda agregando periodos anteriores
+
+    La copia i repite los datos `i` veces el rango de años de la tabla antes,
+    así las llaves (estado, periodo) siguen siendo únicas y el resto del
+    pipeline procesa la tabla escalada como una historia más larga.
+    """
+    if escala <= 1 or not len(df):
+        return df
+    primero, rango = _year_span(df)
+    if primero - (escala - 1) * rango < 1000:
+        raise ValueError(f"Escala {escala} demasiado grande: los años pasarían de 4 dígitos "
+                         f"(máximo {(primero - 1000) // rango + 1})")
+    copias = [_shift_years(df, i * rango) for i in range(escala - 1, 0, -1)]
+    return pd.concat(copias + [df], ignore_index=True)
+
+
+class RawFixtures:
+    """Respuestas de DataMexico e INEGI armadas desde los archivos crudos
+
+    Cada archivo se lee (y se escala) una sola vez y se filtra por petición.
+    """
+
+    def __init__(self, raw_dir=RAW_DATA_DIR, escala=1):
+        self.raw_dir = Path(raw_dir)
+        self.escala = escala
+        self._tablas = {}
+        self._lock = threading.Lock()
+
+    def table(self, nombre, dtypes=None):
+        """Tabla cruda escalada (None si no existe)"""
+        with self._lock:
+            if nombre not in self._tablas:
+                archivo = storage.find_table(self.raw_dir / nombre)
+                df = None
+                if archivo is not None and archivo.suffix == '.csv':
+                    # round_trip: los flotantes se sirven con los mismos dígitos del CSV
+                    df = pd.read_csv(archivo, dtype=dtypes, float_precision='round_trip')
+                elif archivo is not None:
+                    df = storage.read_table(archivo, dtypes=dtypes)
+                if df is not None:
+                    df = scale_table(df, self.escala)
+                self._tablas[nombre] = df
+            return self._tablas[nombre]
+
+    def _cube_file(self, params):
+        cubo = params.get('cube')
+        if 'Municipality' in params.get('drilldowns', '') and cubo in MUNICIPAL_FILES:
+            return MUNICIPAL_FILES[cubo]
+        for (nombre, distintivo), archivo in CUBE_FILES.items():
+            if nombre == cubo and (distintivo is None or distintivo in params):
+                return archivo
+        return None
+
+    def datamexico(self, params):
+        """Cuerpo JSON de una consulta DataMexico, o None si el cubo no existe"""
+        archivo = self._cube_file(params)
+        if archivo is None:
+            return None
+        df = self.table(archivo)
+        if df is None:
+            return None
+
+        filtro = np.ones(len(df), dtype=bool)
+        if params.get('State'):
+            ids = [int(valor) for valor in params['State'].split(',')]
+            if 'State ID' in df.columns:
+                estados = df['State ID'].to_numpy(dtype=np.int64)
+            else:
+                estados = estado_ids_from_names(df['State'])
+            filtro &= np.isin(estados, ids)
+        if params.get('Quarter'):
+            ids = [int(valor) for valor in params['Quarter'].split(',')]
+            if 'Quarter ID' in df.columns:
+                trimestres = df['Quarter ID'].to_numpy(dtype=np.int64)
+            else:
+                trimestres = periods.parse_quarters(df['Quarter'])
+            filtro &= np.isin(trimestres, ids)
+        if params.get('Year'):
+            anos = [int(valor) for valor in params['Year'].split(',')]
+            filtro &= df['Year'].isin(anos).to_numpy()
+            # El año es un corte, no un drilldown: no viene en los registros
+            df = df.drop(columns=['Year'])
+
+        # json.dumps conserva todos los dígitos de los flotantes (to_json los redondea)
+        df = df[filtro].astype(object)
+        registros = df.where(df.notna(), None).to_dict(orient='records')
+        return json.dumps({'data': registros}, ensure_ascii=False).encode('utf-8')
+
+    def _generated_series(self, codigo, area):
+        """Serie anual determinista para un indicador y área"""
+        semilla = zlib.crc32(f"{codigo}/{area}".encode())
+        rng = np.random.default_rng(semilla)
+        # Con escala, la serie empieza tantos rangos de años antes
+        inicio = INEGI_ANOS_GENERADOS[0] - (self.escala - 1) * len(INEGI_ANOS_GENERADOS)
+        anos = range(inicio, INEGI_ANOS_GENERADOS[-1] + 1)
+        valores = 50 + np.cumsum(rng.normal(0, 1, len(anos)))
+        return [
+            {'TIME_PERIOD': str(ano), 'OBS_VALUE': f"{valor:.4f}", 'COBER_GEO': area}
+            for ano, valor in zip(anos, valores)
+        ]
+
+    def inegi(self, codigos, area):
+        """(código HTTP, cuerpo) de una consulta de indicadores INEGI"""
+        df = self.table(INEGI_FILE, dtypes=INEGI_DTYPES)
+        series = []
+        if df is None:
+            series = [{'INDICADOR': codigo, 'FREQ': '1',
+                       'OBSERVATIONS': self._generated_series(codigo, area)}
+                      for codigo in codigos]
+        else:
+            id_estado = int(inegi_estado_ids([area])[0])
+            df = df[df['indicador_codigo'].isin(codigos).to_numpy()
+                    & (inegi_estado_ids(df['estado']) == id_estado)]
+            for codigo, serie in df.groupby('indicador_codigo', sort=False):
+                observaciones = [
+                    {'TIME_PERIOD': periodo,
+                     'OBS_VALUE': None if pd.isna(valor) else str(valor),
+                     'COBER_GEO': area}
+                    for periodo, valor in zip(serie['periodo'], serie['valor'])
+                ]
+                series.append({'INDICADOR': codigo, 'OBSERVATIONS': observaciones})
+        if not series:
+            # El API responde 400 cuando ningún indicador tiene datos en el área
+            return 400, json.dumps({'ErrorInfo': 'No se encontraron resultados'}).encode('utf-8')
+        return 200, json.dumps({'Series': series}, ensure_ascii=False).encode('utf-8')
+
+
+@dataclass
+class Comportamiento:
+    """Latencia y fallas inyectadas en cada respuesta"""
+    latencia: float = 0.0
+    jitter: float = 0.0
+    tasa_error: float = 0.0
+    codigo_error: int = 503
+    retry_after: float = 0.0
+    semilla: int = 0
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Servidor HTTP con el origen de respuestas, las fallas y los contadores"""
+
+    daemon_threads = True
+
+    def __init__(self, address, modo="raw", raw_dir=RAW_DATA_DIR, fixtures_dir=FIXTURES_DIR,
+                 escala=1, comportamiento=None, upstream=False):
+        if modo not in MODOS:
+            raise ValueError(f"Modo no soportado: {modo} (opciones: {', '.join(MODOS)})")
+        super().__init__(address, FixtureHandler)
+        self.modo = modo
+        self.upstream = upstream
+        self.raw = RawFixtures(raw_dir, escala)
+        self.store = FixtureStore(fixtures_dir) if modo != "raw" else None
+        self.comportamiento = comportamiento or Comportamiento()
+        self._rng = random.Random(self.comportamiento.semilla)
+        self._lock = threading.Lock()
+        self._stats = {'peticiones': 0, 'errores_inyectados': 0, 'no_encontradas': 0,
+                       'grabadas': 0, 'bytes': 0, 'en_vuelo': 0, 'max_en_vuelo': 0}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def datamexico_url(self):
+        return self.url + DATAMEXICO_PATH
+
+    @property
+    def inegi_url(self):
+        return self.url + INEGI_PATH
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, **incrementos):
+        with self._lock:
+            for campo, n in incrementos.items():
+                self._stats[campo] += n
+            self._stats['max_en_vuelo'] = max(self._stats['max_en_vuelo'], self._stats['en_vuelo'])
+
+    def _draw(self):
+        """(espera, ¿inyectar error?) de una petición; el generador tiene semilla fija"""
+        c = self.comportamiento
+        with self._lock:
+            espera = c.latencia + (self._rng.uniform(0, c.jitter) if c.jitter else 0.0)
+            error = c.tasa_error > 0 and self._rng.random() < c.tasa_error
+        return espera, error
+
+    def _fetch_upstream(self, path):
+        for prefijo, origen in UPSTREAMS.items():
+            if path.startswith(prefijo):
+                respuesta = requests.get(origen + path, timeout=UPSTREAM_TIMEOUT)
+                return (respuesta.status_code,
+                        respuesta.headers.get('Content-Type', 'application/json'),
+                        respuesta.content)
+        return None
+
+    def _build(self, path):
+        """(código, tipo, cuerpo) desde data/raw o el API real; None si no aplica"""
+        if self.upstream:
+            return self._fetch_upstream(path)
+        partes = urlsplit(path)
+        if partes.path.startswith(INEGI_PATH):
+            segmentos = partes.path.split('/')
+            i = segmentos.index('INDICATOR')
+            codigos, area = segmentos[i + 1].split(','), segmentos[i + 3]
+            status, body = self.raw.inegi(codigos, area)
+            return status, 'application/json', body
+        if partes.path.startswith(DATAMEXICO_PATH):
+            body = self.raw.datamexico(dict(parse_qsl(partes.query)))
+            return None if body is None else (200, 'application/json', body)
+        return None
+
+    def respond(self, path):
+        """(código, tipo, cuerpo, encabezados extra) de una petición"""
+        if path.startswith(SESNSP_PATH):
+            if not path.split('?', 1)[0].endswith('.csv'):
+                return 404, 'text/html', b'<html>No encontrado</html>', {}
+            return 200, 'text/csv', sesnsp.FIXTURE.read_bytes(), {}
+
+        respuesta = self.store.lookup(path) if self.store is not None else None
+        if respuesta is None and self.modo != "replay":
+            respuesta = self._build(path)
+            if respuesta is not None and self.modo == "grabar":
+                self.store.save(path, *respuesta)
+                self._count(grabadas=1)
+        if respuesta is None:
+            self._count(no_encontradas=1)
+            return 404, 'application/json', b'{"error":"Sin datos para esta consulta"}', {}
+        return (*respuesta, {})
+
+    def start(self):
+        """Atiende peticiones en un hilo de fondo; regresa el servidor"""
+        self._thread = threading.Thread(target=self.serve_forever, name="fixture_server",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, content_type, body, encabezados):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for nombre, valor in encabezados.items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        if self.path == STATS_PATH:
+            body = json.dumps(server.stats()).encode('utf-8')
+            self._send(200, 'application/json', body, {})
+            return
+
+        server._count(peticiones=1, en_vuelo=1)
+        try:
+            espera, error = server._draw()
+            if espera:
+                time.sleep(espera)
+            if error:
+                server._count(errores_inyectados=1)
+                c = server.comportamiento
+                body = json.dumps({'error': 'Error inyectado'}).encode('utf-8')
+                self._send(c.codigo_error, 'application/json', body,
+                           {'Retry-After': f"{c.retry_after:g}"})
+                return
+            try:
+                status, content_type, body, encabezados = server.respond(self.path)
+            except Exception as e:
+                status, content_type, encabezados = 500, 'application/json', {}
+                body = json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8')
+            self._send(status, content_type, body, encabezados)
+            server._count(bytes=len(body))
+        finally:
+            server._count(en_vuelo=-1)
+
+
+def start_server(host="127.0.0.1", port=0, **opciones):
+    """Levanta un FixtureServer en un hilo de fondo (puerto libre con port=0)"""
+    return FixtureServer((host, port), **opciones).start()
+
+
+def parse_args(argv=None):
+    """Argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Servidor local de DataMexico / INEGI para descargas sin red"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--modo", choices=MODOS, default="raw",
+        help="raw: armar respuestas desde data/raw; grabar: además guardarlas; "
+             "replay: sólo respuestas grabadas (default: raw)"
+    )
+    parser.add_argument(
+        "--upstream", action="store_true",
+        help="En modo grabar, pedir las respuestas al API real en lugar de data/raw"
+    )
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DATA_DIR,
+                        help=f"Archivos crudos de origen (default: {RAW_DATA_DIR})")
+    parser.add_argument("--fixtures-dir", type=Path, default=FIXTURES_DIR,
+                        help=f"Directorio de grabaciones (default: {FIXTURES_DIR})")
+    parser.add_argument("--escala", type=int, default=1,
+                        help="Multiplica los periodos de cada respuesta (default: 1)")
+    parser.add_argument("--latencia", type=float, default=0.0,
+                        help="Segundos de espera por respuesta (default: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Espera adicional aleatoria, hasta estos segundos (default: 0)")
+    parser.add_argument("--tasa-error", type=float, default=0.0,
+                        help="Fracción de respuestas con error (default: 0)")
+    parser.add_argument("--codigo-error", type=int, default=503, choices=(429, 500, 502, 503, 504),
+                        help="Código de los errores inyectados (default: 503)")
+    parser.add_argument("--retry-after", type=float, default=0.0,
+                        help="Valor de Retry-After en los errores inyectados (default: 0)")
+    parser.add_argument("--semilla", type=int, default=0,
+                        help="Semilla de la latencia y los errores (default: 0)")
+    args = parser.parse_args(argv)
+    if args.upstream and args.modo != "grabar":
+        parser.error("--upstream sólo aplica con --modo grabar")
+    if not 0 <= args.tasa_error <= 1:
+        parser.error("--tasa-error debe estar entre 0 y 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    comportamiento = Comportamiento(
+        latencia=args.latencia, jitter=args.jitter, tasa_error=args.tasa_error,
+        codigo_error=args.codigo_error, retry_after=args.retry_after, semilla=args.semilla,
+    )
+    server = FixtureServer(
+        (args.host, args.port), modo=args.modo, raw_dir=args.raw_dir,
+        fixtures_dir=args.fixtures_dir, escala=args.escala,
+        comportamiento=comportamiento, upstream=args.upstream,
+    )
+
+    print("\n" + "="*80)
+    print("SERVIDOR LOCAL DE DATAMEXICO / INEGI")
+    print("="*80)
+    print(f"Modo: {args.modo}" + (" (API real)" if args.upstream else ""))
+    if args.modo != "replay" and not args.upstream:
+        print(f"Archivos crudos: {args.raw_dir}")
+        if args.escala > 1:
+            print(f"Escala: {args.escala}x")
+    if server.store is not None:
+        print(f"Grabaciones: {args.fixtures_dir} ({len(server.store)} respuestas)")
+    print(f"Latencia: {args.latencia:g} s (+ hasta {args.jitter:g} s), "
+          f"errores: {args.tasa_error:.1%} ({args.codigo_error})")
+    print("\nPara descargar contra este servidor:")
+    print(f"  export DATAMEXICO_URL={server.datamexico_url}")
+    print(f"  export INEGI_URL={server.inegi_url}")
+    print(f"  export SESNSP_URL={server.url}{SESNSP_PATH}IDM_NM.csv")
+    print(f"Estadísticas: {server.url}{STATS_PATH}")
+    print("\nCtrl+C para detener")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    stats = server.stats()
+    print(f"\n✓ Peticiones: {stats['peticiones']} "
+          f"(errores inyectados: {stats['errores_inyectados']}, "
+          f"sin datos: {stats['no_encontradas']}, grabadas: {stats['grabadas']})")
+    print(f"  Simultáneas (máximo): {stats['max_en_vuelo']}")
+    print(f"  Enviado: {stats['bytes'] / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+"""
+Motor de descarga concurrente para las APIs públicas (DataMexico e INEGI)
+
+Todas las peticiones comparten una sola `requests.Session` con un pool de
+conexiones por host, y se ejecutan en un pool de hilos acotado. Las URLs se
+memorizan, de modo que un `prefetch` al inicio de la corrida deja todas las
+peticiones en vuelo y cada descargador sólo espera sus resultados.
+
+Los cuerpos de las respuestas se escriben a disco por bloques y se leen en
+streaming (ver `streaming.py`); se guardan en una caché (`ResponseCache`) con
+TTL por fuente y revalidación condicional (ETag / Last-Modified).
+
+Las peticiones que sí salen a la red pasan por un `RequestScheduler`: límite de
+tasa por host (token bucket), reintentos con backoff exponencial y jitter
+(respetando Retry-After) y un circuit breaker por host.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from streaming import DEFAULT_CHUNK_SIZE, iter_file_chunks, iter_json_array
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_TIMEOUT = 30
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+DIA = 24 * 60 * 60
+
+# TTL de la caché por fuente: la primera regla cuyo texto aparezca en la URL
+# define cuánto tiempo se sirve la respuesta sin consultar al servidor. Pasado
+# el TTL se hace una petición condicional.
+CACHE_TTL_RULES = [
+    ("fdi_2_state_investment", 7 * DIA),          # IED, trimestral
+    ("banxico_mun_income_remittances", 7 * DIA),  # Remesas, trimestral
+    ("inegi_enoe", 7 * DIA),                      # Salario y PEA, trimestral
+    ("budget_transparency", 30 * DIA),            # Gasto, anual
+    ("inegi.org.mx", 1 * DIA),
+]
+DEFAULT_CACHE_TTL = 1 * DIA
+
+# Límite de tasa por host: (peticiones por segundo, ráfaga máxima)
+HOST_RATE_LIMITS = {
+    "www.economia.gob.mx": (10.0, 20),
+    "www.inegi.org.mx": (5.0, 10),
+}
+DEFAULT_RATE_LIMIT = (10.0, 20)
+
+# Respuestas que vale la pena reintentar
+RETRY_STATUS = {429, 500, 502, 503, 504}
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 60.0
+
+# Fallos consecutivos que abren el circuito de un host, y segundos que
+# permanece abierto antes de dejar pasar una petición de prueba
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET = 60.0
+
+
+@dataclass
+class FetchResult:
+    """Resultado de una petición: código HTTP, cuerpo en disco o mensaje de error"""
+    url: str
+    status_code: Optional[int] = None
+    body_path: Optional[Path] = None
+    error: Optional[str] = None
+    from_cache: bool = False
+    attempts: int = 0
+    size: int = 0             # bytes del cuerpo descargados (0 si vino de la caché)
+    elapsed: float = 0.0      # segundos, incluyendo esperas y reintentos
+
+    @property
+    def ok(self):
+        return self.status_code == 200 and self.error is None and self.body_path is not None
+
+    @property
+    def payload(self):
+        """Cuerpo JSON completo (para respuestas pequeñas)"""
+        if not self.ok:
+            return None
+        return json.loads(self.body_path.read_bytes())
+
+    def iter_records(self, key="data"):
+        """Produce en streaming los elementos del arreglo `key` del cuerpo"""
+        if not self.ok:
+            return iter(())
+        return iter_json_array(iter_file_chunks(self.body_path), key)
+
+    def data(self):
+        """Regresa la lista `data` de una respuesta DataMexico (vacía si no hay)"""
+        return list(self.iter_records("data"))
+
+    def describe_error(self):
+        """Texto corto para los mensajes de error de los descargadores"""
+        if self.error is not None:
+            return self.error
+        return f"código {self.status_code}"
+
+
+def _write_stream(response, path):
+    """Escribe el cuerpo de una respuesta a disco por bloques (escritura atómica)"""
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    tamano = 0
+    with open(tmp, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=DEFAULT_CHUNK_SIZE):
+            f.write(chunk)
+            tamano += len(chunk)
+    os.replace(tmp, path)
+    return tamano
+
+
+def normalize_url(url):
+    """Forma canónica de una URL: esquema y host en minúsculas, parámetros ordenados"""
+    partes = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    return urlunsplit((partes.scheme.lower(), partes.netloc.lower(), partes.path, query, ""))
+
+
+def cache_ttl(url, rules=CACHE_TTL_RULES):
+    """TTL en segundos para una URL según las reglas por fuente"""
+    for patron, ttl in rules:
+        if patron in url:
+            return ttl
+    return DEFAULT_CACHE_TTL
+
+
+class ResponseCache:
+    """Caché de respuestas HTTP en disco con validadores y desalojo LRU
+
+    Cada entrada se guarda como `<hash>.body` (cuerpo crudo) y `<hash>.json`
+    (URL, ETag, Last-Modified, fecha de descarga y último acceso). Cuando el
+    tamaño total supera `max_bytes` se borran las entradas de acceso más antiguo.
+
+    Las entradas que `lookup` o `store` entregan quedan fijadas: el desalojo
+    no las borra mientras quien las recibió puede seguir leyendo su cuerpo,
+    hasta que se liberan con `release_all` (al cerrar el FetchEngine). Los
+    cuerpos más grandes que `max_bytes` no se guardan en la caché.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_MAX_BYTES, ttl_rules=CACHE_TTL_RULES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_rules = ttl_rules
+        self._fijadas = set()
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        clave = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return self.directory / f"{clave}.json", self.directory / f"{clave}.body"
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def lookup(self, url):
+        """Regresa (meta, ruta del cuerpo) de la entrada, o (None, None) si no existe
+
+        La entrada encontrada queda fijada (no se desaloja hasta `release_all`).
+        """
+        meta_path, body_path = self._paths(url)
+        with self._lock:
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return None, None
+            if not body_path.exists():
+                return None, None
+            self._fijadas.add(meta_path.name)
+        return meta, body_path
+
+    def is_fresh(self, meta):
+        return time.time() - meta["descargado"] < cache_ttl(meta["url"], self.ttl_rules)
+
+    def conditional_headers(self, meta):
+        """Encabezados If-None-Match / If-Modified-Since para revalidar"""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def touch(self, url, meta, revalidated=False):
+        """Marca el acceso (y la revalidación, si hubo 304) de una entrada"""
+        ahora = time.time()
+        meta["accedido"] = ahora
+        if revalidated:
+            meta["descargado"] = ahora
+        meta_path, _ = self._paths(url)
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def fits(self, response):
+        """False si el Content-Length declarado ya excede el tamaño de la caché"""
+        try:
+            return int(response.headers.get("Content-Length", 0)) <= self.max_bytes
+        except ValueError:
+            return True
+
+    def store(self, url, response, fallback):
+        """Guarda una respuesta 200 junto con sus validadores; regresa (ruta del cuerpo, bytes)
+
+        Si el cuerpo resulta más grande que `max_bytes` no se guarda en la
+        caché: se deja en `fallback` (fuera del directorio de la caché).
+        """
+        meta_path, body_path = self._paths(url)
+        tmp = body_path.with_name(f"{body_path.name}.{threading.get_ident()}.descarga")
+        try:
+            tamano = _write_stream(response, tmp)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        if tamano > self.max_bytes:
+            shutil.move(tmp, fallback)
+            return Path(fallback), tamano
+
+        ahora = time.time()
+        meta = {
+            "url": normalize_url(url),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "descargado": ahora,
+            "accedido": ahora,
+            "bytes": tamano,
+        }
+        with self._lock:
+            os.replace(tmp, body_path)
+            self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+            self._fijadas.add(meta_path.name)
+        self.evict()
+        return body_path, tamano
+
+    def release_all(self):
+        """Libera las entradas fijadas para que el desalojo pueda borrarlas"""
+        with self._lock:
+            self._fijadas.clear()
+        self.evict()
+
+    def evict(self):
+        """Borra las entradas menos usadas (no fijadas) hasta quedar dentro de `max_bytes`"""
+        with self._lock:
+            entradas = []
+            for meta_path in self.directory.glob("*.json"):
+                try:
+                    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    continue
+                entradas.append((meta.get("accedido", 0), meta.get("bytes", 0), meta_path))
+
+            total = sum(tamano for _, tamano, _ in entradas)
+            for _, tamano, meta_path in sorted(entradas):
+                if total <= self.max_bytes:
+                    break
+                if meta_path.name in self._fijadas:
+                    continue
+                meta_path.unlink(missing_ok=True)
+                meta_path.with_suffix(".body").unlink(missing_ok=True)
+                total -= tamano
+
+
+class TokenBucket:
+    """Límite de tasa: `rate` fichas por segundo con capacidad `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta obtener una ficha"""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (ahora - self._updated) * self.rate)
+                self._updated = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.rate
+            time.sleep(espera)
+
+
+class CircuitBreaker:
+    """Circuit breaker por host: cerrado, abierto o semiabierto
+
+    Cuentan como fallos los errores de conexión y las peticiones que agotaron
+    sus reintentos. Tras `threshold` fallos consecutivos el circuito se abre y las peticiones
+    fallan de inmediato durante `reset_timeout` segundos; después se deja pasar
+    una sola petición de prueba que lo cierra o lo vuelve a abrir. Para la
+    prueba, una respuesta reintentable (429/5xx) ya cuenta como fallo (ver
+    `record_retry`).
+    """
+
+    def __init__(self, threshold=DEFAULT_BREAKER_THRESHOLD, reset_timeout=DEFAULT_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._fallos = 0
+        self._abierto_desde = None
+        self._prueba_en_curso = False
+        self._hilo_prueba = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._abierto_desde is None:
+                return True
+            if time.monotonic() - self._abierto_desde < self.reset_timeout:
+                return False
+            if self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+            self._hilo_prueba = threading.get_ident()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._fallos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+
+    def record_failure(self):
+        with self._lock:
+            self._fallos += 1
+            if self._prueba_en_curso or self._fallos >= self.threshold:
+                self._abierto_desde = time.monotonic()
+            self._prueba_en_curso = False
+
+    def record_retry(self):
+        """Respuesta reintentable: si es la petición de prueba (de este hilo),
+        el circuito se vuelve a abrir en lugar de quedar semiabierto"""
+        with self._lock:
+            if self._prueba_en_curso and self._hilo_prueba == threading.get_ident():
+                self._abierto_desde = time.monotonic()
+                self._prueba_en_curso = False
+
+
+def _retry_after(response):
+    """Segundos indicados por el encabezado Retry-After (None si no hay)"""
+    valor = response.headers.get("Retry-After")
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """Envía peticiones con límite de tasa, reintentos y circuit breaker por host"""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX, rate_limits=HOST_RATE_LIMITS,
+                 breaker_threshold=DEFAULT_BREAKER_THRESHOLD,
+                 breaker_reset=DEFAULT_BREAKER_RESET):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limits = rate_limits
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self._buckets = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                rate, capacity = self.rate_limits.get(host, DEFAULT_RATE_LIMIT)
+                self._buckets[host] = TokenBucket(rate, capacity)
+                self._breakers[host] = CircuitBreaker(self.breaker_threshold,
+                                                      self.breaker_reset)
+            return self._buckets[host], self._breakers[host]
+
+    def _backoff(self, intento):
+        """Backoff exponencial con jitter completo"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+
+    def send(self, session, url, timeout, headers=None):
+        """Regresa (response, error, intentos); sólo uno de response/error es None
+
+        La respuesta se pide en modo streaming: quien la recibe debe leer su
+        cuerpo o cerrarla.
+        """
+        host = urlsplit(url).netloc.lower()
+        bucket, breaker = self._host_state(host)
+        error = None
+
+        for intento in range(self.max_retries + 1):
+            if not breaker.allow():
+                return None, f"circuito abierto para {host}", intento
+
+            bucket.acquire()
+            try:
+                response = session.get(url, timeout=timeout, headers=headers, stream=True)
+            except requests.RequestException as e:
+                breaker.record_failure()
+                error = str(e)
+                espera = self._backoff(intento)
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    breaker.record_success()
+                    return response, None, intento + 1
+                response.close()
+                breaker.record_retry()
+                error = None
+                espera = _retry_after(response)
+                if espera is None:
+                    espera = self._backoff(intento)
+                espera = min(espera, self.backoff_max)
+
+            if intento < self.max_retries:
+                time.sleep(espera)
+
+        if error is not None:
+            return None, error, self.max_retries + 1
+        # Los 429/5xx sólo cuentan para el circuito cuando se agotan los reintentos
+        breaker.record_failure()
+        return response, None, self.max_retries + 1
+
+
+class FetchEngine:
+    """Pool de hilos acotado sobre una sesión HTTP compartida"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT, cache=None,
+                 scheduler=None, on_result=None):
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
+        # Se llama con cada FetchResult al terminar su petición (instrumentación)
+        self.on_result = on_result
+
+        # Un pool de conexiones por host, con tantas conexiones como hilos
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="descarga"
+        )
+        self._futures = {}
+        self._lock = threading.Lock()
+
+        # Sin caché, los cuerpos se escriben en un directorio temporal de la corrida
+        self._spool = tempfile.TemporaryDirectory(prefix="descarga_")
+        self._spool_dir = Path(self._spool.name)
+
+    def _spool_path(self, url):
+        clave = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return self._spool_dir / f"{clave}.body"
+
+    def _get(self, url):
+        inicio = time.perf_counter()
+        resultado = self._request(url)
+        resultado.elapsed = time.perf_counter() - inicio
+        if self.on_result is not None:
+            self.on_result(resultado)
+        return resultado
+
+    def _request(self, url):
+        meta, body_path = self.cache.lookup(url) if self.cache is not None else (None, None)
+        if meta is not None and self.cache.is_fresh(meta):
+            self.cache.touch(url, meta)
+            return FetchResult(url=url, status_code=200, body_path=body_path, from_cache=True)
+
+        headers = self.cache.conditional_headers(meta) if meta is not None else {}
+        response, error, intentos = self.scheduler.send(
+            self.session, url, self.timeout, headers=headers
+        )
+        if error is not None:
+            return FetchResult(url=url, error=error, attempts=intentos)
+
+        with response:
+            if response.status_code == 304 and meta is not None:
+                self.cache.touch(url, meta, revalidated=True)
+                return FetchResult(url=url, status_code=200, body_path=body_path,
+                                   from_cache=True, attempts=intentos)
+            if response.status_code != 200:
+                return FetchResult(url=url, status_code=response.status_code, attempts=intentos)
+
+            try:
+                if self.cache is not None and self.cache.fits(response):
+                    body_path, tamano = self.cache.store(url, response, self._spool_path(url))
+                else:
+                    body_path = self._spool_path(url)
+                    tamano = _write_stream(response, body_path)
+            except (OSError, requests.RequestException) as e:
+                return FetchResult(url=url, error=str(e), attempts=intentos)
+
+        return FetchResult(url=url, status_code=200, body_path=body_path, attempts=intentos,
+                           size=tamano)
+
+    def submit(self, url):
+        """Programa la descarga de una URL (una sola vez por corrida)"""
+        with self._lock:
+            future = self._futures.get(url)
+            if future is None:
+                future = self._executor.submit(self._get, url)
+                self._futures[url] = future
+            return future
+
+    def prefetch(self, urls):
+        """Pone en vuelo todas las URLs sin esperar sus resultados"""
+        for url in urls:
+            self.submit(url)
+
+    def fetch_many(self, urls):
+        """Descarga un diccionario {clave: url} y regresa {clave: FetchResult}
+
+        El orden de las claves se conserva, independientemente del orden en
+        que terminen las peticiones.
+        """
+        futures = {clave: self.submit(url) for clave, url in urls.items()}
+        return {clave: future.result() for clave, future in futures.items()}
+
+    def fetch(self, url):
+        return self.submit(url).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.release_all()
+        self._spool.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
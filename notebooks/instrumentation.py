@@ -0,0 +1,274 @@
+"""
+Instrumentación de las corridas: bitácora JSON lines, tiempo, memoria y perfiles
+
+Cada corrida de download_data.py o process_data.py escribe una bitácora en
+reports/runs/<script>_<run_id>.jsonl, un evento JSON por línea:
+
+- inicio / fin: argumentos, entorno y totales de la corrida
+- peticion: cada petición HTTP (código, bytes del cuerpo, intentos,
+  reintentos, caché, segundos)
+- fuente / etapa: cada descargador o etapa del procesamiento, con tiempo de
+  reloj, tiempo de CPU, pico de memoria (RSS) y filas de entrada / salida
+- resumen: totales acumulados por grupo (por ejemplo, peticiones por host)
+
+`measure` mide un bloque de código; con `perfil='cprofile'` guarda además un
+perfil .prof del bloque (ver con `python -m pstats` o snakeviz) y con
+`perfil='tracemalloc'` el pico de memoria asignada desde Python (incluye los
+arreglos de NumPy) y las líneas que más memoria retienen al terminar.
+
+El pico de RSS se reinicia al empezar cada medición en Linux
+(/proc/self/clear_refs), así es el de ese bloque; en otros sistemas es el
+pico del proceso hasta ese momento.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import cProfile
+import json
+import os
+import platform
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import unicodedata
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de memoria del proceso
+    resource = None
+
+import storage
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+RUN_LOG_DIR = Path(os.getenv("RUN_LOG_DIR", BASE_DIR / "reports" / "runs"))
+
+PERFILES = ("cprofile", "tracemalloc")
+# Perfil por defecto de las corridas (--profile lo sustituye)
+RUN_PROFILE = os.getenv("RUN_PROFILE") or None
+TOP_ASIGNACIONES = 10
+
+MB = 1024 * 1024
+
+
+def status_mb(campo):
+    """Campo de memoria de /proc/self/status en MB (Linux), o None"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linea in f:
+                if linea.startswith(campo + ":"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Reinicia el pico de RSS del proceso (Linux); regresa False si no se puede"""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return status_mb("VmHWM") is not None
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Pico de memoria residente del proceso (MB), o None si no se puede medir"""
+    pico = status_mb("VmHWM")
+    if pico is not None or resource is None:
+        return pico
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes
+    return pico / (MB if sys.platform == 'darwin' else 1024)
+
+
+def profile_path(directorio, nombre):
+    """Ruta del perfil .prof de un bloque (nombre sin caracteres especiales)"""
+    texto = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode('ascii')
+    limpio = re.sub(r'[^0-9A-Za-z]+', '_', texto).strip('_').lower()
+    return Path(directorio) / f"{limpio or 'bloque'}.prof"
+
+
+@contextmanager
+def measure(perfil=None, destino=None):
+    """Mide el bloque; el diccionario que produce se llena al salir
+
+    Campos: segundos, cpu_segundos, rss_inicio_mb, rss_pico_mb y, según el
+    perfil, `perfil` (ruta del .prof en `destino`) o tracemalloc_pico_mb y
+    asignaciones (las TOP_ASIGNACIONES líneas con más memoria retenida al salir).
+    """
+    if perfil is not None and perfil not in PERFILES:
+        raise ValueError(f"Perfil no soportado: {perfil} (opciones: {', '.join(PERFILES)})")
+    datos = {}
+    rss_inicio = status_mb("VmRSS") if reset_peak_rss() else None
+
+    perfilador = None
+    iniciar_tracemalloc = False
+    if perfil == 'cprofile':
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+    elif perfil == 'tracemalloc':
+        iniciar_tracemalloc = not tracemalloc.is_tracing()
+        if iniciar_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    inicio, cpu_inicio = time.perf_counter(), time.process_time()
+    try:
+        yield datos
+    finally:
+        datos['segundos'] = round(time.perf_counter() - inicio, 4)
+        datos['cpu_segundos'] = round(time.process_time() - cpu_inicio, 4)
+        pico = peak_rss_mb()
+        datos['rss_inicio_mb'] = None if rss_inicio is None else round(rss_inicio, 1)
+        datos['rss_pico_mb'] = None if pico is None else round(pico, 1)
+
+        if perfilador is not None:
+            perfilador.disable()
+            if destino is not None:
+                destino = Path(destino)
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                perfilador.dump_stats(destino)
+                datos['perfil'] = str(destino)
+        elif perfil == 'tracemalloc':
+            _, pico_python = tracemalloc.get_traced_memory()
+            estadisticas = tracemalloc.take_snapshot().statistics('lineno')[:TOP_ASIGNACIONES]
+            datos['tracemalloc_pico_mb'] = round(pico_python / MB, 2)
+            datos['asignaciones'] = [
+                {'lugar': str(stat.traceback[0]), 'mb': round(stat.size / MB, 3),
+                 'bloques': stat.count}
+                for stat in estadisticas
+            ]
+            if iniciar_tracemalloc:
+                tracemalloc.stop()
+
+
+def count_rows(paths):
+    """Filas de las tablas indicadas (nombres lógicos .csv o directorios particionados)
+
+    Se omiten las rutas que no son tablas, no existen o no se pueden leer
+    (por ejemplo, archivos fuente con otra codificación); cada tabla se cuenta
+    una sola vez aunque tenga copias en varios formatos. Regresa None si no
+    se pudo contar ninguna.
+    """
+    tablas = set()
+    for path in map(Path, paths):
+        if path.is_dir():
+            tablas.update(p.with_suffix('.csv') for p in path.rglob("*")
+                          if p.is_file() and p.suffix.lstrip('.') in storage.FORMATS)
+        elif path.suffix == '.csv' and storage.table_exists(path):
+            tablas.add(path)
+    filas = None
+    for tabla in tablas:
+        try:
+            filas = (filas or 0) + storage.table_rows(tabla)
+        except (OSError, ValueError):
+            continue
+    return filas
+
+
+class RunLog:
+    """Bitácora JSON lines de una corrida (segura entre hilos)"""
+
+    def __init__(self, script, directorio=RUN_LOG_DIR, perfil=None):
+        self.script = script
+        self.perfil = perfil
+        self.run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        directorio = Path(directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+        self.path = directorio / f"{script}_{self.run_id}.jsonl"
+        self.perfil_dir = directorio / f"{script}_{self.run_id}_perfiles"
+        self._acumulados = {}
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def event(self, evento, **campos):
+        registro = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'run_id': self.run_id,
+            'script': self.script,
+            'evento': evento,
+            **campos,
+        }
+        linea = json.dumps(registro, ensure_ascii=False, default=str)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(linea + "\n")
+                self._file.flush()
+
+    def accumulate(self, grupo, clave, **valores):
+        """Suma `valores` al total de (grupo, clave); se escriben al cerrar"""
+        with self._lock:
+            total = self._acumulados.setdefault((grupo, clave), {})
+            for campo, valor in valores.items():
+                total[campo] = total.get(campo, 0) + valor
+
+    def totals(self, grupo):
+        """{clave: totales} acumulados de un grupo"""
+        with self._lock:
+            return {clave: dict(valores) for (g, clave), valores in self._acumulados.items()
+                    if g == grupo}
+
+    def close(self, **campos):
+        for (grupo, clave), valores in sorted(self._acumulados.items(), key=lambda x: str(x[0])):
+            valores = {campo: round(valor, 4) if isinstance(valor, float) else valor
+                       for campo, valor in valores.items()}
+            self.event('resumen', grupo=grupo, clave=clave, **valores)
+        self.event('fin', **campos)
+        with self._lock:
+            self._file.close()
+
+
+class NullLog:
+    """Bitácora que no escribe nada (corridas sin instrumentación)"""
+
+    script = None
+    perfil = None
+    run_id = None
+    path = None
+    perfil_dir = None
+
+    def event(self, evento, **campos):
+        pass
+
+    def accumulate(self, grupo, clave, **valores):
+        pass
+
+    def totals(self, grupo):
+        return {}
+
+    def close(self, **campos):
+        pass
+
+
+_log = NullLog()
+
+
+def get_log():
+    """Bitácora de la corrida actual (NullLog si no hay corrida iniciada)"""
+    return _log
+
+
+def start_run(script, directorio=RUN_LOG_DIR, perfil=None, **campos):
+    """Abre la bitácora de la corrida y escribe el evento de inicio"""
+    global _log
+    _log = RunLog(script, directorio, perfil)
+    _log.event(
+        'inicio', pid=os.getpid(), python=platform.python_version(),
+        plataforma=platform.platform(), cpus=os.cpu_count(), perfil=perfil, **campos,
+    )
+    return _log
+
+
+def end_run(**campos):
+    """Escribe los resúmenes y el evento de fin y cierra la bitácora"""
+    global _log
+    _log.close(**campos)
+    _log = NullLog()
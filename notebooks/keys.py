@@ -0,0 +1,196 @@
+"""
+Modelo de llaves compacto: estados y periodos como enteros
+
+Dentro del pipeline las filas se identifican con dos llaves enteras:
+
+- Estado: código (int8) de la categoría ESTADO_DTYPE. Las categorías son las
+  etiquetas con las que DataMexico publica cada clave de estado, en orden
+  alfabético, así ordenar por código es ordenar por nombre. El código se
+  obtiene del `State ID` de los archivos crudos (sin comparar cadenas) o, si
+  no lo hay, del nombre.
+- Periodo: entero AAAAT (int32), el mismo `Quarter ID` de DataMexico
+  (19991 = 1999-Q1); los datos anuales usan T = 0 (20130 = 2013). Ver
+  periods.py para leer los formatos de cada fuente y cambiar de frecuencia.
+
+En modo municipal la llave geográfica es la clave INEGI del municipio
+(int32, EEMMM: 1001 = Aguascalientes, Ags.), de la que se deriva el estado
+(clave // 1000); los nombres van en una tabla aparte de municipios.
+
+Las uniones, ordenamientos y agrupaciones se hacen sobre estas llaves; los
+nombres y las columnas Año / Trimestre sólo se reconstruyen al exportar
+(`decode_keys`), como Categoricals.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import numpy as np
+import pandas as pd
+
+import periods
+
+# Diccionario de estados (claves INEGI)
+ESTADOS_IDS = {
+    1: 'Aguascalientes', 2: 'Baja California', 3: 'Baja California Sur',
+    4: 'Campeche', 5: 'Coahuila de Zaragoza', 6: 'Colima',
+    7: 'Chiapas', 8: 'Chihuahua', 9: 'Ciudad de México',
+    10: 'Durango', 11: 'Guanajuato', 12: 'Guerrero',
+    13: 'Hidalgo', 14: 'Jalisco', 15: 'México',
+    16: 'Michoacán de Ocampo', 17: 'Morelos', 18: 'Nayarit',
+    19: 'Nuevo León', 20: 'Oaxaca', 21: 'Puebla',
+    22: 'Querétaro', 23: 'Quintana Roo', 24: 'San Luis Potosí',
+    25: 'Sinaloa', 26: 'Sonora', 27: 'Tabasco',
+    28: 'Tamaulipas', 29: 'Tlaxcala', 30: 'Veracruz de Ignacio de la Llave',
+    31: 'Yucatán', 32: 'Zacatecas'
+}
+
+# Etiquetas con las que DataMexico publica cada clave: el Estado de México
+# tiene otro nombre y el gasto incluye claves que no son estados
+ETIQUETAS_IDS = {
+    **ESTADOS_IDS,
+    15: 'Estado de México',
+    34: 'No distribuible geográficamente',
+    35: 'En el extranjero',
+}
+ESTADOS_NOMBRES_IDS = {
+    **{nombre: id_estado for id_estado, nombre in ESTADOS_IDS.items()},
+    **{nombre: id_estado for id_estado, nombre in ETIQUETAS_IDS.items()},
+}
+
+# Etiqueta de los datos nacionales (INEGI), que no tienen código de estado
+NACIONAL = 'Nacional'
+
+ESTADO_DTYPE = pd.CategoricalDtype(sorted(ETIQUETAS_IDS.values()), ordered=True)
+TRIMESTRE_DTYPE = pd.CategoricalDtype(['Q1', 'Q2', 'Q3', 'Q4'], ordered=True)
+
+# Tablas de traducción clave INEGI <-> código de categoría
+_CODIGO_POR_ID = np.full(max(ETIQUETAS_IDS) + 1, -1, dtype=np.int8)
+for _id, _etiqueta in ETIQUETAS_IDS.items():
+    _CODIGO_POR_ID[_id] = ESTADO_DTYPE.categories.get_loc(_etiqueta)
+_ID_POR_CODIGO = np.array(
+    [ESTADOS_NOMBRES_IDS[etiqueta] for etiqueta in ESTADO_DTYPE.categories], dtype=np.int8
+)
+
+
+def estado_codes(ids):
+    """Códigos de estado (int8) a partir de claves INEGI"""
+    ids = np.asarray(ids, dtype=np.int64)
+    validos = (ids >= 0) & (ids < len(_CODIGO_POR_ID))
+    codigos = np.where(validos, _CODIGO_POR_ID[np.where(validos, ids, 0)], -1)
+    if (codigos < 0).any():
+        raise ValueError(f"Claves de estado desconocidas: {sorted(set(ids[codigos < 0]))}")
+    return codigos.astype(np.int8)
+
+
+def estado_ids_from_names(nombres):
+    """Claves INEGI a partir de nombres (sólo se buscan los nombres distintos)"""
+    codigos, unicos = pd.factorize(pd.Series(nombres), use_na_sentinel=False)
+    ids = np.array([ESTADOS_NOMBRES_IDS.get(nombre, -1) for nombre in unicos], dtype=np.int64)
+    if (ids < 0).any():
+        raise ValueError(f"Estados desconocidos: {sorted(map(str, unicos[ids < 0]))}")
+    return ids[codigos]
+
+
+def estado_ids(codigos):
+    """Claves INEGI a partir de códigos de estado"""
+    return _ID_POR_CODIGO[np.asarray(codigos)]
+
+
+def inegi_estado_ids(areas):
+    """Claves INEGI de estado a partir de las áreas geográficas de INEGI (0 = nacional)
+
+    Se aceptan '00' / '0700' (nacional), 'EE' y '0700EE' / '070000EE'
+    (estatal) y claves de municipio 'EEMMM'; sólo se analizan las distintas.
+    """
+    codigos, unicos = pd.factorize(pd.Series(areas, dtype='string').str.strip(),
+                                   use_na_sentinel=False)
+    ids = []
+    for area in unicos:
+        area = '' if pd.isna(area) else str(area)
+        if not area.isdigit():
+            ids.append(-1)
+        elif area.startswith('0700'):
+            ids.append(int(area[4:] or 0))
+        elif len(area) <= 2:
+            ids.append(int(area))
+        elif len(area) == 5:
+            ids.append(int(area) // 1000)
+        else:
+            ids.append(-1)
+    ids = np.array(ids, dtype=np.int64)
+    if ((ids < 0) | (ids > max(ESTADOS_IDS))).any():
+        malos = (ids < 0) | (ids > max(ESTADOS_IDS))
+        raise ValueError(f"Áreas INEGI desconocidas: {sorted(map(str, unicos[malos]))}")
+    return ids[codigos]
+
+
+def municipio_ids(df):
+    """Claves INEGI de municipio (int32) de un archivo crudo DataMexico"""
+    return df['Municipality ID'].to_numpy(dtype=np.int32)
+
+
+def municipio_estado_ids(ids):
+    """Clave INEGI del estado de cada municipio"""
+    return np.asarray(ids) // 1000
+
+
+def raw_periods(df):
+    """Periodo AAAAT de un archivo crudo DataMexico
+
+    Se usa 'Quarter ID' si existe; si no, 'Quarter' ('1999-Q1'), analizando
+    sólo las cadenas distintas; los datos anuales usan 'Year'.
+    """
+    if 'Quarter ID' in df.columns:
+        return periods.from_quarter_ids(df['Quarter ID'].to_numpy())
+    if 'Quarter' in df.columns:
+        return periods.parse_quarters(df['Quarter'])
+    return periods.from_years(df['Year'].to_numpy())
+
+
+def raw_keys(df):
+    """Llaves (Estado, Periodo) de un archivo crudo DataMexico
+
+    Se usa 'State ID' si existe; si no, el nombre en 'State'.
+    """
+    if 'State ID' in df.columns:
+        ids = df['State ID'].to_numpy(dtype=np.int64)
+    else:
+        ids = estado_ids_from_names(df['State'])
+    return estado_codes(ids), raw_periods(df)
+
+
+def sort_order(estados, periodos):
+    """Orden estable por estado (alfabético) y periodo"""
+    return np.lexsort((np.asarray(periodos), np.asarray(estados)))
+
+
+def encode_keys(df):
+    """Convierte Estado / Año / Trimestre de una tabla procesada a Estado / Periodo"""
+    ids = estado_ids_from_names(df['Estado'])
+    if 'Trimestre' in df.columns:
+        # Trimestre vacío (código -1) = dato anual, T = 0
+        trimestres = pd.Categorical(df['Trimestre'], dtype=TRIMESTRE_DTYPE).codes + 1
+        periodos = periods.compose(df['Año'].to_numpy(), trimestres, periods.TRIMESTRAL)
+    else:
+        periodos = periods.from_years(df['Año'].to_numpy())
+    valores = df.drop(columns=[col for col in ('Estado', 'Año', 'Trimestre') if col in df.columns])
+    llaves = pd.DataFrame({'Estado': estado_codes(ids), 'Periodo': periodos}, index=df.index)
+    return pd.concat([llaves, valores], axis=1)
+
+
+def decode_keys(df):
+    """Reconstruye Estado / Año / Trimestre (Categoricals) a partir de Estado / Periodo
+
+    Trimestre sólo se agrega si hay periodos trimestrales (T > 0).
+    """
+    anos, trimestres = periods.split(df['Periodo'].to_numpy(), periods.TRIMESTRAL)
+    llaves = {
+        'Estado': pd.Categorical.from_codes(df['Estado'].to_numpy(), dtype=ESTADO_DTYPE),
+        'Año': anos.astype(np.int16),
+    }
+    if trimestres.any():
+        llaves['Trimestre'] = pd.Categorical.from_codes(trimestres - 1, dtype=TRIMESTRE_DTYPE)
+    valores = df.drop(columns=['Estado', 'Periodo'])
+    return pd.concat(
+        [pd.DataFrame(llaves, index=df.index), valores], axis=1
+    )
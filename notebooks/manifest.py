@@ -0,0 +1,157 @@
+"""
+Manifiesto de construcción para reconstrucciones incrementales
+
+Por cada etapa se guarda la versión del código que la ejecutó, el hash del
+contenido de cada archivo de entrada y el de cada archivo de salida. Una etapa
+se omite cuando la versión del código, todas sus entradas y todas sus salidas
+coinciden con lo registrado; si un archivo crudo cambia sólo se re-ejecutan su
+etapa y las que leen lo que ésta escribe.
+
+Los hashes (SHA-256) se guardan junto con el tamaño y la fecha de modificación
+de cada archivo: si éstos no cambiaron no se vuelve a leer el archivo, así una
+corrida sin cambios sólo consulta `stat` y termina casi de inmediato.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import storage
+
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path):
+    """Hash SHA-256 del contenido de un archivo, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def code_version(*modules, extra=""):
+    """Versión del código: hash de las fuentes de `modules` y de `extra`"""
+    digest = hashlib.sha256(extra.encode('utf-8'))
+    for module in modules:
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def physical_path(path):
+    """Archivo real de una ruta: la copia vigente si es una tabla (.csv lógico)"""
+    path = Path(path)
+    if path.suffix == ".csv":
+        return storage.find_table(path)
+    return path if path.exists() else None
+
+
+class BuildManifest:
+    """Manifiesto de etapas construidas, guardado como JSON en `path`"""
+
+    def __init__(self, path, codigo):
+        self.path = Path(path)
+        self.codigo = codigo
+        self.etapas = {}
+        self._archivos = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                datos = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if datos.get("version") != MANIFEST_VERSION:
+            return
+        self.etapas = datos.get("etapas", {})
+        self._archivos = datos.get("archivos", {})
+
+    def _key(self, archivo):
+        return os.path.relpath(archivo, self.path.parent)
+
+    def file_hash(self, path):
+        """Hash del contenido vigente de `path` (None si no existe)
+
+        Un directorio (por ejemplo, una tabla particionada) se resume con el
+        nombre y el hash de cada uno de sus archivos.
+        """
+        archivo = physical_path(path)
+        if archivo is None:
+            return None
+        if archivo.is_dir():
+            digest = hashlib.sha256()
+            for parte in sorted(p for p in archivo.rglob("*") if p.is_file()):
+                digest.update(f"{parte.relative_to(archivo).as_posix()}:{self.file_hash(parte)}\n".encode('utf-8'))
+            return digest.hexdigest()
+        info = archivo.stat()
+        key = self._key(archivo)
+        cache = self._archivos.get(key)
+        if cache and cache["size"] == info.st_size and cache["mtime_ns"] == info.st_mtime_ns:
+            return cache["sha256"]
+        digest = sha256_file(archivo)
+        self._archivos[key] = {
+            "size": info.st_size, "mtime_ns": info.st_mtime_ns, "sha256": digest,
+        }
+        return digest
+
+    def _hashes(self, paths):
+        hashes = {}
+        for path in paths:
+            archivo = physical_path(path)
+            hashes[self._key(archivo or path)] = self.file_hash(path)
+        return hashes
+
+    def is_current(self, stage):
+        """True si la etapa ya se construyó con este código, estas entradas y
+        sus salidas siguen intactas"""
+        entrada = self.etapas.get(stage.nombre)
+        if not entrada or entrada.get("codigo") != self.codigo:
+            return False
+        if not stage.salidas:
+            return False
+        # Una entrada ausente (None) cuenta como estado: si sigue ausente no
+        # hay cambio, si aparece la etapa se re-ejecuta
+        if self._hashes(stage.entradas) != entrada.get("entradas"):
+            return False
+        salidas = self._hashes(stage.salidas)
+        return None not in salidas.values() and salidas == entrada.get("salidas")
+
+    def record(self, stage, resultado):
+        """Registra una etapa exitosa; una etapa fallida se olvida para
+        re-ejecutarla en la siguiente corrida"""
+        if not resultado.ok:
+            self.etapas.pop(stage.nombre, None)
+            return
+        self.etapas[stage.nombre] = {
+            "codigo": self.codigo,
+            "entradas": self._hashes(stage.entradas),
+            "salidas": self._hashes(stage.salidas),
+            "fecha": datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def save(self):
+        """Escribe el manifiesto de forma atómica (sólo con los hashes en uso)"""
+        en_uso = set()
+        for entrada in self.etapas.values():
+            en_uso.update(k for k, v in entrada["entradas"].items() if v)
+            en_uso.update(entrada["salidas"])
+        datos = {
+            "version": MANIFEST_VERSION,
+            "etapas": self.etapas,
+            "archivos": {
+                k: v for k, v in self._archivos.items()
+                # Los archivos dentro de un directorio en uso también se conservan
+                if k in en_uso or any(str(padre) in en_uso for padre in Path(k).parents)
+            },
+        }
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
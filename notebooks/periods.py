@@ -0,0 +1,194 @@
+"""
+Periodos como enteros: lectura de los formatos de cada fuente y conversión
+entre frecuencias
+
+Cada frecuencia tiene su código entero (int32):
+
+- Anual (A): AAAA0, el trimestre 0 de keys.py (20130 = 2013)
+- Trimestral (Q): AAAAT, el `Quarter ID` de DataMexico (19991 = 1999-Q1)
+- Mensual (M): AAAAMM, como la incidencia del SESNSP (202403 = marzo 2024)
+
+Las cadenas ('1999-Q1', '2020/03') se leen una sola vez por valor distinto y
+el resultado se reparte a todas las filas con NumPy; las conversiones entre
+frecuencias son operaciones aritméticas sobre arreglos completos.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import numpy as np
+import pandas as pd
+
+ANUAL, TRIMESTRAL, MENSUAL = 'A', 'Q', 'M'
+FRECUENCIAS = (ANUAL, TRIMESTRAL, MENSUAL)
+NOMBRES = {ANUAL: 'anual', TRIMESTRAL: 'trimestral', MENSUAL: 'mensual'}
+
+# Meses que cubre un periodo de cada frecuencia
+_MESES_POR_PERIODO = {ANUAL: 12, TRIMESTRAL: 3, MENSUAL: 1}
+
+# AAAA, opcionalmente seguido de un separador y un subperiodo: '2020',
+# '2020-Q1', '2020/03', '2020/T1', '2020-03'
+_PATRON = r'^\s*(?P<ano>\d{4})(?:\s*[-/.]?\s*(?P<marca>[QqTt])?\s*(?P<sub>\d{1,2}))?\s*$'
+
+
+def _check(frecuencia):
+    if frecuencia not in FRECUENCIAS:
+        raise ValueError(f"Frecuencia no soportada: {frecuencia} (opciones: {', '.join(FRECUENCIAS)})")
+
+
+def _parse_unique(valores):
+    """Códigos de los valores distintos y partes (año, subperiodo, marca Q/T)
+
+    Regresa (códigos por fila, años, subperiodos, marcas) donde los tres
+    últimos arreglos son por valor distinto; subperiodo 0 = sin subperiodo.
+    """
+    codigos, unicos = pd.factorize(pd.Series(valores, dtype=object), use_na_sentinel=True)
+    if (codigos < 0).any():
+        raise ValueError(f"Hay {int(np.count_nonzero(codigos < 0))} periodos vacíos")
+    partes = pd.Series(unicos, dtype='string').str.extract(_PATRON)
+    invalidos = partes['ano'].isna().to_numpy()
+    if invalidos.any():
+        raise ValueError(f"Periodos no reconocidos: {sorted(map(str, unicos[invalidos]))[:10]}")
+    anos = partes['ano'].astype(int).to_numpy(dtype=np.int32)
+    subs = partes['sub'].fillna('0').astype(int).to_numpy(dtype=np.int32)
+    marcas = partes['marca'].notna().to_numpy()
+    return codigos, anos, subs, marcas
+
+
+def compose(anos, subperiodos, frecuencia):
+    """Código de periodo a partir de año y subperiodo (trimestre o mes)"""
+    _check(frecuencia)
+    anos = np.asarray(anos, dtype=np.int32)
+    if frecuencia == ANUAL:
+        return anos * 10
+    subperiodos = np.asarray(subperiodos, dtype=np.int32)
+    return anos * (10 if frecuencia == TRIMESTRAL else 100) + subperiodos
+
+
+def split(codigos, frecuencia):
+    """(año, subperiodo) de cada código; el subperiodo anual es 0"""
+    _check(frecuencia)
+    codigos = np.asarray(codigos, dtype=np.int32)
+    base = 100 if frecuencia == MENSUAL else 10
+    return codigos // base, codigos % base
+
+
+def from_quarter_ids(ids):
+    """Códigos trimestrales a partir de `Quarter ID` (ya son AAAAT)"""
+    return np.asarray(ids, dtype=np.int32)
+
+
+def from_years(anos):
+    """Códigos anuales a partir de años"""
+    return compose(anos, 0, ANUAL)
+
+
+def parse_quarters(valores):
+    """Códigos trimestrales a partir de etiquetas '1999-Q1'"""
+    codigos, anos, subs, _ = _parse_unique(valores)
+    if ((subs < 1) | (subs > 4)).any():
+        raise ValueError("Trimestres fuera de rango (1-4)")
+    return compose(anos, subs, TRIMESTRAL)[codigos]
+
+
+def parse_inegi(valores, frecuencia=None):
+    """Códigos a partir de `TIME_PERIOD` de INEGI; regresa (códigos, frecuencia)
+
+    '2020' es anual; '2020/03' es trimestral o mensual según `frecuencia`.
+    Sin `frecuencia` se infiere: una marca de trimestre ('2020/T1') o
+    subperiodos que no pasan de 4 indican datos trimestrales, si no mensuales.
+    Todos los valores deben tener la misma frecuencia (una serie a la vez).
+    """
+    codigos, anos, subs, marcas = _parse_unique(valores)
+    con_sub = subs > 0
+    if con_sub.any() and not con_sub.all():
+        raise ValueError("Periodos anuales y subanuales en la misma serie")
+    if frecuencia is None:
+        if not con_sub.any():
+            frecuencia = ANUAL
+        elif marcas.any() or subs.max() <= 4:
+            frecuencia = TRIMESTRAL
+        else:
+            frecuencia = MENSUAL
+    _check(frecuencia)
+    limite = {ANUAL: 0, TRIMESTRAL: 4, MENSUAL: 12}[frecuencia]
+    if (subs > limite).any() or (frecuencia != ANUAL and not con_sub.all()):
+        raise ValueError(f"Periodos que no corresponden a la frecuencia {frecuencia}")
+    return compose(anos, subs, frecuencia)[codigos], frecuencia
+
+
+def _months(codigos, frecuencia):
+    """(año, primer mes, último mes) que cubre cada código"""
+    anos, subs = split(codigos, frecuencia)
+    tamano = _MESES_POR_PERIODO[frecuencia]
+    if frecuencia == ANUAL:
+        inicio = np.ones_like(anos)
+    else:
+        inicio = (subs - 1) * tamano + 1
+    return anos, inicio, inicio + tamano - 1
+
+
+def _from_months(anos, meses, frecuencia):
+    if frecuencia == ANUAL:
+        return compose(anos, 0, ANUAL)
+    if frecuencia == TRIMESTRAL:
+        return compose(anos, (meses - 1) // 3 + 1, TRIMESTRAL)
+    return compose(anos, meses, MENSUAL)
+
+
+def convert(codigos, origen, destino, posicion='inicio'):
+    """Convierte códigos de una frecuencia a otra en un solo paso
+
+    A una frecuencia menor (mensual -> trimestral -> anual) cada periodo va al
+    que lo contiene; a una mayor, al primer subperiodo (`posicion='inicio'`) o
+    al último ('fin'). Para repartir un periodo en todos sus subperiodos usar
+    `expand`.
+    """
+    _check(origen)
+    _check(destino)
+    if posicion not in ('inicio', 'fin'):
+        raise ValueError(f"Posición no soportada: {posicion}")
+    anos, inicio, fin = _months(codigos, origen)
+    return _from_months(anos, inicio if posicion == 'inicio' else fin, destino)
+
+
+def expand(codigos, origen, destino):
+    """Reparte cada periodo en sus subperiodos de la frecuencia `destino`
+
+    Regresa (filas, códigos): `filas` indica de qué posición de `codigos`
+    viene cada código nuevo (para tomar los valores con `take`). Si `destino`
+    no es más fino que `origen` equivale a `convert`.
+    """
+    _check(origen)
+    _check(destino)
+    codigos = np.asarray(codigos, dtype=np.int32)
+    n = _MESES_POR_PERIODO[origen] // _MESES_POR_PERIODO[destino]
+    if n <= 1:
+        return np.arange(len(codigos)), convert(codigos, origen, destino)
+    anos, inicio, _ = _months(codigos, origen)
+    filas = np.repeat(np.arange(len(codigos)), n)
+    meses = inicio[filas] + np.tile(np.arange(n, dtype=np.int32) * _MESES_POR_PERIODO[destino], len(codigos))
+    return filas, _from_months(anos[filas], meses, destino)
+
+
+def period_range(inicio, fin, frecuencia):
+    """Códigos consecutivos de `inicio` a `fin` (inclusive)"""
+    _check(frecuencia)
+    por_ano = {ANUAL: 1, TRIMESTRAL: 4, MENSUAL: 12}[frecuencia]
+    anos, subs = split([inicio, fin], frecuencia)
+    ordinales = anos * por_ano + np.maximum(subs, 1) - 1
+    secuencia = np.arange(ordinales[0], ordinales[1] + 1, dtype=np.int32)
+    return compose(secuencia // por_ano, secuencia % por_ano + 1, frecuencia)
+
+
+def labels(codigos, frecuencia):
+    """Etiquetas legibles ('2020', '2020-Q1', '2020-03'), por valor distinto"""
+    unicos, inversa = np.unique(np.asarray(codigos, dtype=np.int32), return_inverse=True)
+    anos, subs = split(unicos, frecuencia)
+    if frecuencia == ANUAL:
+        texto = [str(ano) for ano in anos]
+    elif frecuencia == TRIMESTRAL:
+        texto = [f"{ano}-Q{sub}" for ano, sub in zip(anos, subs)]
+    else:
+        texto = [f"{ano}-{sub:02d}" for ano, sub in zip(anos, subs)]
+    return np.array(texto, dtype=object)[inversa]
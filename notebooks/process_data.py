@@ -4,6 +4,16 @@ Script unificado para procesamiento de datos
 Este script procesa los datos crudos descargados y genera datasets tidy
 listos para análisis.
 
+Los datasets crudos con la misma forma (estado, periodo, valores) se declaran
+en el registro DATASETS y los procesa un solo motor (`process_dataset`);
+agregar un indicador nuevo es agregar una entrada al registro.
+
+Las etapas forman un DAG (ver `build_stages`): los datasets independientes se
+procesan en paralelo en un pool de procesos (`--workers`) y la consolidación y
+el reporte de calidad esperan a las etapas que necesitan. Un manifiesto de
+construcción (data/processed/build_manifest.json) registra los hashes de
+entradas, salidas y código de cada etapa, y las etapas sin cambios se omiten.
+
 Procesos realizados:
 1. Limpieza y validación de datos
 2. Transformación a formato tidy
@@ -14,19 +24,36 @@ Autor: Equipo Seguridad y Desarrollo
 Fecha: 2025
 """
 
+import argparse
+import os
 import sys
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 import numpy as np
 
+import instrumentation
+import keys
+import periods
+import profiler
+import sesnsp
+import storage
+from profiler import profile_table, write_json
+from manifest import BuildManifest, code_version
+from stages import DEFAULT_WORKERS, Stage, format_report, run_stages
+
 # Configuración de rutas
 BASE_DIR = Path(__file__).resolve().parents[1]
 RAW_DATA_DIR = BASE_DIR / "data" / "raw"
 INTERIM_DATA_DIR = BASE_DIR / "data" / "interim"
 PROCESSED_DATA_DIR = BASE_DIR / "data" / "processed"
 
+# Tipos de las columnas llave de las tablas procesadas
+KEY_DTYPES = {'Estado': 'string', 'Año': 'int16', 'Trimestre': 'string'}
+
 # Crear directorios si no existen
 INTERIM_DATA_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -59,97 +86,198 @@ def validate_data(df, nombre, columnas_requeridas):
     return True
 
 
-def process_ied_data():
-    """Procesa datos de Inversión Extranjera Directa"""
-    print("\n" + "="*80)
-    print("PROCESANDO: Inversión Extranjera Directa (IED)")
-    print("="*80)
-    
-    try:
-        # Leer datos crudos
-        df = pd.read_csv(RAW_DATA_DIR / "ied_raw.csv")
-        
-        # Validar
-        if not validate_data(df, "IED", ['State', 'Quarter', 'Investment']):
-            return False
-        
-        # Limpiar y transformar
-        df_clean = df.copy()
-        
-        # Convertir Investment a numérico
-        df_clean['Investment'] = pd.to_numeric(df_clean['Investment'], errors='coerce')
-        
-        # Extraer año y trimestre
-        df_clean['Año'] = df_clean['Quarter'].str[:4].astype(int)
-        df_clean['Trimestre'] = df_clean['Quarter'].str[-2:]
-        
-        # Renombrar columnas
-        df_clean = df_clean.rename(columns={
-            'State': 'Estado',
-            'Investment': 'IED_millones_usd'
-        })
-        
-        # Seleccionar columnas finales
-        df_tidy = df_clean[['Estado', 'Año', 'Trimestre', 'IED_millones_usd']]
-        
-        # Ordenar
-        df_tidy = df_tidy.sort_values(['Estado', 'Año', 'Trimestre'])
-        
-        # Guardar datos procesados
-        filepath = PROCESSED_DATA_DIR / "ied_procesado.csv"
-        df_tidy.to_csv(filepath, index=False)
-        print(f"\n✓ Datos procesados guardados: {filepath}")
-        print(f"  Registros: {len(df_tidy)}")
-        print(f"  Estados: {df_tidy['Estado'].nunique()}")
-        print(f"  Periodo: {df_tidy['Año'].min()}-{df_tidy['Año'].max()}")
-        
-        return True
-        
-    except Exception as e:
-        print(f"\n✗ Error procesando IED: {str(e)}")
-        return False
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Especificación declarativa de un dataset crudo y su versión procesada
+
+    - fuente / salida: archivos crudo y procesado (nombres lógicos .csv)
+    - valores: columnas de valor del crudo y su nombre en la salida
+    - frecuencia: 'trimestral' (columna Quarter / Quarter ID) o 'anual' (Year)
+    - dtypes: tipos fijos al leer las columnas llave del crudo
+    - detalle: columnas extra que se conservan en un archivo intermedio, antes
+      de sumar los valores por estado y periodo (por ejemplo, grupos funcionales)
+    - salida_municipal: en datasets municipales, la tabla procesada por
+      municipio; `salida` es entonces el total estatal calculado a partir de ella
+    """
+    nombre: str
+    titulo: str
+    fuente: str
+    salida: str
+    valores: dict
+    frecuencia: str = 'trimestral'
+    dtypes: dict = field(default_factory=dict)
+    detalle: dict = field(default_factory=dict)
+    salida_detalle: Optional[str] = None
+    salida_municipal: Optional[str] = None
+
+
+DATASETS = [
+    DatasetSpec(
+        nombre='IED',
+        titulo='Inversión Extranjera Directa (IED)',
+        fuente='ied_raw.csv',
+        salida='ied_procesado.csv',
+        valores={'Investment': 'IED_millones_usd'},
+        dtypes={'State ID': 'Int8', 'State': 'string', 'Quarter ID': 'Int32', 'Quarter': 'string'},
+    ),
+    DatasetSpec(
+        nombre='Salario',
+        titulo='Salario Mensual',
+        fuente='salario_raw.csv',
+        salida='salario_procesado.csv',
+        valores={'Monthly Wage': 'Salario_mensual_pesos'},
+        dtypes={'State ID': 'Int8', 'State': 'string', 'Quarter ID': 'Int32', 'Quarter': 'string'},
+    ),
+    DatasetSpec(
+        nombre='PEA',
+        titulo='Población Económicamente Activa (PEA)',
+        fuente='pea_raw.csv',
+        salida='pea_procesado.csv',
+        valores={'Workforce': 'PEA_personas'},
+        dtypes={'State ID': 'Int8', 'State': 'string', 'Quarter ID': 'Int32', 'Quarter': 'string'},
+    ),
+    DatasetSpec(
+        nombre='Gasto',
+        titulo='Gasto Público Ejecutado',
+        fuente='gasto_raw.csv',
+        salida='gasto_procesado.csv',
+        valores={'Amount Executed': 'Gasto_ejecutado_pesos'},
+        frecuencia='anual',
+        dtypes={'State ID': 'Int8', 'State': 'string', 'Year': 'int16',
+                'Functional Group': 'string'},
+        detalle={'Functional Group': 'Grupo_Funcional'},
+        salida_detalle='gasto_detallado.csv',
+    ),
+    DatasetSpec(
+        nombre='Remesas',
+        titulo='Remesas',
+        fuente='remesas_raw.csv',
+        salida='remesas_procesado.csv',
+        valores={'Remittance Amount': 'Remesas_millones_usd'},
+        dtypes={'State ID': 'Int8', 'State': 'string', 'Quarter ID': 'Int32', 'Quarter': 'string'},
+    ),
+]
+
+# Datasets con corte municipal (modo --municipal): sustituyen al dataset
+# estatal del mismo nombre, cuyo total se calcula sumando los municipios
+MUNICIPAL_DATASETS = {
+    'Remesas': DatasetSpec(
+        nombre='Remesas',
+        titulo='Remesas por municipio',
+        fuente='remesas_municipal_raw.csv',
+        salida='remesas_procesado.csv',
+        salida_municipal='remesas_municipal_procesado.csv',
+        valores={'Remittance Amount': 'Remesas_millones_usd'},
+        dtypes={'Municipality ID': 'Int32', 'Municipality': 'string', 'State ID': 'Int8',
+                'Quarter': 'string'},
+    ),
+}
+MUNICIPAL_CHUNK_SIZE = 200_000
+MUNICIPIOS_FILE = "municipios.csv"
+
+# Incidencia delictiva municipal del SESNSP (ver sesnsp.py): tabla
+# particionada por año y tabla de tipos de delito
+SESNSP_RAW_NAME = "sesnsp_idm_raw"
+INCIDENCIA_DIR = "incidencia_delictiva"
+TIPOS_DELITO_FILE = "tipos_delito.csv"
+SEGURIDAD_STAGE = 'Seguridad (SESNSP)'
+
+INEGI_RAW_FILE = "inegi_educacion_salud_raw.csv"
+INEGI_FILE = "educacion_salud_procesado.csv"
+CONSOLIDADO_FILE = "datos_consolidados.csv"
+
+# Tablas procesadas que se consolidan, por nombre corto
+PROCESADOS = {
+    'ied': "ied_procesado.csv",
+    'salario': "salario_procesado.csv",
+    'pea': "pea_procesado.csv",
+    'gasto': "gasto_procesado.csv",
+    'remesas': "remesas_procesado.csv",
+    'educacion_salud': INEGI_FILE,
+}
+
+
+def _source_columns(spec, disponibles):
+    """Columnas que se leen del crudo: las claves enteras si existen, si no los nombres"""
+    estado = ['State ID'] if 'State ID' in disponibles else ['State']
+    if spec.frecuencia == 'trimestral':
+        periodo = ['Quarter ID'] if 'Quarter ID' in disponibles else ['Quarter']
+    else:
+        periodo = ['Year']
+    return estado + periodo + list(spec.detalle) + list(spec.valores)
+
+
+def read_raw(spec, raw_dir=None):
+    """Lee del crudo sólo las columnas que usa el dataset, con tipos fijos"""
+    filepath = Path(raw_dir or RAW_DATA_DIR) / spec.fuente
+    columnas = _source_columns(spec, storage.table_columns(filepath))
+    dtypes = {col: dtype for col, dtype in spec.dtypes.items() if col in columnas}
+    return storage.read_table(filepath, columns=columnas, dtypes=dtypes)
+
+
+def tidy_dataset(spec, df):
+    """Tabla tidy de un crudo ya leído; regresa (tabla, detalle o None)
+
+    Las filas se agrupan y ordenan por las llaves enteras (Estado, Periodo)
+    de keys.py; los nombres se reconstruyen al final. `detalle` es la tabla
+    antes de sumar las columnas de `spec.detalle` (por ejemplo, el gasto por
+    grupo funcional). El DataFrame de entrada no se modifica.
+    """
+    estados, periodos = keys.raw_keys(df)
+    columnas = {'Estado': estados, 'Periodo': periodos}
+    for origen, destino in spec.detalle.items():
+        columnas[destino] = df[origen].to_numpy()
+    # Valores a numérico (sólo si no lo son ya)
+    for origen, destino in spec.valores.items():
+        valores = df[origen]
+        if not pd.api.types.is_numeric_dtype(valores):
+            valores = pd.to_numeric(valores, errors='coerce')
+        columnas[destino] = valores.to_numpy()
+    df_tidy = pd.DataFrame(columnas)
+
+    detalle = None
+    if spec.detalle:
+        detalle = keys.decode_keys(df_tidy)
+        # Agregar por estado y periodo (sumando el detalle); queda ordenado
+        df_tidy = df_tidy.groupby(['Estado', 'Periodo'], sort=True).agg(
+            {col: 'sum' for col in spec.valores.values()}
+        ).reset_index()
+    else:
+        df_tidy = df_tidy.take(keys.sort_order(estados, periodos))
+    return keys.decode_keys(df_tidy), detalle
 
 
-def process_salario_data():
-    """Procesa datos de Salario Mensual"""
+def process_dataset(spec):
+    """Procesa un dataset del registro DATASETS y guarda su versión tidy"""
     print("\n" + "="*80)
-    print("PROCESANDO: Salario Mensual")
+    print(f"PROCESANDO: {spec.titulo}")
     print("="*80)
     
     try:
         # Leer datos crudos
-        df = pd.read_csv(RAW_DATA_DIR / "salario_raw.csv")
+        df = read_raw(spec)
         
         # Validar
-        if not validate_data(df, "Salario", ['State', 'Quarter', 'Monthly Wage']):
+        if not validate_data(df, spec.nombre, _source_columns(spec, df.columns)):
             return False
         
-        # Limpiar y transformar
-        df_clean = df.copy()
+        df_tidy, detalle = tidy_dataset(spec, df)
         
-        # Convertir salario a numérico
-        df_clean['Monthly Wage'] = pd.to_numeric(df_clean['Monthly Wage'], errors='coerce')
-        
-        # Extraer año y trimestre
-        df_clean['Año'] = df_clean['Quarter'].str[:4].astype(int)
-        df_clean['Trimestre'] = df_clean['Quarter'].str[-2:]
-        
-        # Renombrar columnas
-        df_clean = df_clean.rename(columns={
-            'State': 'Estado',
-            'Monthly Wage': 'Salario_mensual_pesos'
-        })
-        
-        # Seleccionar columnas finales
-        df_tidy = df_clean[['Estado', 'Año', 'Trimestre', 'Salario_mensual_pesos']]
-        
-        # Ordenar
-        df_tidy = df_tidy.sort_values(['Estado', 'Año', 'Trimestre'])
+        if detalle is not None:
+            # Guardar datos detallados en interim
+            filepath_interim = storage.write_table(
+                detalle, INTERIM_DATA_DIR / spec.salida_detalle,
+                dtypes={**KEY_DTYPES, **{col: 'string' for col in spec.detalle.values()}}
+            )
+            print(f"\n✓ Datos detallados guardados: {filepath_interim}")
         
         # Guardar datos procesados
-        filepath = PROCESSED_DATA_DIR / "salario_procesado.csv"
-        df_tidy.to_csv(filepath, index=False)
-        print(f"\n✓ Datos procesados guardados: {filepath}")
+        filepath = storage.write_table(df_tidy, PROCESSED_DATA_DIR / spec.salida,
+                                       dtypes=KEY_DTYPES)
+        if detalle is not None:
+            print(f"✓ Datos agregados guardados: {filepath}")
+        else:
+            print(f"\n✓ Datos procesados guardados: {filepath}")
         print(f"  Registros: {len(df_tidy)}")
         print(f"  Estados: {df_tidy['Estado'].nunique()}")
         print(f"  Periodo: {df_tidy['Año'].min()}-{df_tidy['Año'].max()}")
@@ -157,167 +285,203 @@ def process_salario_data():
         return True
         
     except Exception as e:
-        print(f"\n✗ Error procesando Salario: {str(e)}")
+        print(f"\n✗ Error procesando {spec.nombre}: {str(e)}")
         return False
 
 
-def process_pea_data():
-    """Procesa datos de Población Económicamente Activa"""
+def process_municipal_dataset(spec, chunksize=MUNICIPAL_CHUNK_SIZE):
+    """Procesa un dataset municipal por bloques y calcula su total estatal
+
+    El crudo se lee por bloques de `chunksize` filas; cada bloque se escribe
+    de inmediato a la tabla municipal (llave: clave INEGI del municipio y
+    periodo) y se suma por estado y periodo. En memoria sólo hay un bloque, la
+    tabla de municipios (~2,500 filas) y los totales estatales, así la memoria
+    no crece con el número de filas.
+    """
     print("\n" + "="*80)
-    print("PROCESANDO: Población Económicamente Activa (PEA)")
+    print(f"PROCESANDO: {spec.titulo}")
     print("="*80)
     
     try:
-        # Leer datos crudos
-        df = pd.read_csv(RAW_DATA_DIR / "pea_raw.csv")
-        
-        # Validar
-        if not validate_data(df, "PEA", ['State', 'Quarter', 'Workforce']):
+        filepath = RAW_DATA_DIR / spec.fuente
+        if not storage.table_exists(filepath):
+            print(f"  ⚠ Archivo no encontrado: {filepath}")
             return False
+        disponibles = storage.table_columns(filepath)
+        faltantes = {'Municipality ID', *spec.valores} - set(disponibles)
+        if faltantes or not {'Quarter ID', 'Quarter'} & set(disponibles):
+            print(f"    ✗ Error: Faltan columnas: {faltantes or {'Quarter'}}")
+            return False
+        columnas = ['Municipality ID'] + [
+            col for col in ('Municipality', 'State ID', 'Quarter ID', 'Quarter')
+            if col in disponibles
+        ] + list(spec.valores)
+        
+        parcial = PROCESSED_DATA_DIR / f"{spec.salida_municipal}.parcial"
+        municipios = {}
+        totales = None
+        filas = 0
+        with open(parcial, 'w', encoding='utf-8', newline='') as f:
+            for bloque in storage.iter_table(filepath, columns=columnas, chunksize=chunksize):
+                for col in spec.valores:
+                    if not pd.api.types.is_numeric_dtype(bloque[col]):
+                        bloque[col] = pd.to_numeric(bloque[col], errors='coerce')
+                ids = keys.municipio_ids(bloque)
+                ids_estado = bloque['State ID'].to_numpy(dtype=np.int64) \
+                    if 'State ID' in bloque.columns else keys.municipio_estado_ids(ids)
+                periodos = keys.raw_periods(bloque)
+                
+                # Tabla de municipios (sólo los nuevos de cada bloque)
+                if 'Municipality' in bloque.columns:
+                    nuevos = ~pd.Series(ids).isin(municipios.keys()).to_numpy()
+                    for id_mun, nombre in zip(ids[nuevos], bloque['Municipality'].to_numpy()[nuevos]):
+                        municipios.setdefault(int(id_mun), nombre)
+                
+                # Tabla municipal: se escribe el bloque tal cual
+                tidy = pd.DataFrame({'Municipio_id': ids, 'Periodo': periodos})
+                for origen, destino in spec.valores.items():
+                    tidy[destino] = bloque[origen].to_numpy()
+                salida = tidy.drop(columns='Periodo')
+                salida.insert(1, 'Año', (periodos // 10).astype(np.int16))
+                salida.insert(2, 'Trimestre', keys.TRIMESTRE_DTYPE.categories[periodos % 10 - 1])
+                salida.to_csv(f, index=False, header=filas == 0)
+                filas += len(salida)
+                
+                # Totales estatales del bloque
+                tidy['Estado'] = keys.estado_codes(ids_estado)
+                suma = tidy.groupby(['Estado', 'Periodo']).agg(
+                    {col: lambda x: x.sum(min_count=1) for col in spec.valores.values()}
+                )
+                totales = suma if totales is None else totales.add(suma, fill_value=0)
         
-        # Limpiar y transformar
-        df_clean = df.copy()
-        
-        # Convertir workforce a numérico
-        df_clean['Workforce'] = pd.to_numeric(df_clean['Workforce'], errors='coerce')
-        
-        # Extraer año y trimestre
-        df_clean['Año'] = df_clean['Quarter'].str[:4].astype(int)
-        df_clean['Trimestre'] = df_clean['Quarter'].str[-2:]
-        
-        # Renombrar columnas
-        df_clean = df_clean.rename(columns={
-            'State': 'Estado',
-            'Workforce': 'PEA_personas'
-        })
-        
-        # Seleccionar columnas finales
-        df_tidy = df_clean[['Estado', 'Año', 'Trimestre', 'PEA_personas']]
+        if not filas:
+            parcial.unlink()
+            print("  ✗ Error: DataFrame vacío")
+            return False
         
-        # Ordenar
-        df_tidy = df_tidy.sort_values(['Estado', 'Año', 'Trimestre'])
-        
-        # Guardar datos procesados
-        filepath = PROCESSED_DATA_DIR / "pea_procesado.csv"
-        df_tidy.to_csv(filepath, index=False)
-        print(f"\n✓ Datos procesados guardados: {filepath}")
-        print(f"  Registros: {len(df_tidy)}")
-        print(f"  Estados: {df_tidy['Estado'].nunique()}")
-        print(f"  Periodo: {df_tidy['Año'].min()}-{df_tidy['Año'].max()}")
+        # Publicar la tabla municipal en el formato configurado (por bloques)
+        filepath = storage.convert_csv(
+            parcial, PROCESSED_DATA_DIR / spec.salida_municipal,
+            dtypes={'Municipio_id': 'int32', 'Año': 'int16', 'Trimestre': 'string',
+                    **dict.fromkeys(spec.valores.values(), 'float64')},
+        )
+        print(f"\n✓ Datos municipales guardados: {filepath}")
+        print(f"  Registros: {filas}")
+        print(f"  Municipios: {len(municipios) or 'sin nombres'}")
+        
+        # Tabla de municipios
+        if municipios:
+            catalogo = pd.DataFrame({
+                'Municipio_id': np.fromiter(municipios.keys(), dtype=np.int32),
+                'Municipio': list(municipios.values()),
+            }).sort_values('Municipio_id')
+            catalogo['Estado'] = pd.Categorical.from_codes(
+                keys.estado_codes(keys.municipio_estado_ids(catalogo['Municipio_id'])),
+                dtype=keys.ESTADO_DTYPE,
+            )
+            filepath_mun = storage.write_table(
+                catalogo, INTERIM_DATA_DIR / MUNICIPIOS_FILE,
+                dtypes={'Municipio': 'string', 'Estado': 'string'},
+            )
+            print(f"✓ Tabla de municipios guardada: {filepath_mun}")
+        
+        # Total estatal calculado a partir de los municipios (ya ordenado)
+        df_estatal = keys.decode_keys(totales.sort_index().reset_index())
+        filepath = storage.write_table(df_estatal, PROCESSED_DATA_DIR / spec.salida,
+                                       dtypes=KEY_DTYPES)
+        print(f"✓ Datos agregados por estado guardados: {filepath}")
+        print(f"  Registros: {len(df_estatal)}")
+        print(f"  Estados: {df_estatal['Estado'].nunique()}")
+        print(f"  Periodo: {df_estatal['Año'].min()}-{df_estatal['Año'].max()}")
         
         return True
         
     except Exception as e:
-        print(f"\n✗ Error procesando PEA: {str(e)}")
+        print(f"\n✗ Error procesando {spec.nombre}: {str(e)}")
         return False
 
 
-def process_gasto_data():
-    """Procesa datos de Gasto Público"""
+def process_sesnsp_data():
+    """Procesa la incidencia delictiva municipal del SESNSP por bloques"""
     print("\n" + "="*80)
-    print("PROCESANDO: Gasto Público Ejecutado")
+    print("PROCESANDO: Incidencia delictiva municipal (SESNSP)")
     print("="*80)
     
     try:
-        # Leer datos crudos
-        df = pd.read_csv(RAW_DATA_DIR / "gasto_raw.csv")
-        
-        # Validar
-        if not validate_data(df, "Gasto", ['State', 'Year', 'Amount Executed']):
+        fuente = sesnsp.find_source(RAW_DATA_DIR, SESNSP_RAW_NAME)
+        if fuente is None:
+            print(f"  ⚠ Archivo no encontrado: {RAW_DATA_DIR / SESNSP_RAW_NAME}.csv")
             return False
         
-        # Limpiar y transformar
-        df_clean = df.copy()
-        
-        # Convertir monto a numérico
-        df_clean['Amount Executed'] = pd.to_numeric(df_clean['Amount Executed'], errors='coerce')
-        
-        # Renombrar columnas
-        df_clean = df_clean.rename(columns={
-            'State': 'Estado',
-            'Year': 'Año',
-            'Functional Group': 'Grupo_Funcional',
-            'Amount Executed': 'Gasto_ejecutado_pesos'
-        })
-        
-        # Agregar por estado y año (sumando todos los grupos funcionales)
-        df_agregado = df_clean.groupby(['Estado', 'Año']).agg({
-            'Gasto_ejecutado_pesos': 'sum'
-        }).reset_index()
-        
-        # Ordenar
-        df_agregado = df_agregado.sort_values(['Estado', 'Año'])
-        
-        # Guardar datos detallados (con grupos funcionales) en interim
-        df_detallado = df_clean[['Estado', 'Año', 'Grupo_Funcional', 'Gasto_ejecutado_pesos']]
-        filepath_interim = INTERIM_DATA_DIR / "gasto_detallado.csv"
-        df_detallado.to_csv(filepath_interim, index=False)
-        print(f"\n✓ Datos detallados guardados: {filepath_interim}")
+        destino = PROCESSED_DATA_DIR / INCIDENCIA_DIR
+        resumen = sesnsp.process_incidencia(fuente, destino, INTERIM_DATA_DIR / TIPOS_DELITO_FILE)
+        if not resumen['filas']:
+            print("  ✗ Error: DataFrame vacío")
+            return False
         
-        # Guardar datos agregados en processed
-        filepath = PROCESSED_DATA_DIR / "gasto_procesado.csv"
-        df_agregado.to_csv(filepath, index=False)
-        print(f"✓ Datos agregados guardados: {filepath}")
-        print(f"  Registros: {len(df_agregado)}")
-        print(f"  Estados: {df_agregado['Estado'].nunique()}")
-        print(f"  Periodo: {df_agregado['Año'].min()}-{df_agregado['Año'].max()}")
+        print(f"\n✓ Datos guardados: {destino} (particionado por año)")
+        print(f"  Registros de origen: {resumen['filas_origen']}")
+        print(f"  Registros mensuales: {resumen['filas_mensuales']}")
+        print(f"  Registros agregados: {resumen['filas']}")
+        print(f"  Municipios: {resumen['municipios']}")
+        print(f"  Tipos de delito: {resumen['tipos']}")
+        print(f"  Periodo: {resumen['anos'][0]}-{resumen['anos'][-1]}")
+        if resumen['reordenados']:
+            print(f"  ⚠ Archivo de origen desordenado; años re-agregados: {resumen['reordenados']}")
         
         return True
         
     except Exception as e:
-        print(f"\n✗ Error procesando Gasto: {str(e)}")
+        print(f"\n✗ Error procesando SESNSP: {str(e)}")
         return False
 
 
-def process_remesas_data():
-    """Procesa datos de Remesas"""
-    print("\n" + "="*80)
-    print("PROCESANDO: Remesas")
-    print("="*80)
+def read_inegi_raw(raw_dir=None):
+    """Lee el crudo de INEGI (áreas y periodos como texto, con sus ceros)"""
+    return storage.read_table(Path(raw_dir or RAW_DATA_DIR) / INEGI_RAW_FILE,
+                              dtypes={'estado': 'string', 'periodo': 'string'})
+
+
+def tidy_inegi(df):
+    """Tabla de indicadores INEGI por estado y periodo; regresa (tabla, frecuencias)
+
+    Llaves enteras por indicador: cada serie tiene su frecuencia; las
+    mensuales se llevan a trimestres (promedio) para unirse al resto. Queda
+    una columna por indicador (Trimestre vacío = dato anual) y `frecuencias`
+    es {indicador: frecuencia original}.
+    """
+    partes = []
+    frecuencias = {}
+    for nombre, grupo in df.groupby('indicador_nombre', sort=False):
+        periodos, frecuencia = periods.parse_inegi(grupo['periodo'])
+        if frecuencia == periods.MENSUAL:
+            periodos = periods.convert(periodos, periods.MENSUAL, periods.TRIMESTRAL)
+        frecuencias[nombre] = frecuencia
+        partes.append(pd.DataFrame({
+            'Estado_id': keys.inegi_estado_ids(grupo['estado']) if 'estado' in grupo.columns
+            else np.zeros(len(grupo), dtype=np.int64),
+            'Periodo': periodos,
+            'Indicador': nombre,
+            'Valor': pd.to_numeric(grupo['valor'], errors='coerce').to_numpy(),
+        }))
+    largo = pd.concat(partes, ignore_index=True)
     
-    try:
-        # Leer datos crudos
-        df = pd.read_csv(RAW_DATA_DIR / "remesas_raw.csv")
-        
-        # Validar
-        if not validate_data(df, "Remesas", ['State', 'Quarter', 'Remittance Amount']):
-            return False
-        
-        # Limpiar y transformar
-        df_clean = df.copy()
-        
-        # Convertir monto a numérico
-        df_clean['Remittance Amount'] = pd.to_numeric(df_clean['Remittance Amount'], errors='coerce')
-        
-        # Extraer año y trimestre
-        df_clean['Año'] = df_clean['Quarter'].str[:4].astype(int)
-        df_clean['Trimestre'] = df_clean['Quarter'].str[-2:]
-        
-        # Renombrar columnas
-        df_clean = df_clean.rename(columns={
-            'State': 'Estado',
-            'Remittance Amount': 'Remesas_millones_usd'
-        })
-        
-        # Seleccionar columnas finales
-        df_tidy = df_clean[['Estado', 'Año', 'Trimestre', 'Remesas_millones_usd']]
-        
-        # Ordenar
-        df_tidy = df_tidy.sort_values(['Estado', 'Año', 'Trimestre'])
-        
-        # Guardar datos procesados
-        filepath = PROCESSED_DATA_DIR / "remesas_procesado.csv"
-        df_tidy.to_csv(filepath, index=False)
-        print(f"\n✓ Datos procesados guardados: {filepath}")
-        print(f"  Registros: {len(df_tidy)}")
-        print(f"  Estados: {df_tidy['Estado'].nunique()}")
-        print(f"  Periodo: {df_tidy['Año'].min()}-{df_tidy['Año'].max()}")
-        
-        return True
-        
-    except Exception as e:
-        print(f"\n✗ Error procesando Remesas: {str(e)}")
-        return False
+    # Pivotar: una columna por indicador
+    df_pivot = largo.groupby(['Estado_id', 'Periodo', 'Indicador'], sort=False)['Valor'] \
+        .mean().unstack('Indicador').reset_index()
+    df_pivot.columns.name = None
+    df_pivot = df_pivot[['Estado_id', 'Periodo'] + list(frecuencias)]
+    
+    # Ordenar por estado (alfabético, nacional al final) y periodo
+    ids = df_pivot.pop('Estado_id').to_numpy()
+    nacional = ids == 0
+    codigos = np.where(nacional, -1, keys.estado_codes(np.where(nacional, 1, ids)))
+    orden = keys.sort_order(np.where(nacional, len(keys.ESTADO_DTYPE.categories), codigos),
+                            df_pivot['Periodo'])
+    df_pivot.insert(0, 'Estado', codigos)
+    df_pivot = keys.decode_keys(df_pivot.iloc[orden].reset_index(drop=True))
+    df_pivot['Estado'] = df_pivot['Estado'].astype('string').fillna(keys.NACIONAL)
+    return df_pivot, frecuencias
 
 
 def process_inegi_data():
@@ -327,50 +491,31 @@ def process_inegi_data():
     print("="*80)
     
     try:
-        filepath = RAW_DATA_DIR / "inegi_educacion_salud_raw.csv"
-        if not filepath.exists():
+        filepath = RAW_DATA_DIR / INEGI_RAW_FILE
+        if not storage.table_exists(filepath):
             print(f"  ⚠ Archivo no encontrado: {filepath}")
             return False
         
         # Leer datos crudos
-        df = pd.read_csv(filepath)
+        df = read_inegi_raw()
         
         # Validar
         if not validate_data(df, "INEGI", ['indicador_nombre', 'periodo', 'valor']):
             return False
         
-        # Limpiar y transformar
-        df_clean = df.copy()
-        
-        # Convertir valor a numérico
-        df_clean['valor'] = pd.to_numeric(df_clean['valor'], errors='coerce')
-        
-        # Renombrar columnas
-        df_clean = df_clean.rename(columns={
-            'indicador_nombre': 'Indicador',
-            'periodo': 'Periodo',
-            'valor': 'Valor',
-            'estado': 'Estado'
-        })
-        
-        # Pivotar para tener un formato más usable
-        df_pivot = df_clean.pivot_table(
-            index=['Estado', 'Periodo'],
-            columns='Indicador',
-            values='Valor',
-            aggfunc='first'
-        ).reset_index()
-        
-        # Ordenar
-        df_pivot = df_pivot.sort_values(['Estado', 'Periodo'])
+        df_pivot, frecuencias = tidy_inegi(df)
         
         # Guardar datos procesados
-        filepath = PROCESSED_DATA_DIR / "educacion_salud_procesado.csv"
-        df_pivot.to_csv(filepath, index=False)
+        filepath = storage.write_table(
+            df_pivot, PROCESSED_DATA_DIR / INEGI_FILE,
+            dtypes=KEY_DTYPES
+        )
         print(f"\n✓ Datos procesados guardados: {filepath}")
         print(f"  Registros: {len(df_pivot)}")
-        if 'Estado' in df_pivot.columns:
-            print(f"  Estados: {df_pivot['Estado'].nunique()}")
+        print(f"  Estados: {df_pivot['Estado'].nunique()}")
+        for nombre, frecuencia in frecuencias.items():
+            nota = " (promedio trimestral)" if frecuencia == periods.MENSUAL else ""
+            print(f"  {nombre}: {periods.NOMBRES[frecuencia]}{nota}")
         
         return True
         
@@ -379,6 +524,112 @@ def process_inegi_data():
         return False
 
 
+def consolidate(trimestrales, anuales=()):
+    """Combina indicadores en una sola tabla alineada a un índice canónico
+
+    Los indicadores vienen con las llaves enteras de keys.py (Estado,
+    Periodo). Cada fila se traduce a un código compuesto estado × año ×
+    trimestre (trimestre 0 = anual) cuyo orden es el de las llaves, así el
+    índice canónico, la unión ordenada de las llaves trimestrales (igual que
+    una cadena de merges `outer`), sale de una tabla de presencia sin ordenar.
+    Cada columna de valor se toma por posición sobre ese índice (faltantes
+    como NaN) y los indicadores anuales se difunden a todos los trimestres de
+    su año, como un merge `left`. La tabla final se construye una sola vez,
+    así el costo crece linealmente con el número de indicadores.
+    """
+    if not trimestrales:
+        return None
+
+    frames = list(trimestrales) + list(anuales)
+    anos = np.concatenate([df['Periodo'].to_numpy() // 10 for df in frames])
+    ano_min = int(anos.min())
+    n_anos = int(anos.max()) - ano_min + 1
+    total = len(keys.ESTADO_DTYPE.categories) * n_anos * 5
+
+    def compuesto(df):
+        periodos = df['Periodo'].to_numpy().astype(np.int64)
+        estados = df['Estado'].to_numpy().astype(np.int64)
+        return (estados * n_anos + periodos // 10 - ano_min) * 5 + periodos % 10
+
+    # Índice canónico: códigos presentes en algún indicador trimestral
+    compuestos = [compuesto(df) for df in trimestrales]
+    presentes = np.zeros(total, dtype=bool)
+    for codigos in compuestos:
+        presentes[codigos] = True
+    canonico = np.flatnonzero(presentes)
+    columnas = {
+        'Estado': (canonico // (n_anos * 5)).astype(np.int8),
+        'Periodo': ((canonico // 5 % n_anos + ano_min) * 10 + canonico % 5).astype(np.int32),
+    }
+
+    def indexador(objetivo, fuente):
+        """Para cada código de `objetivo`, la primera fila de `fuente` con ese código"""
+        tabla = np.full(total, -1, dtype=np.int64)
+        codigos, primeras = np.unique(fuente, return_index=True)
+        tabla[codigos] = primeras
+        return tabla[objetivo]
+
+    def alinear(df, posiciones):
+        """Columnas de valor de `df` en el orden canónico (-1 = faltante)"""
+        for col in df.columns:
+            if col in ('Estado', 'Periodo'):
+                continue
+            valores = df[col].array if isinstance(
+                df[col].dtype, pd.api.extensions.ExtensionDtype
+            ) else df[col].to_numpy()
+            columnas[col] = pd.api.extensions.take(valores, posiciones, allow_fill=True)
+
+    for df, codigos in zip(trimestrales, compuestos):
+        posiciones = indexador(canonico, codigos)
+        repetidas = len(codigos) - np.count_nonzero(posiciones >= 0)
+        if repetidas:
+            print(f"  ⚠ {repetidas} llaves repetidas; se conserva la primera")
+        alinear(df, posiciones)
+
+    # Anuales: el código del año es el del trimestre 0
+    for df in anuales:
+        alinear(df, indexador(canonico - canonico % 5, compuesto(df)))
+
+    return pd.DataFrame(columnas)
+
+
+def consolidate_tables(datasets):
+    """Dataset consolidado a partir de las tablas procesadas {nombre: DataFrame}
+
+    Los nombres son los de PROCESADOS; las tablas llevan Estado / Año /
+    Trimestre como al guardarlas (leídas de disco o recién procesadas).
+    Regresa None si no hay indicadores trimestrales.
+    """
+    tablas = {}
+    for nombre, df in datasets.items():
+        if nombre == 'educacion_salud':
+            # Sólo los datos estatales se consolidan
+            df = df[df['Estado'] != keys.NACIONAL].reset_index(drop=True)
+        tablas[nombre] = (keys.encode_keys(df), 'Trimestre' in df.columns)
+    
+    # Consolidar datasets trimestrales (gasto es anual y se difunde después)
+    trimestrales = [
+        df for nombre, (df, trimestral) in tablas.items()
+        if nombre not in ('gasto', 'educacion_salud') and trimestral
+    ]
+    anuales = [tablas['gasto'][0][['Estado', 'Periodo', 'Gasto_ejecutado_pesos']]] \
+        if 'gasto' in tablas else []
+    
+    # INEGI mezcla indicadores anuales (T = 0) y trimestrales: cada parte
+    # se une con las columnas que tienen datos en ella
+    if 'educacion_salud' in tablas:
+        inegi = tablas['educacion_salud'][0]
+        es_anual = (inegi['Periodo'] % 10 == 0).to_numpy()
+        for filas, destino in ((es_anual, anuales), (~es_anual, trimestrales)):
+            parte = inegi[filas].dropna(axis=1, how='all')
+            if len(parte) and len(parte.columns) > 2:
+                destino.append(parte)
+    df_consolidado = consolidate(trimestrales, anuales)
+    if df_consolidado is None:
+        return None
+    return keys.decode_keys(df_consolidado)
+
+
 def create_consolidated_dataset():
     """Crea un dataset consolidado con todos los indicadores"""
     print("\n" + "="*80)
@@ -388,18 +639,10 @@ def create_consolidated_dataset():
     try:
         # Leer todos los datasets procesados
         datasets = {}
-        
-        files = {
-            'ied': PROCESSED_DATA_DIR / "ied_procesado.csv",
-            'salario': PROCESSED_DATA_DIR / "salario_procesado.csv",
-            'pea': PROCESSED_DATA_DIR / "pea_procesado.csv",
-            'gasto': PROCESSED_DATA_DIR / "gasto_procesado.csv",
-            'remesas': PROCESSED_DATA_DIR / "remesas_procesado.csv",
-        }
-        
-        for nombre, filepath in files.items():
-            if filepath.exists():
-                datasets[nombre] = pd.read_csv(filepath)
+        for nombre, archivo in PROCESADOS.items():
+            filepath = PROCESSED_DATA_DIR / archivo
+            if storage.table_exists(filepath):
+                datasets[nombre] = storage.read_table(filepath)
                 print(f"  ✓ Cargado: {nombre}")
             else:
                 print(f"  ⚠ No encontrado: {nombre}")
@@ -408,45 +651,14 @@ def create_consolidated_dataset():
             print("  ✗ No hay datasets para consolidar")
             return False
         
-        # Consolidar datasets trimestrales
-        df_consolidado = None
-        
-        for nombre, df in datasets.items():
-            if nombre == 'gasto':  # Gasto es anual, no trimestral
-                continue
-                
-            # Asegurar que tenga las columnas necesarias
-            if not all(col in df.columns for col in ['Estado', 'Año', 'Trimestre']):
-                continue
-            
-            if df_consolidado is None:
-                df_consolidado = df.copy()
-            else:
-                # Hacer merge por Estado, Año y Trimestre
-                df_consolidado = pd.merge(
-                    df_consolidado,
-                    df,
-                    on=['Estado', 'Año', 'Trimestre'],
-                    how='outer'
-                )
+        df_consolidado = consolidate_tables(datasets)
         
         if df_consolidado is not None:
-            # Agregar gasto público (anual)
-            if 'gasto' in datasets:
-                df_gasto = datasets['gasto'][['Estado', 'Año', 'Gasto_ejecutado_pesos']]
-                df_consolidado = pd.merge(
-                    df_consolidado,
-                    df_gasto,
-                    on=['Estado', 'Año'],
-                    how='left'
-                )
-            
-            # Ordenar
-            df_consolidado = df_consolidado.sort_values(['Estado', 'Año', 'Trimestre'])
-            
             # Guardar
-            filepath = PROCESSED_DATA_DIR / "datos_consolidados.csv"
-            df_consolidado.to_csv(filepath, index=False)
+            filepath = storage.write_table(
+                df_consolidado, PROCESSED_DATA_DIR / CONSOLIDADO_FILE,
+                dtypes=KEY_DTYPES
+            )
             print(f"\n✓ Dataset consolidado guardado: {filepath}")
             print(f"  Registros: {len(df_consolidado)}")
             print(f"  Estados: {df_consolidado['Estado'].nunique()}")
@@ -463,42 +675,60 @@ def create_consolidated_dataset():
 
 
 def generate_quality_report():
-    """Genera un reporte de calidad de los datos procesados"""
+    """Genera un reporte de calidad de los datos procesados
+
+    Cada tabla se perfila en una sola pasada por bloques (profiler.py). El
+    reporte se guarda en texto (reporte_calidad.txt) y en JSON
+    (reporte_calidad.json) con el detalle por columna y la cobertura.
+    """
     print("\n" + "="*80)
     print("REPORTE DE CALIDAD DE DATOS")
     print("="*80)
     
+    fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     report = []
-    report.append(f"Fecha de reporte: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    report.append(f"Fecha de reporte: {fecha}\n")
     report.append("="*80 + "\n")
+    perfiles = []
     
     # Revisar cada archivo procesado
-    for filepath in PROCESSED_DATA_DIR.glob("*.csv"):
+    for tabla in storage.list_tables(PROCESSED_DATA_DIR):
+        filepath = storage.find_table(tabla)
         try:
-            df = pd.read_csv(filepath)
+            perfil = profile_table(tabla).to_dict()
+            perfiles.append(perfil)
+            columnas = perfil['columnas']
             
             report.append(f"\nArchivo: {filepath.name}")
-            report.append(f"  Registros totales: {len(df)}")
-            report.append(f"  Columnas: {len(df.columns)}")
-            report.append(f"  Columnas: {', '.join(df.columns)}")
+            report.append(f"  Registros totales: {perfil['registros']}")
+            report.append(f"  Columnas: {len(columnas)}")
+            report.append(f"  Columnas: {', '.join(columnas)}")
             
             # Valores nulos
-            nulls = df.isnull().sum()
-            if nulls.any():
+            con_nulos = {col: info for col, info in columnas.items() if info['nulos']}
+            if con_nulos:
                 report.append("  Valores nulos:")
-                for col in nulls[nulls > 0].index:
-                    pct = (nulls[col] / len(df)) * 100
-                    report.append(f"    - {col}: {nulls[col]} ({pct:.1f}%)")
+                for col, info in con_nulos.items():
+                    report.append(f"    - {col}: {info['nulos']} ({info['pct_nulos']:.1f}%)")
             else:
                 report.append("  ✓ Sin valores nulos")
             
-            # Duplicados
-            duplicados = df.duplicated().sum()
-            if duplicados > 0:
-                report.append(f"  ⚠ Duplicados: {duplicados}")
-            else:
+            # Llaves duplicadas
+            if perfil['llaves_duplicadas']:
+                report.append(f"  ⚠ Llaves duplicadas ({', '.join(perfil['llaves'])}): "
+                              f"{perfil['llaves_duplicadas']}")
+            elif perfil['llaves']:
                 report.append("  ✓ Sin duplicados")
             
+            # Cobertura estado × periodo
+            cobertura = perfil['cobertura']
+            if cobertura:
+                report.append(
+                    f"  Cobertura: {cobertura['pct_cobertura']:.1f}% de "
+                    f"{cobertura['estados']} estados × {cobertura['periodos']} periodos "
+                    f"({cobertura['periodo_min']} a {cobertura['periodo_max']})"
+                )
+            
             report.append("")
             
         except Exception as e:
@@ -509,69 +739,168 @@ def generate_quality_report():
     report_path = PROCESSED_DATA_DIR / "reporte_calidad.txt"
     with open(report_path, 'w', encoding='utf-8') as f:
         f.write(report_text)
+    write_json({'fecha': fecha, 'tablas': perfiles}, PROCESSED_DATA_DIR / "reporte_calidad.json")
     
     print(report_text)
     print(f"✓ Reporte guardado: {report_path}")
 
 
-def main():
+CONSOLIDADO_STAGE = 'Dataset Consolidado'
+REPORTE_STAGE = 'Reporte de Calidad'
+MANIFEST_FILE = "build_manifest.json"
+RESUMEN_NOMBRES = {'Gasto': 'Gasto Público'}
+
+
+def _dataset_stage(spec, municipal=False):
+    """Etapa de un dataset del registro (o de su versión municipal)"""
+    nombre = RESUMEN_NOMBRES.get(spec.nombre, spec.nombre)
+    if municipal and spec.nombre in MUNICIPAL_DATASETS:
+        spec = MUNICIPAL_DATASETS[spec.nombre]
+        return Stage(
+            nombre, process_municipal_dataset, (spec,),
+            entradas=(RAW_DATA_DIR / spec.fuente,),
+            salidas=(PROCESSED_DATA_DIR / spec.salida,
+                     PROCESSED_DATA_DIR / spec.salida_municipal,
+                     INTERIM_DATA_DIR / MUNICIPIOS_FILE),
+        )
+    return Stage(
+        nombre, process_dataset, (spec,),
+        entradas=(RAW_DATA_DIR / spec.fuente,),
+        salidas=(PROCESSED_DATA_DIR / spec.salida,)
+        + ((INTERIM_DATA_DIR / spec.salida_detalle,) if spec.salida_detalle else ()),
+    )
+
+
+def build_stages(municipal=False):
+    """DAG de etapas del procesamiento
+
+    Los datasets del registro, INEGI y el SESNSP son independientes entre sí;
+    la consolidación espera a los datasets que combina y el reporte de calidad
+    a las etapas de nivel estatal (la incidencia municipal no entra en él). Las entradas y salidas
+    de cada etapa son las que revisa el manifiesto para omitirla. En modo
+    municipal los datasets de MUNICIPAL_DATASETS sustituyen a los estatales.
+    """
+    procesos = [_dataset_stage(spec, municipal) for spec in DATASETS]
+    procesos.append(Stage(
+        'INEGI Educación/Salud', process_inegi_data,
+        entradas=(RAW_DATA_DIR / INEGI_RAW_FILE,),
+        salidas=(PROCESSED_DATA_DIR / INEGI_FILE,),
+    ))
+    consolidado = Stage(
+        CONSOLIDADO_STAGE, create_consolidated_dataset,
+        deps=tuple(stage.nombre for stage in procesos),
+        entradas=tuple(PROCESSED_DATA_DIR / spec.salida for spec in DATASETS)
+        + (PROCESSED_DATA_DIR / INEGI_FILE,),
+        salidas=(PROCESSED_DATA_DIR / CONSOLIDADO_FILE,),
+    )
+    reporte = Stage(
+        REPORTE_STAGE, generate_quality_report,
+        deps=tuple(stage.nombre for stage in procesos) + (CONSOLIDADO_STAGE,),
+        entradas=tuple(
+            salida for stage in procesos + [consolidado] for salida in stage.salidas
+            if salida.parent == PROCESSED_DATA_DIR
+        ),
+        salidas=(PROCESSED_DATA_DIR / "reporte_calidad.txt",
+                 PROCESSED_DATA_DIR / "reporte_calidad.json"),
+    )
+    seguridad = Stage(
+        SEGURIDAD_STAGE, process_sesnsp_data,
+        entradas=tuple(RAW_DATA_DIR / f"{SESNSP_RAW_NAME}{sufijo}"
+                       for sufijo in sesnsp.SOURCE_SUFFIXES),
+        salidas=(PROCESSED_DATA_DIR / INCIDENCIA_DIR, INTERIM_DATA_DIR / TIPOS_DELITO_FILE),
+    )
+    return procesos + [seguridad, consolidado, reporte]
+
+
+def parse_args(argv=None):
+    """Argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Procesamiento de datos crudos")
+    parser.add_argument(
+        "--format", choices=storage.FORMATS, default=storage.DATA_FORMAT,
+        help=f"Formato de los archivos procesados (default: {storage.DATA_FORMAT})"
+    )
+    parser.add_argument(
+        "--export-csv", action="store_true",
+        help="Guardar también una copia CSV de cada archivo procesado"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("PROCESS_WORKERS", DEFAULT_WORKERS)),
+        help=f"Procesos para etapas independientes; 1 = secuencial (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--municipal", action="store_true",
+        help="Procesar los datasets municipales y calcular su total estatal a partir de ellos"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Re-ejecutar todas las etapas aunque sus entradas no hayan cambiado"
+    )
+    parser.add_argument(
+        "--profile", choices=instrumentation.PERFILES, default=instrumentation.RUN_PROFILE,
+        help="Perfilar cada etapa con cProfile (.prof) o tracemalloc (asignaciones en la bitácora)"
+    )
+    parser.add_argument(
+        "--run-log-dir", type=Path, default=instrumentation.RUN_LOG_DIR,
+        help=f"Directorio de las bitácoras de corrida (default: {instrumentation.RUN_LOG_DIR})"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Función principal que ejecuta todo el procesamiento"""
+    args = parse_args(argv)
+    storage.set_format(args.format, export_csv=args.export_csv or storage.EXPORT_CSV)
+    log = instrumentation.start_run(
+        "process_data", args.run_log_dir, args.profile, argumentos=vars(args),
+        workers=args.workers, municipal=args.municipal, formato=storage.DATA_FORMAT,
+    )
+
     print("\n" + "="*80)
     print("INICIANDO PROCESAMIENTO DE DATOS")
     print("="*80)
     print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Formato de archivos: {storage.DATA_FORMAT}")
+    print(f"Bitácora de la corrida: {log.path}")
     
+    etapas = build_stages(municipal=args.municipal)
+    manifiesto = BuildManifest(
+        PROCESSED_DATA_DIR / MANIFEST_FILE,
+        code_version(sys.modules[__name__], keys, periods, profiler, sesnsp, storage,
+                     extra=f"{storage.DATA_FORMAT}:{storage.EXPORT_CSV}"),
+    )
+
+    def registrar(stage, resultado):
+        manifiesto.record(stage, resultado)
+        log.event(
+            'etapa', etapa=stage.nombre, exito=resultado.ok, omitida=False,
+            error=resultado.error, inicio=round(resultado.inicio, 4),
+            filas_entrada=instrumentation.count_rows(stage.entradas),
+            filas_salida=instrumentation.count_rows(stage.salidas),
+            **resultado.metricas,
+        )
+
+    try:
+        reporte = run_stages(
+            etapas, max_workers=args.workers,
+            initializer=storage.set_format, initargs=(storage.DATA_FORMAT, storage.EXPORT_CSV),
+            skip=None if args.force else manifiesto.is_current,
+            on_complete=registrar, perfil=args.profile, perfil_dir=log.perfil_dir,
+        )
+    finally:
+        manifiesto.save()
+    for resultado in reporte.resultados.values():
+        if resultado.omitida:
+            log.event('etapa', etapa=resultado.nombre, exito=True, omitida=True)
     resultados = {
-        'IED': False,
-        'Salario': False,
-        'PEA': False,
-        'Gasto Público': False,
-        'Remesas': False,
-        'INEGI Educación/Salud': False,
-        'Dataset Consolidado': False
+        stage.nombre: reporte.resultados[stage.nombre].ok
+        for stage in etapas if stage.nombre != REPORTE_STAGE
     }
     
-    # Ejecutar procesamientos
-    try:
-        resultados['IED'] = process_ied_data()
-    except Exception as e:
-        print(f"\n✗ Error en IED: {str(e)}")
-    
-    try:
-        resultados['Salario'] = process_salario_data()
-    except Exception as e:
-        print(f"\n✗ Error en Salario: {str(e)}")
-    
-    try:
-        resultados['PEA'] = process_pea_data()
-    except Exception as e:
-        print(f"\n✗ Error en PEA: {str(e)}")
-    
-    try:
-        resultados['Gasto Público'] = process_gasto_data()
-    except Exception as e:
-        print(f"\n✗ Error en Gasto Público: {str(e)}")
-    
-    try:
-        resultados['Remesas'] = process_remesas_data()
-    except Exception as e:
-        print(f"\n✗ Error en Remesas: {str(e)}")
-    
-    try:
-        resultados['INEGI Educación/Salud'] = process_inegi_data()
-    except Exception as e:
-        print(f"\n✗ Error en INEGI: {str(e)}")
-    
-    try:
-        resultados['Dataset Consolidado'] = create_consolidated_dataset()
-    except Exception as e:
-        print(f"\n✗ Error en consolidación: {str(e)}")
-    
-    # Generar reporte de calidad
-    try:
-        generate_quality_report()
-    except Exception as e:
-        print(f"\n✗ Error generando reporte: {str(e)}")
+    # Tiempos por etapa
+    print("\n" + "="*80)
+    print(f"TIEMPOS POR ETAPA ({args.workers} procesos)")
+    print("="*80)
+    print(format_report(reporte))
     
     # Resumen final
     print("\n" + "="*80)
@@ -583,6 +912,10 @@ def main():
     
     exitosos = sum(1 for v in resultados.values() if v)
     print(f"\nTotal: {exitosos}/{len(resultados)} procesos completados exitosamente")
+    instrumentation.end_run(
+        exitosos=exitosos, procesos=len(resultados), segundos=round(reporte.total, 4),
+        ruta_critica=reporte.ruta_critica,
+    )
     
     if exitosos == 0:
         print("\n✗ ERROR: No se pudo procesar ningún dataset")
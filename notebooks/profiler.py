@@ -0,0 +1,218 @@
+"""
+Perfilador de calidad de datos en una sola pasada y por bloques
+
+Cada tabla se lee por bloques (`storage.iter_table`) y, en una sola pasada,
+se acumulan por columna los nulos, el mínimo / máximo y un conteo aproximado
+de valores distintos (HyperLogLog), y por tabla las llaves repetidas y la
+cobertura estado × periodo. La memoria usada depende del tamaño del bloque y
+del número de llaves distintas, no del número de filas.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+DEFAULT_CHUNK_SIZE = 100_000
+HLL_PRECISION = 14
+
+# Columnas que identifican una fila, en orden, si la tabla las tiene
+KEY_CANDIDATES = ['Municipio_id', 'Estado', 'Año', 'Trimestre', 'Periodo']
+
+
+class HyperLogLog:
+    """Conteo aproximado de valores distintos (error típico 1.04 / sqrt(2^p))"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        """Agrega hashes de 64 bits (uint64)"""
+        if not len(hashes):
+            return
+        indices = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        resto = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Posición del primer 1 en los 64 - p bits restantes (frexp es exacto
+        # porque el resto cabe en la mantisa de un float64)
+        _, exponente = np.frexp(resto.astype(np.float64))
+        rangos = (64 - self.p + 1 - exponente).astype(np.uint8)
+        np.maximum.at(self.registers, indices, rangos)
+
+    def add(self, values):
+        """Agrega los valores (no nulos) de una Serie"""
+        values = values.dropna()
+        if len(values):
+            self.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimado = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        ceros = int(np.count_nonzero(self.registers == 0))
+        if estimado <= 2.5 * m and ceros:
+            # Corrección para cardinalidades pequeñas (conteo lineal)
+            estimado = m * np.log(m / ceros)
+        return int(round(estimado))
+
+
+def _scalar(valor):
+    """Valor serializable en JSON"""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (int, float, str, bool)):
+        return valor
+    return str(valor)
+
+
+class ColumnProfile:
+    """Nulos, mínimo / máximo y distintos aproximados de una columna"""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.dtype = None
+        self.nulos = 0
+        self.minimo = None
+        self.maximo = None
+        self.hll = HyperLogLog()
+
+    def update(self, serie):
+        self.dtype = self.dtype or str(serie.dtype)
+        self.nulos += int(serie.isna().sum())
+        self.hll.add(serie)
+        validos = serie.dropna()
+        if not len(validos):
+            return
+        try:
+            minimo, maximo = validos.min(), validos.max()
+        except TypeError:
+            # Tipos mezclados en una columna de objetos: se comparan como texto
+            validos = validos.astype(str)
+            minimo, maximo = validos.min(), validos.max()
+        try:
+            self.minimo = minimo if self.minimo is None else min(self.minimo, minimo)
+            self.maximo = maximo if self.maximo is None else max(self.maximo, maximo)
+        except TypeError:
+            self.minimo, self.maximo = min(str(self.minimo), str(minimo)), max(str(self.maximo), str(maximo))
+
+    def to_dict(self, filas):
+        return {
+            'dtype': self.dtype,
+            'nulos': self.nulos,
+            'pct_nulos': round(100 * self.nulos / filas, 2) if filas else 0.0,
+            'min': _scalar(self.minimo),
+            'max': _scalar(self.maximo),
+            'distintos_aprox': self.hll.count(),
+        }
+
+
+class TableProfile:
+    """Perfil de una tabla acumulado bloque por bloque"""
+
+    def __init__(self, nombre, columnas):
+        self.nombre = nombre
+        self.columnas = {col: ColumnProfile(col) for col in columnas}
+        self.llaves = [col for col in KEY_CANDIDATES if col in columnas]
+        self.estado = 'Estado' if 'Estado' in columnas else None
+        self.periodo = [col for col in self.llaves if col not in ('Municipio_id', 'Estado')]
+        self.filas = 0
+        self.duplicados = 0
+        self._vistas = np.empty(0, dtype=np.uint64)
+        self._celdas = None
+
+    def update(self, bloque):
+        self.filas += len(bloque)
+        for col, perfil in self.columnas.items():
+            perfil.update(bloque[col])
+        if self.llaves:
+            self._update_keys(bloque)
+        if self.estado and self.periodo:
+            self._update_coverage(bloque)
+
+    def _update_keys(self, bloque):
+        """Llaves repetidas: hashes de 64 bits de las columnas llave"""
+        hashes = pd.util.hash_pandas_object(bloque[self.llaves], index=False).to_numpy()
+        unicos, conteos = np.unique(hashes, return_counts=True)
+        repetidas_bloque = int(np.sum(conteos - 1))
+        ya_vistas = int(np.count_nonzero(np.isin(unicos, self._vistas, assume_unique=True)))
+        self.duplicados += repetidas_bloque + ya_vistas
+        self._vistas = np.union1d(self._vistas, unicos)
+
+    def _update_coverage(self, bloque):
+        """Pares estado × periodo presentes (sólo los distintos)"""
+        pares = bloque[[self.estado] + self.periodo].dropna().drop_duplicates()
+        if self._celdas is None:
+            self._celdas = pares
+        else:
+            self._celdas = pd.concat([self._celdas, pares], ignore_index=True).drop_duplicates()
+
+    def coverage(self):
+        """Cobertura estado × periodo: qué fracción de las celdas tiene datos
+
+        Los periodos se identifican con un código entero por grupo (`ngroup`);
+        las etiquetas de texto sólo se arman para los periodos distintos.
+        """
+        if self._celdas is None or not len(self._celdas):
+            return None
+        celdas = self._celdas
+        codigos = celdas.groupby(self.periodo, sort=False).ngroup().to_numpy()
+        _, primeras, por_codigo = np.unique(codigos, return_index=True, return_counts=True)
+        etiquetas = celdas[self.periodo].iloc[primeras].astype(str).agg('-'.join, axis=1).to_numpy()
+        estados = celdas[self.estado].astype(str)
+        n_estados = estados.nunique()
+        n_periodos = len(etiquetas)
+        por_estado = estados.value_counts(sort=False).sort_index()
+        por_periodo = sorted(zip(etiquetas, por_codigo))
+        total = n_estados * n_periodos
+        return {
+            'estados': int(n_estados),
+            'periodos': int(n_periodos),
+            'periodo_min': por_periodo[0][0],
+            'periodo_max': por_periodo[-1][0],
+            'celdas_con_datos': int(len(celdas)),
+            'pct_cobertura': round(100 * len(celdas) / total, 2) if total else 0.0,
+            'por_estado': {
+                estado: round(100 * n / n_periodos, 2) for estado, n in por_estado.items()
+            },
+            'por_periodo': {
+                periodo: round(100 * int(n) / n_estados, 2) for periodo, n in por_periodo
+            },
+        }
+
+    def to_dict(self):
+        return {
+            'tabla': self.nombre,
+            'registros': self.filas,
+            'columnas': {col: perfil.to_dict(self.filas) for col, perfil in self.columnas.items()},
+            'llaves': self.llaves,
+            'llaves_duplicadas': self.duplicados if self.llaves else None,
+            'cobertura': self.coverage(),
+        }
+
+
+def profile_table(path, chunksize=DEFAULT_CHUNK_SIZE):
+    """Perfila una tabla (ruta lógica .csv) en una sola pasada por bloques"""
+    archivo = storage.find_table(path)
+    if archivo is None:
+        raise FileNotFoundError(path)
+    perfil = TableProfile(archivo.name, storage.table_columns(path))
+    for bloque in storage.iter_table(path, chunksize=chunksize):
+        perfil.update(bloque)
+    return perfil
+
+
+def write_json(datos, path):
+    """Escribe el perfil en JSON de forma atómica"""
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False, default=_scalar)
+    os.replace(tmp, path)
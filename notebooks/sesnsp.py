@@ -0,0 +1,350 @@
+"""
+Ingesta en streaming de la incidencia delictiva municipal del SESNSP
+
+El Secretariado Ejecutivo del Sistema Nacional de Seguridad Pública publica la
+incidencia delictiva del fuero común por municipio (archivos IDM_NM, cientos
+de MB en CSV o XLSX): una fila por año, municipio y delito (bien jurídico,
+tipo, subtipo y modalidad) y una columna por mes.
+
+El archivo se lee por bloques; en cada bloque los meses se convierten en filas
+y se suma por (municipio, periodo, tipo de delito). El resultado se escribe
+particionado por año (`Año=AAAA/part-NNNNN.parquet`) con tipos compactos:
+
+- Municipio_id: clave INEGI del municipio (int32, EEMMM)
+- Periodo: entero AAAAMM (int32)
+- Tipo_delito: código (int16) de la tabla de tipos de delito
+- Incidencia: número de delitos (int32)
+
+El archivo de origen viene ordenado por año y municipio, así que las filas del
+último municipio de un bloque se guardan para el siguiente y cada suma se
+calcula completa una sola vez. En memoria sólo hay un bloque de origen y los
+renglones agregados que aún no se escriben; si el archivo no viniera ordenado
+se detecta y los años afectados se vuelven a sumar al final, partición por
+partición.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import os
+import shutil
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import periods
+import storage
+
+try:
+    import openpyxl
+except ModuleNotFoundError:
+    openpyxl = None
+
+MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio', 'Agosto',
+         'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+# Nombres de columna del archivo de origen según la edición
+COLUMNAS_ORIGEN = {
+    'Año': ('Año', 'Anio', 'AÑO'),
+    'Municipio_id': ('Cve. Municipio', 'Cve_Municipio', 'Clave_Mun', 'Cve. municipio'),
+    'Bien_juridico': ('Bien jurídico afectado', 'Bien_juridico'),
+    'Tipo_delito': ('Tipo de delito', 'Tipo_delito'),
+}
+SOURCE_ENCODINGS = ('utf-8', 'latin-1')
+SOURCE_SUFFIXES = ('.csv', '.zip', '.xlsx')
+
+DEFAULT_CHUNK_SIZE = 50_000
+# Renglones agregados que se acumulan antes de escribir una parte por año
+FLUSH_ROWS = 500_000
+
+LLAVES = ['Municipio_id', 'Periodo', 'Tipo_delito']
+OUTPUT_DTYPES = {'Municipio_id': 'int32', 'Periodo': 'int32', 'Tipo_delito': 'int16',
+                 'Incidencia': 'int32'}
+TIPOS_DTYPES = {'Tipo_delito': 'int16', 'Nombre': 'string', 'Bien_juridico': 'string'}
+
+# Muestra pequeña con el formato del archivo IDM_NM, para pruebas locales
+FIXTURE = Path(__file__).parent / "fixtures" / "sesnsp_idm_muestra.csv"
+
+
+def find_source(directorio, nombre="sesnsp_idm_raw"):
+    """Archivo de origen en `directorio` (CSV, ZIP con un CSV o XLSX)"""
+    for sufijo in SOURCE_SUFFIXES:
+        archivo = Path(directorio) / f"{nombre}{sufijo}"
+        if archivo.exists():
+            return archivo
+    return None
+
+
+def _sample(path, tamano=1 << 20):
+    """Primeros bytes del CSV de origen (dentro del ZIP, si lo es)"""
+    if path.suffix.lower() == '.zip':
+        with zipfile.ZipFile(path) as zf, zf.open(_zip_member(zf)) as f:
+            return f.read(tamano)
+    with open(path, 'rb') as f:
+        return f.read(tamano)
+
+
+def _zip_member(zf):
+    miembros = [n for n in zf.namelist() if n.lower().endswith('.csv')]
+    if len(miembros) != 1:
+        raise ValueError(f"Se esperaba un CSV dentro del ZIP, hay {len(miembros)}")
+    return miembros[0]
+
+
+def detect_encoding(path):
+    """Codificación del CSV de origen (los archivos del SESNSP suelen ser latin-1)"""
+    muestra = _sample(Path(path))
+    # Se descarta la última línea, que puede venir cortada a media letra
+    muestra = muestra[:muestra.rfind(b"\n") + 1] or muestra
+    for encoding in SOURCE_ENCODINGS:
+        try:
+            muestra.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return SOURCE_ENCODINGS[-1]
+
+
+def _resolve_columns(encabezado):
+    """{columna de origen: nombre interno}, incluidas las columnas de mes"""
+    limpio = {str(col).strip(): col for col in encabezado}
+    renombrar = {}
+    for interno, alias in COLUMNAS_ORIGEN.items():
+        origen = next((limpio[a] for a in alias if a in limpio), None)
+        if origen is not None:
+            renombrar[origen] = interno
+    faltantes = {'Año', 'Municipio_id', 'Tipo_delito'} - set(renombrar.values())
+    if faltantes or not any(mes in limpio for mes in MESES):
+        raise ValueError(f"Faltan columnas en el archivo de origen: {sorted(faltantes) or 'meses'}")
+    renombrar.update({limpio[mes]: mes for mes in MESES if mes in limpio})
+    return renombrar
+
+
+def _iter_xlsx(path, chunksize):
+    if openpyxl is None:
+        raise ValueError("Leer archivos XLSX requiere openpyxl (pip install openpyxl)")
+    libro = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = next(filas)
+        renombrar = _resolve_columns(encabezado)
+        indices = [i for i, col in enumerate(encabezado) if col in renombrar]
+        nombres = [renombrar[encabezado[i]] for i in indices]
+        bloque = []
+        for fila in filas:
+            bloque.append([fila[i] for i in indices])
+            if len(bloque) >= chunksize:
+                yield pd.DataFrame(bloque, columns=nombres)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=nombres)
+    finally:
+        libro.close()
+
+
+def iter_source(path, chunksize=DEFAULT_CHUNK_SIZE):
+    """Bloques del archivo de origen con las columnas internas (Año,
+    Municipio_id, Tipo_delito, Bien_juridico y los meses)"""
+    path = Path(path)
+    if path.suffix.lower() == '.xlsx':
+        yield from _iter_xlsx(path, chunksize)
+        return
+    opciones = {'encoding': detect_encoding(path), 'thousands': ','}
+    if path.suffix.lower() == '.zip':
+        with zipfile.ZipFile(path) as zf:
+            opciones['compression'] = {'method': 'zip', 'archive_name': _zip_member(zf)}
+    renombrar = _resolve_columns(pd.read_csv(path, nrows=0, **opciones).columns)
+    for bloque in pd.read_csv(path, usecols=list(renombrar), chunksize=chunksize, **opciones):
+        yield bloque.rename(columns=renombrar)
+
+
+def melt_months(bloque, tipos):
+    """Columnas de mes a filas (Municipio_id, Periodo, Tipo_delito, Incidencia)
+
+    Los meses sin dato (aún no publicados) se descartan. `tipos` es la tabla
+    {(nombre, bien jurídico): código} que se completa con los tipos nuevos.
+    """
+    meses = [mes for mes in MESES if mes in bloque.columns]
+    valores = bloque[meses]
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in valores.dtypes):
+        valores = valores.apply(pd.to_numeric, errors='coerce')
+    matriz = valores.to_numpy(dtype=np.float64)
+    presentes = ~np.isnan(matriz)
+    filas, columnas = np.nonzero(presentes)
+
+    # Códigos de tipo de delito: sólo se buscan los nombres distintos del bloque
+    bien = bloque['Bien_juridico'] if 'Bien_juridico' in bloque.columns \
+        else pd.Series('', index=bloque.index)
+    codigos, unicos = pd.factorize(
+        pd.MultiIndex.from_arrays([bloque['Tipo_delito'].astype(str).str.strip(),
+                                   bien.astype(str).str.strip()])
+    )
+    ids = np.array([tipos.setdefault(tipo, len(tipos)) for tipo in unicos], dtype=np.int16)
+
+    numeros_mes = np.array([MESES.index(mes) + 1 for mes in meses], dtype=np.int32)
+    anos = bloque['Año'].to_numpy(dtype=np.int32)
+    return pd.DataFrame({
+        'Municipio_id': bloque['Municipio_id'].to_numpy(dtype=np.int32)[filas],
+        'Periodo': periods.compose(anos[filas], numeros_mes[columnas], periods.MENSUAL),
+        'Tipo_delito': ids[codigos][filas],
+        'Incidencia': matriz[filas, columnas].astype(np.int32),
+    })
+
+
+def _aggregate(largo):
+    return largo.groupby(LLAVES, sort=True, as_index=False)['Incidencia'].sum()
+
+
+def _partition(destino, ano):
+    return Path(destino) / f"Año={ano}"
+
+
+def _write_part(destino, ano, df, numero):
+    particion = _partition(destino, ano)
+    particion.mkdir(parents=True, exist_ok=True)
+    return storage.write_table(df, particion / f"part-{numero:05d}.csv", dtypes=OUTPUT_DTYPES)
+
+
+def _read_partition(particion, columns=None):
+    partes = [storage.read_table(parte, columns=columns) for parte in storage.list_tables(particion)]
+    if not partes:
+        vacia = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in OUTPUT_DTYPES.items()})
+        return vacia[columns] if columns else vacia
+    return pd.concat(partes, ignore_index=True)
+
+
+def _compact(destino, ano):
+    """Vuelve a sumar una partición cuyas partes comparten llaves; regresa
+    el número de renglones resultante"""
+    particion = _partition(destino, ano)
+    df = _aggregate(_read_partition(particion))
+    shutil.rmtree(particion)
+    _write_part(destino, ano, df, 0)
+    return len(df)
+
+
+def _replace_dir(tmp, destino):
+    """Sustituye el directorio `destino` por `tmp` (casi atómico)"""
+    viejo = destino.with_name(f"{destino.name}.old")
+    shutil.rmtree(viejo, ignore_errors=True)
+    if destino.exists():
+        os.replace(destino, viejo)
+    os.replace(tmp, destino)
+    shutil.rmtree(viejo, ignore_errors=True)
+
+
+def process_incidencia(fuente, destino, catalogo, chunksize=DEFAULT_CHUNK_SIZE,
+                       flush_rows=FLUSH_ROWS):
+    """Procesa el archivo de origen en streaming; regresa un resumen (dict)
+
+    `destino` es el directorio de la tabla particionada por año y `catalogo`
+    la ruta lógica de la tabla de tipos de delito.
+    """
+    destino = Path(destino)
+    tmp = destino.with_name(f"{destino.name}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    tipos = {}
+    pendientes = {}
+    en_espera = 0
+    partes = {}
+    filas = {}
+    completas = np.empty(0, dtype=np.int64)
+    desordenados = set()
+    resumen = {'filas_origen': 0, 'filas_mensuales': 0}
+    arrastre = None
+
+    def escribir():
+        nonlocal en_espera
+        for ano, trozos in sorted(pendientes.items()):
+            df = pd.concat(trozos, ignore_index=True)
+            _write_part(tmp, ano, df, partes.get(ano, 0))
+            partes[ano] = partes.get(ano, 0) + 1
+            filas[ano] = filas.get(ano, 0) + len(df)
+        pendientes.clear()
+        en_espera = 0
+
+    def agregar(bloque):
+        nonlocal completas, en_espera
+        if not len(bloque):
+            return
+        llaves = np.unique(bloque['Año'].to_numpy(dtype=np.int64) * 100_000
+                           + bloque['Municipio_id'].to_numpy(dtype=np.int64))
+        repetidas = llaves[np.isin(llaves, completas, assume_unique=True)]
+        desordenados.update(int(ano) for ano in np.unique(repetidas // 100_000))
+        completas = np.union1d(completas, llaves)
+
+        largo = melt_months(bloque, tipos)
+        resumen['filas_mensuales'] += len(largo)
+        suma = _aggregate(largo)
+        for ano, grupo in suma.groupby(suma['Periodo'] // 100, sort=False):
+            pendientes.setdefault(int(ano), []).append(grupo)
+        en_espera += len(suma)
+        if en_espera >= flush_rows:
+            escribir()
+
+    for bloque in iter_source(fuente, chunksize):
+        resumen['filas_origen'] += len(bloque)
+        bloque = bloque.dropna(subset=['Año', 'Municipio_id'])
+        if arrastre is not None:
+            bloque = pd.concat([arrastre, bloque], ignore_index=True)
+        # Las filas del último (año, municipio) pueden seguir en el siguiente bloque
+        llave = bloque['Año'].to_numpy(dtype=np.int64) * 100_000 \
+            + bloque['Municipio_id'].to_numpy(dtype=np.int64)
+        corte = len(llave)
+        if corte:
+            distintas = np.flatnonzero(llave != llave[-1])
+            corte = distintas[-1] + 1 if len(distintas) else 0
+        arrastre = bloque.iloc[corte:]
+        agregar(bloque.iloc[:corte])
+    if arrastre is not None:
+        agregar(arrastre)
+    escribir()
+
+    # Años con llaves repetidas entre partes (archivo de origen desordenado)
+    for ano in sorted(desordenados):
+        filas[ano] = _compact(tmp, ano)
+
+    _replace_dir(tmp, destino)
+
+    catalogo_df = pd.DataFrame(
+        [(codigo, nombre, bien or None) for (nombre, bien), codigo in tipos.items()],
+        columns=['Tipo_delito', 'Nombre', 'Bien_juridico'],
+    )
+    storage.write_table(catalogo_df, catalogo, dtypes=TIPOS_DTYPES)
+
+    resumen.update({
+        'filas': sum(filas.values()),
+        'anos': sorted(partes),
+        'municipios': len(np.unique(completas % 100_000)),
+        'tipos': len(tipos),
+        'reordenados': sorted(desordenados),
+    })
+    return resumen
+
+
+def read_incidencia(destino, anos=None, columns=None, catalogo=None):
+    """Lee la tabla particionada (sólo los `anos` indicados, si se dan)
+
+    Con `catalogo` (ruta de la tabla de tipos) Tipo_delito se regresa como
+    Categorical con el nombre del delito.
+    """
+    particiones = sorted(Path(destino).glob("Año=*"))
+    if anos is not None:
+        anos = {int(ano) for ano in anos}
+        particiones = [p for p in particiones if int(p.name.split("=", 1)[1]) in anos]
+    df = pd.concat(
+        [_read_partition(p, columns) for p in particiones] or [_read_partition(Path(destino), columns)],
+        ignore_index=True,
+    )
+    if catalogo is not None and 'Tipo_delito' in df.columns:
+        tipos = storage.read_table(catalogo, columns=['Tipo_delito', 'Nombre'])
+        nombres = pd.Series(tipos['Nombre'].to_numpy(), index=tipos['Tipo_delito'].to_numpy())
+        df['Tipo_delito'] = pd.Categorical(
+            nombres.reindex(df['Tipo_delito'].to_numpy()).to_numpy(),
+            categories=sorted(nombres.unique()),
+        )
+    return df
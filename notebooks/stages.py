@@ -0,0 +1,250 @@
+"""
+Planificador de etapas con dependencias (DAG) sobre un pool de procesos
+
+Cada etapa es una función de nivel de módulo con sus argumentos y la lista de
+etapas que debe esperar. Las etapas sin dependencias pendientes se ejecutan en
+paralelo en un ProcessPoolExecutor; una etapa arranca en cuanto terminan todas
+sus dependencias (aunque alguna haya fallado, igual que en la ejecución
+secuencial original, donde cada etapa trabaja con lo que haya en disco).
+
+La salida de cada etapa se captura en el proceso hijo y se imprime completa al
+terminar, para que los mensajes de etapas paralelas no se mezclen. Cada etapa
+se mide en su proceso (tiempo de CPU, pico de memoria y, opcionalmente, un
+perfil; ver instrumentation.py). Al final se reporta el tiempo por etapa y la
+ruta crítica del DAG.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import io
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+
+import instrumentation
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+@dataclass
+class Stage:
+    """Etapa del DAG: `func(*args)` se ejecuta después de `deps`
+
+    `entradas` y `salidas` son los archivos que lee y escribe la etapa; el
+    planificador no los usa, pero sirven para decidir si se puede omitir
+    (ver manifest.py).
+    """
+    nombre: str
+    func: object
+    args: tuple = ()
+    deps: tuple = ()
+    entradas: tuple = ()
+    salidas: tuple = ()
+
+
+@dataclass
+class StageResult:
+    """Resultado de una etapa; `ok` es falso si regresó False o lanzó excepción"""
+    nombre: str
+    ok: bool = False
+    omitida: bool = False
+    duracion: float = 0.0
+    salida: str = ""
+    error: str = None
+    inicio: float = 0.0
+    fin: float = 0.0
+    # Mediciones del proceso que ejecutó la etapa (ver instrumentation.measure)
+    metricas: dict = field(default_factory=dict)
+
+
+@dataclass
+class RunReport:
+    """Resultados de una corrida, tiempo total y ruta crítica"""
+    resultados: dict = field(default_factory=dict)
+    total: float = 0.0
+    ruta_critica: list = field(default_factory=list)
+
+    @property
+    def duracion_critica(self):
+        return sum(self.resultados[nombre].duracion for nombre in self.ruta_critica)
+
+    @property
+    def duracion_serial(self):
+        return sum(r.duracion for r in self.resultados.values())
+
+
+def _run_stage(func, args, perfil=None, destino=None):
+    """Ejecuta una etapa capturando su salida y sus métricas (corre en el proceso hijo)"""
+    salida = io.StringIO()
+    inicio = time.perf_counter()
+    error = None
+    with redirect_stdout(salida), instrumentation.measure(perfil, destino) as metricas:
+        try:
+            valor = func(*args)
+        except Exception:
+            valor = False
+            error = traceback.format_exc(limit=3)
+    # Las etapas que no regresan nada (reportes) cuentan como exitosas
+    ok = valor is not False
+    return ok, time.perf_counter() - inicio, salida.getvalue(), error, metricas
+
+
+def _validate(stages):
+    nombres = {stage.nombre for stage in stages}
+    if len(nombres) != len(stages):
+        raise ValueError("Hay etapas con nombre repetido")
+    for stage in stages:
+        faltantes = set(stage.deps) - nombres
+        if faltantes:
+            raise ValueError(f"La etapa {stage.nombre} depende de etapas inexistentes: {sorted(faltantes)}")
+
+    # Detectar ciclos con un orden topológico (Kahn)
+    pendientes = {stage.nombre: set(stage.deps) for stage in stages}
+    listas = [nombre for nombre, deps in pendientes.items() if not deps]
+    vistos = 0
+    while listas:
+        actual = listas.pop()
+        vistos += 1
+        for nombre, deps in pendientes.items():
+            if actual in deps:
+                deps.discard(actual)
+                if not deps:
+                    listas.append(nombre)
+    if vistos != len(stages):
+        raise ValueError("Las dependencias entre etapas tienen un ciclo")
+
+
+def critical_path(stages, resultados):
+    """Cadena de dependencias con mayor duración acumulada"""
+    por_nombre = {stage.nombre: stage for stage in stages}
+    memo = {}
+
+    def camino(nombre):
+        if nombre not in memo:
+            previo = max(
+                (camino(dep) for dep in por_nombre[nombre].deps),
+                key=lambda c: c[0], default=(0.0, []),
+            )
+            memo[nombre] = (previo[0] + resultados[nombre].duracion, previo[1] + [nombre])
+        return memo[nombre]
+
+    return max((camino(stage.nombre) for stage in stages), key=lambda c: c[0], default=(0.0, []))[1]
+
+
+def run_stages(stages, max_workers=DEFAULT_WORKERS, initializer=None, initargs=(), echo=True,
+               skip=None, on_complete=None, perfil=None, perfil_dir=None):
+    """Ejecuta las etapas respetando sus dependencias; regresa un RunReport
+
+    Con `max_workers=1` todo corre en el proceso actual, en orden topológico.
+    `initializer(*initargs)` prepara cada proceso hijo (por ejemplo, el formato
+    de almacenamiento de la corrida). Con `echo` se imprime la salida de cada
+    etapa al terminar.
+
+    `skip(stage)` se consulta en el proceso principal cuando las dependencias
+    de la etapa ya terminaron; si regresa True la etapa se da por exitosa sin
+    ejecutarse. `on_complete(stage, resultado)` se llama al terminar cada
+    etapa ejecutada.
+
+    `perfil` ('cprofile' o 'tracemalloc') perfila cada etapa; los .prof de
+    cProfile se guardan en `perfil_dir`, uno por etapa.
+    """
+    _validate(stages)
+    reporte = RunReport()
+    pendientes = {stage.nombre: stage for stage in stages}
+    terminadas = set()
+    t0 = time.perf_counter()
+
+    def destino(stage):
+        if perfil != 'cprofile' or perfil_dir is None:
+            return None
+        return instrumentation.profile_path(perfil_dir, stage.nombre)
+
+    def registrar(stage, resultado, inicio):
+        ok, duracion, salida, error, metricas = resultado
+        fin = time.perf_counter() - t0
+        reporte.resultados[stage.nombre] = StageResult(
+            stage.nombre, ok=ok, duracion=duracion, salida=salida, error=error,
+            inicio=inicio, fin=fin, metricas=metricas,
+        )
+        terminadas.add(stage.nombre)
+        if echo:
+            print(salida, end="")
+            if error:
+                print(f"\n✗ Error en {stage.nombre}:\n{error}")
+        if on_complete is not None:
+            on_complete(stage, reporte.resultados[stage.nombre])
+
+    def listas():
+        """Etapas listas para ejecutarse; las que se pueden omitir se resuelven aquí"""
+        por_ejecutar = []
+        while True:
+            nombres = [n for n, s in pendientes.items() if set(s.deps) <= terminadas]
+            if not nombres:
+                return por_ejecutar
+            for nombre in nombres:
+                stage = pendientes.pop(nombre)
+                if skip is not None and skip(stage):
+                    momento = time.perf_counter() - t0
+                    reporte.resultados[nombre] = StageResult(
+                        nombre, ok=True, omitida=True, inicio=momento, fin=momento
+                    )
+                    terminadas.add(nombre)
+                    if echo:
+                        print(f"\n= {nombre}: sin cambios, se omite")
+                else:
+                    por_ejecutar.append(stage)
+
+    if max_workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        while pendientes:
+            for stage in listas():
+                inicio = time.perf_counter() - t0
+                registrar(stage, _run_stage(stage.func, stage.args, perfil, destino(stage)), inicio)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer,
+                                 initargs=initargs) as pool:
+            en_curso = {}
+            while pendientes or en_curso:
+                for stage in listas():
+                    futuro = pool.submit(_run_stage, stage.func, stage.args, perfil, destino(stage))
+                    en_curso[futuro] = (stage, time.perf_counter() - t0)
+                if not en_curso:
+                    break
+                listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    stage, inicio = en_curso.pop(futuro)
+                    try:
+                        resultado = futuro.result()
+                    except Exception:
+                        # El proceso hijo murió o la etapa no se pudo serializar
+                        resultado = (False, 0.0, "", traceback.format_exc(limit=3), {})
+                    registrar(stage, resultado, inicio)
+
+    reporte.total = time.perf_counter() - t0
+    reporte.ruta_critica = critical_path(stages, reporte.resultados)
+    return reporte
+
+
+def format_report(reporte):
+    """Tabla de tiempos por etapa y ruta crítica"""
+    lineas = [f"{'Etapa':<28} {'Inicio':>8} {'Duración':>9}  Estado"]
+    for resultado in sorted(reporte.resultados.values(), key=lambda r: r.inicio):
+        estado = "=" if resultado.omitida else ("✓" if resultado.ok else "✗")
+        marca = " *" if resultado.nombre in reporte.ruta_critica else ""
+        lineas.append(
+            f"{resultado.nombre:<28} {resultado.inicio:>7.2f}s {resultado.duracion:>8.2f}s  {estado}{marca}"
+        )
+    lineas.append("")
+    lineas.append(f"Ruta crítica (*): {' → '.join(reporte.ruta_critica)} "
+                  f"({reporte.duracion_critica:.2f}s)")
+    lineas.append(f"Tiempo total: {reporte.total:.2f}s "
+                  f"(suma de etapas: {reporte.duracion_serial:.2f}s)")
+    omitidas = sum(1 for r in reporte.resultados.values() if r.omitida)
+    if omitidas:
+        lineas.append(f"Etapas omitidas sin cambios (=): {omitidas}/{len(reporte.resultados)}")
+    return "\n".join(lineas)
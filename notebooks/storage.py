@@ -0,0 +1,263 @@
+"""
+Capa de almacenamiento para las capas raw, interim y processed
+
+Las tablas se identifican por su ruta lógica (por ejemplo
+`data/processed/ied_procesado.csv`); la extensión real depende del formato
+configurado:
+
+- parquet: columnar, compresión zstd y estadísticas por row group
+- feather: columnar (Arrow IPC), compresión zstd, lectura muy rápida
+- csv: formato original, y exportación opcional junto a los otros formatos
+
+El formato se elige con la variable de entorno DATA_FORMAT (default: parquet
+si pyarrow está instalado, csv si no). Al leer se usa la copia más reciente,
+de modo que los CSV existentes siguen sirviendo mientras no se regeneren.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ModuleNotFoundError:
+    pa = None
+
+FORMATS = ("parquet", "feather", "csv")
+COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 128_000
+CSV_CHUNK_SIZE = 100_000
+
+DATA_FORMAT = os.getenv("DATA_FORMAT", "parquet" if pa is not None else "csv")
+# Escribir también una copia CSV junto a los archivos columnares
+EXPORT_CSV = os.getenv("DATA_EXPORT_CSV", "0") == "1"
+
+
+def set_format(fmt, export_csv=None):
+    """Cambia el formato de escritura (y la exportación CSV) de la corrida"""
+    global DATA_FORMAT, EXPORT_CSV
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt} (opciones: {', '.join(FORMATS)})")
+    if fmt != "csv" and pa is None:
+        raise ValueError(f"El formato {fmt} requiere pyarrow (pip install pyarrow)")
+    DATA_FORMAT = fmt
+    if export_csv is not None:
+        EXPORT_CSV = export_csv
+
+
+def table_path(path, fmt=None):
+    """Ruta física de una tabla en el formato indicado"""
+    return Path(path).with_suffix(f".{fmt or DATA_FORMAT}")
+
+
+def find_table(path):
+    """Archivo existente de una tabla
+
+    Si hay copias en varios formatos se lee la más reciente (a igual fecha, el
+    formato configurado), así una copia vieja nunca oculta datos nuevos.
+    """
+    orden = (DATA_FORMAT,) + tuple(f for f in FORMATS if f != DATA_FORMAT)
+    candidatos = [
+        table_path(path, fmt) for fmt in orden
+        if (fmt == "csv" or pa is not None) and table_path(path, fmt).exists()
+    ]
+    if not candidatos:
+        return None
+    return max(candidatos, key=lambda archivo: archivo.stat().st_mtime_ns)
+
+
+def table_exists(path):
+    return find_table(path) is not None
+
+
+def list_tables(directory):
+    """Rutas lógicas (.csv) de las tablas de un directorio, sin duplicar formatos"""
+    nombres = set()
+    for fmt in FORMATS:
+        for archivo in Path(directory).glob(f"*.{fmt}"):
+            nombres.add(archivo.with_suffix(".csv"))
+    return sorted(nombres)
+
+
+def _fmt(archivo):
+    return archivo.suffix.lstrip(".")
+
+
+def table_columns(path):
+    """Nombres de columna de una tabla sin leer sus datos"""
+    archivo = find_table(path)
+    if archivo is None:
+        raise FileNotFoundError(path)
+    fmt = _fmt(archivo)
+    if fmt == "parquet":
+        return list(pq.read_schema(archivo).names)
+    if fmt == "feather":
+        return list(pa.ipc.open_file(pa.memory_map(str(archivo))).schema.names)
+    return list(pd.read_csv(archivo, nrows=0).columns)
+
+
+def table_rows(path):
+    """Número de filas de una tabla sin cargar sus datos"""
+    archivo = find_table(path)
+    if archivo is None:
+        raise FileNotFoundError(path)
+    fmt = _fmt(archivo)
+    if fmt == "parquet":
+        return pq.ParquetFile(archivo).metadata.num_rows
+    if fmt == "feather":
+        lector = pa.ipc.open_file(pa.memory_map(str(archivo)))
+        return sum(lector.get_batch(i).num_rows for i in range(lector.num_record_batches))
+    return sum(len(bloque) for bloque in pd.read_csv(archivo, usecols=[0], chunksize=CSV_CHUNK_SIZE))
+
+
+def read_table(path, columns=None, dtypes=None):
+    """Lee una tabla (sólo las `columns` indicadas, si se dan)"""
+    archivo = find_table(path)
+    if archivo is None:
+        raise FileNotFoundError(path)
+    fmt = _fmt(archivo)
+    if fmt == "parquet":
+        df = pd.read_parquet(archivo, columns=columns)
+    elif fmt == "feather":
+        df = pd.read_feather(archivo, columns=columns, memory_map=True)
+    else:
+        df = pd.read_csv(archivo, usecols=columns, dtype=dtypes)
+    if dtypes and fmt != "csv":
+        df = df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns})
+    return df
+
+
+def iter_table(path, columns=None, chunksize=CSV_CHUNK_SIZE):
+    """Lee una tabla por bloques (row groups en parquet)"""
+    archivo = find_table(path)
+    if archivo is None:
+        raise FileNotFoundError(path)
+    fmt = _fmt(archivo)
+    if fmt == "parquet":
+        for lote in pq.ParquetFile(archivo).iter_batches(batch_size=chunksize, columns=columns):
+            yield lote.to_pandas()
+    elif fmt == "feather":
+        tabla = feather.read_table(archivo, columns=columns, memory_map=True)
+        for lote in tabla.to_batches(max_chunksize=chunksize):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(archivo, usecols=columns, chunksize=chunksize)
+
+
+def _write_atomic(path, escribir):
+    tmp = path.with_name(f"{path.name}.tmp")
+    escribir(tmp)
+    os.replace(tmp, path)
+
+
+def write_table(df, path, dtypes=None, fmt=None, export_csv=None):
+    """Escribe una tabla en el formato configurado; regresa la ruta escrita
+
+    `dtypes` fija los tipos de las columnas antes de escribir. En parquet se
+    escriben estadísticas (min/max/nulos) por row group.
+    """
+    fmt = fmt or DATA_FORMAT
+    export_csv = EXPORT_CSV if export_csv is None else export_csv
+    if dtypes:
+        df = df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns})
+
+    # La copia CSV se escribe primero para que la columnar sea la más reciente
+    if export_csv and fmt != "csv":
+        _write_atomic(table_path(path, "csv"), lambda tmp: df.to_csv(tmp, index=False))
+
+    destino = table_path(path, fmt)
+    if fmt == "parquet":
+        _write_atomic(destino, lambda tmp: df.to_parquet(
+            tmp, index=False, compression=COMPRESSION,
+            row_group_size=ROW_GROUP_SIZE, write_statistics=True,
+        ))
+    elif fmt == "feather":
+        _write_atomic(destino, lambda tmp: df.reset_index(drop=True).to_feather(
+            tmp, compression=COMPRESSION,
+        ))
+    else:
+        _write_atomic(destino, lambda tmp: df.to_csv(tmp, index=False))
+    return destino
+
+
+def convert_csv(csv_file, path, dtypes=None, fmt=None, export_csv=None):
+    """Publica un CSV (por ejemplo, el parcial de una descarga) en el formato configurado
+
+    En parquet la conversión se hace por bloques, un row group por bloque, con
+    el esquema fijado por `dtypes` para que todos los bloques coincidan. El CSV
+    de origen se conserva sólo si se pide la exportación CSV.
+    """
+    fmt = fmt or DATA_FORMAT
+    export_csv = EXPORT_CSV if export_csv is None else export_csv
+    csv_file = Path(csv_file)
+    destino = table_path(path, fmt)
+
+    if fmt == "csv":
+        os.replace(csv_file, destino)
+        return destino
+
+    if export_csv:
+        os.replace(csv_file, table_path(path, "csv"))
+        csv_file = table_path(path, "csv")
+
+    columnas = pd.read_csv(csv_file, nrows=0).columns
+    dtypes = {col: dtype for col, dtype in (dtypes or {}).items() if col in columnas}
+
+    if fmt == "parquet":
+        def escribir(tmp):
+            writer = None
+            try:
+                for bloque in pd.read_csv(csv_file, dtype=dtypes, chunksize=ROW_GROUP_SIZE):
+                    tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp, tabla.schema, compression=COMPRESSION,
+                                                  write_statistics=True)
+                    writer.write_table(tabla.cast(writer.schema))
+                if writer is None:
+                    vacia = pd.read_csv(csv_file, nrows=0).astype(dtypes)
+                    vacia.to_parquet(tmp, index=False, compression=COMPRESSION)
+            finally:
+                if writer is not None:
+                    writer.close()
+        _write_atomic(destino, escribir)
+    else:
+        df = pd.read_csv(csv_file, dtype=dtypes)
+        _write_atomic(destino, lambda tmp: df.to_feather(tmp, compression=COMPRESSION))
+
+    if not export_csv:
+        csv_file.unlink()
+    return destino
+
+
+def append_table(df, path, dtypes=None):
+    """Agrega registros a una tabla existente con escritura atómica
+
+    Un CSV se copia y se le agregan los registros sin leerlo; los formatos
+    columnares se reescriben completos. Las columnas de `df` se alinean con
+    las de la tabla existente.
+    """
+    archivo = find_table(path)
+    if archivo is None:
+        return write_table(df, path, dtypes=dtypes)
+
+    columnas = table_columns(path)
+    df = df.reindex(columns=columnas)
+    if _fmt(archivo) == "csv" and DATA_FORMAT == "csv":
+        def escribir(tmp):
+            shutil.copyfile(archivo, tmp)
+            with open(tmp, 'a', encoding='utf-8', newline='') as f:
+                df.to_csv(f, index=False, header=False)
+        _write_atomic(archivo, escribir)
+        return archivo
+
+    existente = read_table(path, dtypes=dtypes)
+    if dtypes:
+        df = df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns})
+    return write_table(pd.concat([existente, df], ignore_index=True), path, dtypes=dtypes)
@@ -0,0 +1,237 @@
+"""
+Ingesta en streaming de respuestas JSON a archivos columnares por lotes
+
+Las respuestas de las APIs se leen por bloques desde disco y los registros del
+arreglo `data` (o `Series` en INEGI) se producen uno a uno, sin cargar el
+cuerpo completo. Los registros se acumulan en buffers tipados por columna y se
+escriben por lotes, de modo que en memoria sólo hay un lote a la vez.
+
+Autor: Equipo Seguridad y Desarrollo
+Fecha: 2025
+"""
+
+import codecs
+import json
+from array import array
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_BATCH_SIZE = 50_000
+
+
+def iter_file_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Lee un archivo binario por bloques"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class _TextStream:
+    """Texto decodificado de forma incremental a partir de bloques de bytes"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """Agrega el siguiente bloque al buffer; False si ya no hay más"""
+        if self.eof:
+            return False
+        # Descartar lo ya consumido para que el buffer no crezca
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        try:
+            self.buf += self._decoder.decode(next(self._chunks))
+        except StopIteration:
+            self.buf += self._decoder.decode(b"", final=True)
+            self.eof = True
+        return True
+
+    def peek(self):
+        """Siguiente carácter que no sea espacio ('' al final del flujo)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, caracter):
+        if self.peek() != caracter:
+            raise ValueError(f"JSON inválido: se esperaba '{caracter}' en la posición {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decodifica el siguiente valor JSON completo"""
+        self.peek()
+        while True:
+            try:
+                valor, fin = self._json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.more():
+                    raise
+                continue
+            # Un número al final del buffer puede estar incompleto ('12' de '123',
+            # '7.5' de '7.5e10')
+            es_numero = isinstance(valor, (int, float)) and not isinstance(valor, bool)
+            if es_numero and not self.eof and (
+                fin == len(self.buf) or self.buf[fin] in "0123456789+-.eE"
+            ):
+                self.more()
+                continue
+            self.pos = fin
+            return valor
+
+
+def iter_json_array(chunks, key="data"):
+    """Produce los elementos del arreglo `key` de un objeto JSON en streaming
+
+    Sólo se buscan llaves de primer nivel; los demás valores del objeto se
+    decodifican y descartan. Si la llave no existe no se produce nada.
+    """
+    stream = _TextStream(chunks)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+
+    while True:
+        llave = stream.value()
+        stream.expect(":")
+        if llave == key and stream.peek() == "[":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.peek() == ",":
+                        stream.pos += 1
+                        continue
+                    stream.expect("]")
+                    break
+        else:
+            stream.value()
+
+        if stream.peek() == ",":
+            stream.pos += 1
+            continue
+        stream.expect("}")
+        return
+
+
+def _new_buffer(valor):
+    """Buffer tipado según el primer valor de la columna"""
+    if isinstance(valor, bool):
+        return []
+    if isinstance(valor, int):
+        return array('q')
+    if isinstance(valor, float):
+        return array('d')
+    return []
+
+
+class ColumnarBatchWriter:
+    """Acumula registros en buffers por columna y los escribe a CSV por lotes
+
+    Las columnas se toman del primer registro (o de `columns`, filtradas a las
+    que trae el primer registro). Las columnas numéricas se guardan en arreglos
+    `array` tipados; si aparece un valor que no cabe (nulo, texto o un flotante
+    en una columna entera) el buffer pasa a ser una lista.
+    """
+
+    def __init__(self, path, columns=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.requested_columns = columns
+        self.batch_size = batch_size
+        self.columns = None
+        self.rows = 0
+        self._buffers = None
+        self._pendientes = 0
+        self._file = None
+
+    def _start(self, record):
+        if self.requested_columns is not None:
+            self.columns = [col for col in self.requested_columns if col in record]
+        else:
+            self.columns = list(record)
+        self._buffers = {col: _new_buffer(record.get(col)) for col in self.columns}
+        self._file = open(self.path, 'w', encoding='utf-8', newline='')
+        pd.DataFrame(columns=self.columns).to_csv(self._file, index=False)
+
+    def append(self, record):
+        if self.columns is None:
+            self._start(record)
+
+        for col in self.columns:
+            buffer = self._buffers[col]
+            valor = record.get(col)
+            if isinstance(buffer, array):
+                try:
+                    buffer.append(valor)
+                    continue
+                except (TypeError, OverflowError):
+                    buffer = self._buffers[col] = buffer.tolist()
+            buffer.append(valor)
+
+        self._pendientes += 1
+        if self._pendientes >= self.batch_size:
+            self.flush()
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def append_columns(self, columnas):
+        """Escribe un bloque que ya viene en columnas ({columna: arreglo})
+
+        Se escribe de inmediato, sin pasar por registros ni por los buffers
+        (el lote pendiente se escribe antes para conservar el orden).
+        """
+        if self.columns is None:
+            self._start(dict.fromkeys(columnas))
+        self.flush()
+        bloque = pd.DataFrame({col: columnas.get(col) for col in self.columns})
+        bloque.to_csv(self._file, index=False, header=False)
+        self.rows += len(bloque)
+
+    def flush(self):
+        """Escribe el lote actual y libera sus buffers"""
+        if not self._pendientes:
+            return
+        lote = pd.DataFrame({
+            col: np.asarray(buffer) if isinstance(buffer, array) else buffer
+            for col, buffer in self._buffers.items()
+        })
+        lote.to_csv(self._file, index=False, header=False)
+        self.rows += self._pendientes
+        self._pendientes = 0
+        # Los buffers del siguiente lote conservan el tipo de los actuales
+        self._buffers = {
+            col: array(buffer.typecode) if isinstance(buffer, array) else []
+            for col, buffer in self._buffers.items()
+        }
+
+    def close(self):
+        """Escribe el último lote; regresa el total de registros escritos"""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
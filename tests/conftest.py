@@ -0,0 +1,8 @@
+"""Configuración de pytest: los módulos del pipeline viven en notebooks/"""
+
+import sys
+from pathlib import Path
+
+NOTEBOOKS_DIR = Path(__file__).resolve().parents[1] / "notebooks"
+if str(NOTEBOOKS_DIR) not in sys.path:
+    sys.path.insert(0, str(NOTEBOOKS_DIR))
@@ -0,0 +1,100 @@
+"""Pruebas del circuit breaker y los reintentos de http_client"""
+
+import time
+
+import http_client
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Sesión que responde con los códigos de `codigos`, en orden"""
+
+    def __init__(self, codigos):
+        self.codigos = list(codigos)
+        self.peticiones = 0
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        self.peticiones += 1
+        return FakeResponse(self.codigos.pop(0))
+
+
+URL = "http://api.prueba/datos"
+
+
+def _scheduler(max_retries=2, reset=0.05):
+    return http_client.RequestScheduler(
+        max_retries=max_retries, backoff_base=0.0, backoff_max=0.0,
+        rate_limits={"api.prueba": (1000.0, 1000)},
+        breaker_threshold=1, breaker_reset=reset,
+    )
+
+
+def test_circuito_se_abre_al_agotar_reintentos():
+    scheduler = _scheduler(max_retries=1)
+    session = FakeSession([503, 503])
+    response, error, intentos = scheduler.send(session, URL, timeout=1)
+    assert response.status_code == 503 and intentos == 2
+
+    _, error, _ = scheduler.send(session, URL, timeout=1)
+    assert error == "circuito abierto para api.prueba"
+    assert session.peticiones == 2
+
+
+def test_prueba_fallida_reabre_y_se_recupera():
+    scheduler = _scheduler(max_retries=1)
+    session = FakeSession([503, 503, 503, 200])
+    scheduler.send(session, URL, timeout=1)
+
+    # Prueba semiabierta -> 503: el circuito se vuelve a abrir (no queda bloqueado)
+    time.sleep(0.06)
+    _, error, _ = scheduler.send(session, URL, timeout=1)
+    assert error == "circuito abierto para api.prueba"
+    assert session.peticiones == 3
+
+    # Tras el enfriamiento, una nueva prueba con 200 cierra el circuito
+    time.sleep(0.06)
+    response, error, _ = scheduler.send(session, URL, timeout=1)
+    assert error is None and response.status_code == 200
+
+    session.codigos = [200]
+    response, error, _ = scheduler.send(session, URL, timeout=1)
+    assert error is None and response.status_code == 200
+
+
+class BodyResponse:
+    def __init__(self, cuerpo, headers=None):
+        self.cuerpo = cuerpo
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.cuerpo), chunk_size):
+            yield self.cuerpo[i:i + chunk_size]
+
+
+def test_cache_no_guarda_cuerpos_mayores_al_limite(tmp_path):
+    cache = http_client.ResponseCache(tmp_path / "cache", max_bytes=10)
+    ruta, tamano = cache.store("http://a/grande", BodyResponse(b"x" * 50), tmp_path / "spool.body")
+    assert ruta == tmp_path / "spool.body" and tamano == 50
+    assert ruta.read_bytes() == b"x" * 50
+    assert cache.lookup("http://a/grande") == (None, None)
+    assert not cache.fits(BodyResponse(b"", {"Content-Length": "50"}))
+
+
+def test_cache_no_desaloja_entradas_en_uso(tmp_path):
+    cache = http_client.ResponseCache(tmp_path / "cache", max_bytes=15)
+    primera, _ = cache.store("http://a/1", BodyResponse(b"1" * 10), tmp_path / "1.body")
+    segunda, _ = cache.store("http://a/2", BodyResponse(b"2" * 10), tmp_path / "2.body")
+    # Ambas fueron entregadas y siguen en uso: ninguna se borra
+    assert primera.read_bytes() == b"1" * 10
+    assert segunda.read_bytes() == b"2" * 10
+
+    cache.release_all()
+    assert not primera.exists() and segunda.exists()
@@ -0,0 +1,51 @@
+"""Pruebas del manifiesto de construcción (omisión de etapas sin cambios)"""
+
+from manifest import BuildManifest
+from stages import Stage, StageResult
+
+
+def _etapa(tmp_path):
+    entrada = tmp_path / "entrada.txt"
+    salida = tmp_path / "salida.txt"
+    entrada.write_text("1,2,3\n", encoding='utf-8')
+    salida.write_text("6\n", encoding='utf-8')
+    return Stage("sumar", func=None, entradas=(entrada,), salidas=(salida,)), entrada, salida
+
+
+def test_etapa_registrada_se_omite(tmp_path):
+    stage, _, _ = _etapa(tmp_path)
+    manifiesto = BuildManifest(tmp_path / "manifest.json", "v1")
+    assert not manifiesto.is_current(stage)
+
+    manifiesto.record(stage, StageResult(stage.nombre, ok=True))
+    manifiesto.save()
+    assert manifiesto.is_current(stage)
+    # El registro sobrevive a un proceso nuevo
+    assert BuildManifest(tmp_path / "manifest.json", "v1").is_current(stage)
+
+
+def test_cambios_invalidan_la_etapa(tmp_path):
+    stage, entrada, salida = _etapa(tmp_path)
+    manifiesto = BuildManifest(tmp_path / "manifest.json", "v1")
+    manifiesto.record(stage, StageResult(stage.nombre, ok=True))
+    manifiesto.save()
+
+    # Otra versión del código
+    assert not BuildManifest(tmp_path / "manifest.json", "v2").is_current(stage)
+
+    # Entrada modificada (otro tamaño, así no depende de la resolución de mtime)
+    entrada.write_text("1,2,3,4\n", encoding='utf-8')
+    assert not BuildManifest(tmp_path / "manifest.json", "v1").is_current(stage)
+
+
+def test_salida_borrada_o_etapa_fallida(tmp_path):
+    stage, _, salida = _etapa(tmp_path)
+    manifiesto = BuildManifest(tmp_path / "manifest.json", "v1")
+    manifiesto.record(stage, StageResult(stage.nombre, ok=True))
+    salida.unlink()
+    assert not manifiesto.is_current(stage)
+
+    salida.write_text("6\n", encoding='utf-8')
+    assert manifiesto.is_current(stage)
+    manifiesto.record(stage, StageResult(stage.nombre, ok=False))
+    assert not manifiesto.is_current(stage)
@@ -0,0 +1,71 @@
+"""Pruebas de la consolidación de indicadores contra una cadena de merges"""
+
+import numpy as np
+import pandas as pd
+
+import keys
+import process_data
+
+ESTADOS = ['Aguascalientes', 'Jalisco', 'Estado de México', 'Yucatán']
+TRIMESTRES = ['Q1', 'Q2', 'Q3', 'Q4']
+
+
+def _trimestral(columna, anos, semilla, fraccion=0.8):
+    """Tabla procesada con un subconjunto aleatorio de Estado / Año / Trimestre"""
+    rng = np.random.default_rng(semilla)
+    llaves = pd.MultiIndex.from_product([ESTADOS, anos, TRIMESTRES],
+                                        names=['Estado', 'Año', 'Trimestre']).to_frame(index=False)
+    llaves = llaves[rng.random(len(llaves)) < fraccion]
+    # Orden arbitrario, como llegan de las fuentes
+    llaves = llaves.sample(frac=1, random_state=semilla).reset_index(drop=True)
+    llaves[columna] = rng.normal(size=len(llaves)).round(3)
+    return llaves
+
+
+def _referencia(trimestrales, gasto):
+    """Cadena de merges outer de los trimestrales y merge left del anual"""
+    llaves = ['Estado', 'Año', 'Trimestre']
+    df = trimestrales[0]
+    for otro in trimestrales[1:]:
+        df = df.merge(otro, on=llaves, how='outer')
+    df = df.merge(gasto, on=['Estado', 'Año'], how='left')
+    df['_estado'] = pd.Categorical(df['Estado'], dtype=keys.ESTADO_DTYPE).codes
+    return df.sort_values(['_estado', 'Año', 'Trimestre']).drop(columns='_estado')
+
+
+def test_consolidacion_coincide_con_merges():
+    ied = _trimestral('IED_millones_dolares', [2021, 2022, 2023], 1)
+    salario = _trimestral('Salario_promedio', [2022, 2023, 2024], 2)
+    remesas = _trimestral('Remesas_millones_dolares', [2023], 3, fraccion=1.0)
+    gasto = pd.DataFrame([(estado, ano, 1000.0 * i + ano)
+                          for i, estado in enumerate(ESTADOS) for ano in (2021, 2022)],
+                         columns=['Estado', 'Año', 'Gasto_ejecutado_pesos'])
+
+    consolidado = process_data.consolidate_tables(
+        {'ied': ied, 'salario': salario, 'remesas': remesas, 'gasto': gasto})
+    esperado = _referencia([ied, salario, remesas], gasto)
+
+    assert len(consolidado) == len(esperado)
+    assert list(consolidado['Estado'].astype(str)) == list(esperado['Estado'])
+    assert list(consolidado['Año']) == list(esperado['Año'])
+    assert list(consolidado['Trimestre'].astype(str)) == list(esperado['Trimestre'])
+    for col in ('IED_millones_dolares', 'Salario_promedio', 'Remesas_millones_dolares',
+                'Gasto_ejecutado_pesos'):
+        np.testing.assert_array_equal(consolidado[col].to_numpy(dtype=float),
+                                      esperado[col].to_numpy(dtype=float))
+
+
+def test_llaves_repetidas_conservan_la_primera():
+    ied = pd.DataFrame({
+        'Estado': ['Jalisco', 'Jalisco', 'Jalisco'],
+        'Año': [2023, 2023, 2023],
+        'Trimestre': ['Q1', 'Q1', 'Q2'],
+        'IED_millones_dolares': [1.0, 2.0, 3.0],
+    })
+    consolidado = process_data.consolidate_tables({'ied': ied})
+    assert list(consolidado['IED_millones_dolares']) == [1.0, 3.0]
+
+
+def test_sin_trimestrales_regresa_none():
+    gasto = pd.DataFrame({'Estado': ['Jalisco'], 'Año': [2023], 'Gasto_ejecutado_pesos': [1.0]})
+    assert process_data.consolidate_tables({'gasto': gasto}) is None
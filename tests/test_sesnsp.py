@@ -0,0 +1,57 @@
+"""Pruebas del procesamiento en streaming de la incidencia municipal (SESNSP)"""
+
+import pandas as pd
+import pytest
+
+import sesnsp
+
+
+def _referencia():
+    """Incidencia mensual del fixture con un melt / groupby de pandas"""
+    crudo = pd.read_csv(sesnsp.FIXTURE, encoding='latin-1')
+    crudo = crudo.rename(columns={
+        'Año': 'Ano', 'Cve. Municipio': 'Municipio_id',
+        'Bien jurídico afectado': 'Bien_juridico', 'Tipo de delito': 'Nombre',
+    })
+    largo = crudo.melt(id_vars=['Ano', 'Municipio_id', 'Bien_juridico', 'Nombre'],
+                       value_vars=sesnsp.MESES, var_name='Mes', value_name='Incidencia')
+    largo = largo.dropna(subset=['Incidencia'])
+    largo['Periodo'] = largo['Ano'] * 100 + largo['Mes'].map(
+        {mes: numero for numero, mes in enumerate(sesnsp.MESES, start=1)})
+    return largo.groupby(['Municipio_id', 'Periodo', 'Nombre', 'Bien_juridico'],
+                         as_index=False)['Incidencia'].sum()
+
+
+@pytest.mark.parametrize("chunksize", [7, 30, 1000])
+def test_melt_por_bloques_coincide_con_pandas(tmp_path, chunksize):
+    destino = tmp_path / "incidencia"
+    catalogo = tmp_path / "tipos.csv"
+    resumen = sesnsp.process_incidencia(sesnsp.FIXTURE, destino, catalogo,
+                                        chunksize=chunksize, flush_rows=50)
+
+    referencia = _referencia()
+    tipos = sesnsp.storage.read_table(catalogo)
+    esperado = referencia.merge(tipos, on=['Nombre', 'Bien_juridico'], how='left',
+                                validate='many_to_one')
+    assert esperado['Tipo_delito'].notna().all()
+    esperado = esperado[sesnsp.LLAVES + ['Incidencia']].sort_values(sesnsp.LLAVES)
+
+    obtenido = sesnsp.read_incidencia(destino).sort_values(sesnsp.LLAVES)
+    assert resumen['filas'] == len(obtenido) == len(esperado)
+    assert resumen['filas_origen'] == 90
+    assert not obtenido.duplicated(sesnsp.LLAVES).any()
+    pd.testing.assert_frame_equal(
+        obtenido.reset_index(drop=True).astype('int64'),
+        esperado.reset_index(drop=True).astype('int64'),
+    )
+
+
+def test_lectura_con_catalogo_regresa_nombres(tmp_path):
+    destino = tmp_path / "incidencia"
+    catalogo = tmp_path / "tipos.csv"
+    sesnsp.process_incidencia(sesnsp.FIXTURE, destino, catalogo, chunksize=25)
+
+    anos = sorted(_referencia()['Periodo'].floordiv(100).unique())
+    df = sesnsp.read_incidencia(destino, anos=anos[:1], catalogo=catalogo)
+    assert (df['Periodo'] // 100 == anos[0]).all()
+    assert set(df['Tipo_delito'].cat.categories) <= set(_referencia()['Nombre'])
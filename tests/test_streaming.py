@@ -0,0 +1,47 @@
+"""Pruebas del lector de arreglos JSON en streaming"""
+
+import json
+
+import pytest
+
+from streaming import iter_file_chunks, iter_json_array
+
+DOCUMENTO = {
+    "page": {"total": 3, "notas": ["a", {"b": [1, 2]}]},
+    "data": [
+        {"Estado": "Nuevo León", "Valor": 12345.5e-2, "Año": 2023, "Nulo": None},
+        {"Estado": "Yucatán", "Valor": -7, "Año": 2024, "Bandera": True},
+        [1, 2.25, "texto con \"comillas\" y \\ barras"],
+        123456789,
+    ],
+    "fin": "ñ",
+}
+
+
+def _bloques(texto, tamano):
+    datos = texto.encode('utf-8')
+    return (datos[i:i + tamano] for i in range(0, len(datos), tamano))
+
+
+@pytest.mark.parametrize("tamano", [1, 2, 3, 7, 64, 1 << 16])
+def test_coincide_con_json_loads(tamano):
+    texto = json.dumps(DOCUMENTO, ensure_ascii=False, indent=1)
+    assert list(iter_json_array(_bloques(texto, tamano))) == json.loads(texto)["data"]
+
+
+def test_llave_ausente_o_arreglo_vacio():
+    assert list(iter_json_array(_bloques('{"otro": [1, 2]}', 3))) == []
+    assert list(iter_json_array(_bloques('{"data": [ ]}', 3))) == []
+    assert list(iter_json_array(_bloques('{}', 1))) == []
+
+
+def test_json_invalido():
+    with pytest.raises(ValueError):
+        list(iter_json_array(_bloques('["data"]', 4)))
+
+
+def test_lee_archivo_por_bloques(tmp_path):
+    archivo = tmp_path / "respuesta.json"
+    archivo.write_text(json.dumps(DOCUMENTO), encoding='utf-8')
+    elementos = list(iter_json_array(iter_file_chunks(archivo, chunk_size=5), "data"))
+    assert elementos == DOCUMENTO["data"]